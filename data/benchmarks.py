@@ -0,0 +1,315 @@
+# =================================================
+# description: Micro-benchmarks of the primitives of
+#   SAMBA (permutation, mask, AES, Paillier), swept
+#   over key sizes, payload sizes, K and batch sizes.
+# =================================================
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from itertools import cycle
+from random import Random
+
+import numpy as np
+from obfuscators import compute_obfuscators, encrypt
+from packing import PackedEncoding
+from siblings import import_sibling
+
+# IsolatedPermutation of the protocol, see pre-computations.py
+samba = import_sibling( "pre-computations" )
+
+# version of the results schema, to increase each time its layout changes
+BENCHMARKS_VERSION = 1
+
+# a sample times enough calls of a primitive to last at least this long, the resolution of the clock and
+# the cost of reading it being negligible in front of it
+MIN_SAMPLE_NS = 50000
+# resamples of the bootstrap confidence intervals
+BOOTSTRAP_RESAMPLES = 2000
+CONFIDENCE = 0.95
+
+DEFAULT_KEY_SIZES = [ 1024, 2048, 3072 ]
+DEFAULT_PAYLOAD_SIZES = [ 8, 64, 1024, 16384 ]
+DEFAULT_K = [ 2, 10, 100, 1000 ]
+DEFAULT_BATCH_SIZES = [ 1, 10, 100 ]
+
+# parameters of the primitives summarized in security.json, as served to the application: a Paillier key of
+# the default size of phe, a permutation of 100 items, a single mask and an encrypted score
+SUMMARY_KEY_SIZE = 3072
+SUMMARY_K = 100
+SUMMARY_PAYLOAD_SIZE = 8
+
+
+# ------------------------------
+# Measures
+# ------------------------------
+class Settings:
+    """How each primitive is sampled.
+
+    Args:
+        warmup: Number of samples run and discarded before the measured ones, for at most max_time seconds.
+        repetitions: Number of measured samples.
+        min_repetitions: Number of measured samples taken even when they exceed max_time.
+        max_time: Time spent measuring a primitive, in seconds, after which no more samples are taken.
+    """
+    def __init__(self, warmup : int = 10, repetitions : int = 200, min_repetitions : int = 5, max_time : float = 2.):
+        self.warmup = warmup
+        self.repetitions = repetitions
+        self.min_repetitions = min_repetitions
+        self.max_time = max_time
+
+    def as_dict( self ) -> dict:
+        return {
+            "warmup": self.warmup,
+            "repetitions": self.repetitions,
+            "min_repetitions": self.min_repetitions,
+            "max_time": self.max_time,
+            "min_sample_ns": MIN_SAMPLE_NS,
+            "confidence": CONFIDENCE,
+        }
+
+def run_sample( operation, number : int ) -> int:
+    start = time.perf_counter_ns()
+    for _ in range( number ):
+        operation()
+    return time.perf_counter_ns() - start
+
+def calibrate( operation ) -> int:
+    """Returns the number of calls of the operation timed by a sample, so it lasts at least MIN_SAMPLE_NS."""
+    number = 1
+    while True:
+        elapsed = run_sample( operation, number )
+        if elapsed >= MIN_SAMPLE_NS:
+            return number
+        number = max( number * 2, int( number * MIN_SAMPLE_NS / max( elapsed, 1 ) * 1.2 ) )
+
+def measure( operation, settings : Settings ) -> (np.ndarray, int):
+    """Times the operation, called without arguments, with the garbage collector disabled.
+
+    Returns:
+        The time of a call in each measured sample, in nanoseconds, and the number of calls by sample.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        number = calibrate( operation )
+        deadline = time.perf_counter_ns() + int( settings.max_time * 1e9 )
+        for _ in range( settings.warmup ):
+            if time.perf_counter_ns() >= deadline:
+                break
+            run_sample( operation, number )
+        samples = []
+        deadline = time.perf_counter_ns() + int( settings.max_time * 1e9 )
+        while len(samples) < settings.repetitions and ( len(samples) < settings.min_repetitions or time.perf_counter_ns() < deadline ):
+            samples.append( run_sample( operation, number ) )
+    finally:
+        if was_enabled:
+            gc.enable()
+    return np.array( samples, dtype=np.float64 ) / number, number
+
+def summarize( durations_ns : np.ndarray, seed : int = 0 ) -> dict:
+    """Returns the statistics of the durations, in seconds, with bootstrap confidence intervals of the mean and the median."""
+    seconds = durations_ns / 1e9
+    resamples = np.random.default_rng( seed ).choice( seconds, size=( BOOTSTRAP_RESAMPLES, len(seconds) ) )
+    bounds = [ ( 1 - CONFIDENCE ) / 2 * 100, ( 1 + CONFIDENCE ) / 2 * 100 ]
+    return {
+        "n": len(seconds),
+        "mean": float( seconds.mean() ),
+        "stdev": float( seconds.std( ddof=1 ) ) if len(seconds) > 1 else 0.,
+        "min": float( seconds.min() ),
+        "p50": float( np.percentile( seconds, 50 ) ),
+        "p90": float( np.percentile( seconds, 90 ) ),
+        "p99": float( np.percentile( seconds, 99 ) ),
+        "max": float( seconds.max() ),
+        "mean_ci": np.percentile( resamples.mean( axis=1 ), bounds ).tolist(),
+        "p50_ci": np.percentile( np.median( resamples, axis=1 ), bounds ).tolist(),
+    }
+
+
+# ------------------------------
+# Benchmarks
+# Each benchmark yields its primitive, its parameters and the operation
+# timed, then optionally the fields added to its result. Inputs are drawn
+# beforehand and cycled through, so drawing them is not timed.
+# ------------------------------
+NB_INPUTS = 64
+
+def permutation_benchmarks( k_set : [int], generator : Random ):
+    for k in k_set:
+        permutation = samba.IsolatedPermutation.new( k, perm_seed=generator.randint(1, 10000), turn=1 )
+        items = list( range( k ) )
+        permuted = permutation.permute( items )
+        yield "permutation", { "k": k }, lambda permutation=permutation, items=items: permutation.permute( items )
+        yield "permutation.inversion", { "k": k }, lambda permutation=permutation, permuted=permuted: permutation.invert_permutation( permuted )
+
+def mask_benchmarks( k_set : [int], generator : Random ):
+    for k in [ 1 ] + k_set:
+        scores = [ generator.random() for _ in range( k ) ]
+        masks = [ 1. + generator.random() for _ in range( k ) ]
+        yield "mask", { "k": k }, lambda scores=scores, masks=masks: [ score * mask for score, mask in zip( scores, masks ) ]
+
+def aes_benchmarks( payload_sizes : [int], batch_sizes : [int] ):
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    aes = AESGCM( AESGCM.generate_key( bit_length=256 ) )
+    for payload_size in payload_sizes:
+        messages = [ ( os.urandom( 12 ), os.urandom( payload_size ) ) for _ in range( NB_INPUTS ) ]
+        encrypted = cycle([ ( nonce, aes.encrypt( nonce, message, None ) ) for nonce, message in messages ])
+        messages = cycle( messages )
+        yield "aes.encryption", { "payload_size": payload_size }, lambda messages=messages: aes.encrypt( *next( messages ), None )
+        yield "aes.decryption", { "payload_size": payload_size }, lambda encrypted=encrypted: aes.decrypt( *next( encrypted ), None )
+    # messages of comp, a score or a selection bit of each arm
+    for batch_size in batch_sizes:
+        batch = [ ( os.urandom( 12 ), os.urandom( SUMMARY_PAYLOAD_SIZE ) ) for _ in range( batch_size ) ]
+        yield "aes.batch_encryption", { "batch_size": batch_size }, lambda batch=batch: [ aes.encrypt( nonce, message, None ) for nonce, message in batch ]
+
+def paillier_benchmarks( key_sizes : [int], k_set : [int], batch_sizes : [int], generator : Random ):
+    from phe import paillier
+    for key_size in key_sizes:
+        yield "paillier.key_generation", { "key_size": key_size }, lambda key_size=key_size: paillier.generate_paillier_keypair( n_length=key_size )
+        public_key, private_key = paillier.generate_paillier_keypair( n_length=key_size )
+        plaintexts = [ generator.randint(0, 100000) for _ in range( NB_INPUTS ) ]
+        ciphertexts = [ public_key.encrypt( plaintext ) for plaintext in plaintexts ]
+        if [ private_key.decrypt( ciphertext ) for ciphertext in ciphertexts ] != plaintexts:
+            raise Exception(f"Paillier decryption failed for a key of {key_size} bits")
+        next_plaintext, next_ciphertext = cycle( plaintexts ).__next__, cycle( ciphertexts ).__next__
+        parameters = { "key_size": key_size }
+        yield "paillier.encryption", parameters, lambda public_key=public_key, next_plaintext=next_plaintext: public_key.encrypt( next_plaintext() )
+        yield "paillier.decryption", parameters, lambda private_key=private_key, next_ciphertext=next_ciphertext: private_key.decrypt( next_ciphertext() )
+        yield "paillier.addition", parameters, lambda next_ciphertext=next_ciphertext: next_ciphertext() + next_ciphertext()
+        # offline and online phases of an encryption, see obfuscators.py, serialization included
+        yield "paillier.obfuscator", parameters, lambda n=public_key.n: compute_obfuscators( n, 1 )
+        next_obfuscator = cycle( compute_obfuscators( public_key.n, NB_INPUTS )[0] ).__next__
+        yield "paillier.online_encryption", parameters, \
+            lambda public_key=public_key, next_plaintext=next_plaintext, next_obfuscator=next_obfuscator: encrypt( public_key, next_plaintext(), next_obfuscator() ).ciphertext()
+        # sum of the rewards of the k arms
+        for k in k_set:
+            summed = [ ciphertexts[index % NB_INPUTS] for index in range( k ) ]
+            yield "paillier.sum", { "key_size": key_size, "k": k }, lambda summed=summed: sum( summed[1:], summed[0] )
+        # a batch encrypted value by value or packed, see packing.py, the packed batch being decrypted without
+        # being added to another one
+        size = ( public_key.nsquare.bit_length() + 7 ) // 8
+        encoding = PackedEncoding( public_key, bound=100000, additions=1 )
+        for batch_size in batch_sizes:
+            batch = [ plaintexts[index % NB_INPUTS] for index in range( batch_size ) ]
+            parameters = { "key_size": key_size, "batch_size": batch_size }
+            yield "paillier.batch_encryption", parameters, \
+                lambda public_key=public_key, batch=batch: [ public_key.encrypt( plaintext ) for plaintext in batch ], \
+                { "ciphertexts": batch_size, "bytes": batch_size * size }
+            packed = encoding.encrypt( batch )
+            if encoding.decrypt( private_key, packed, batch_size ) != batch:
+                raise Exception(f"Paillier unpacking failed for a key of {key_size} bits")
+            extra = { "ciphertexts": len(packed), "bytes": len(packed) * size, "slots": encoding.slots }
+            yield "paillier.packed_encryption", parameters, lambda encoding=encoding, batch=batch: encoding.encrypt( batch ), extra
+            yield "paillier.packed_decryption", parameters, \
+                lambda encoding=encoding, private_key=private_key, packed=packed, batch_size=batch_size: encoding.decrypt( private_key, packed, batch_size ), extra
+
+def run_benchmarks( settings : Settings, key_sizes : [int] = DEFAULT_KEY_SIZES, payload_sizes : [int] = DEFAULT_PAYLOAD_SIZES,
+                    k_set : [int] = DEFAULT_K, batch_sizes : [int] = DEFAULT_BATCH_SIZES, seed : int = 1, verbose : bool = True ) -> dict:
+    """Measures every primitive for every swept parameter.
+
+    Returns:
+        The results, laid out as described by BENCHMARKS_VERSION.
+    """
+    generator = Random( seed )
+    benchmarks = [
+        permutation_benchmarks( k_set, generator ),
+        mask_benchmarks( k_set, generator ),
+        aes_benchmarks( payload_sizes, batch_sizes ),
+        paillier_benchmarks( key_sizes, k_set, batch_sizes, generator ),
+    ]
+    results = []
+    for benchmark in benchmarks:
+        for primitive, parameters, operation, *extra in benchmark:
+            durations, number = measure( operation, settings )
+            results.append(dict( primitive=primitive, parameters=dict( parameters ), unit="s", calls_per_sample=number, **summarize( durations, seed ), **( extra[0] if extra else {} ) ))
+            if verbose:
+                print(f"[+] {primitive} {parameters}: {results[-1]['p50'] * 1e6:.2f}us (p50), {results[-1]['n']} samples")
+    return {
+        "version": BENCHMARKS_VERSION,
+        "created": datetime.now( timezone.utc ).isoformat(),
+        "environment": environment(),
+        "settings": settings.as_dict(),
+        "results": results,
+    }
+
+def environment() -> dict:
+    from cryptography import __version__ as cryptography_version
+    from phe import __version__ as phe_version
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "cryptography": cryptography_version,
+        "phe": phe_version,
+        "gmpy2": "gmpy2" in sys.modules,
+    }
+
+
+# ------------------------------
+# Results
+# ------------------------------
+def find_result( benchmarks : dict, primitive : str, **parameters ) -> dict:
+    """Returns the result of the primitive for the given parameters, which must have been swept."""
+    for result in benchmarks["results"]:
+        if result["primitive"] == primitive and all( result["parameters"].get( name ) == value for name, value in parameters.items() ):
+            return result
+    raise Exception(f"No result for {primitive} with {parameters}, the parameters must be swept")
+
+def security_summary( benchmarks : dict ) -> dict:
+    """Returns the mean time of each primitive as read by the application from security.json, along with the
+    parameters they were measured with."""
+    mean = lambda primitive, **parameters: find_result( benchmarks, primitive, **parameters )["mean"]
+    return {
+        "version": benchmarks["version"],
+        "parameters": { "key_size": SUMMARY_KEY_SIZE, "k": SUMMARY_K, "payload_size": SUMMARY_PAYLOAD_SIZE },
+        "permutation": mean( "permutation", k=SUMMARY_K ),
+        "mask": mean( "mask", k=1 ),
+        "aes": {
+            "encryption": mean( "aes.encryption", payload_size=SUMMARY_PAYLOAD_SIZE ),
+            "decryption": mean( "aes.decryption", payload_size=SUMMARY_PAYLOAD_SIZE ),
+        },
+        "paillier": {
+            "encryption": mean( "paillier.encryption", key_size=SUMMARY_KEY_SIZE ),
+            "decryption": mean( "paillier.decryption", key_size=SUMMARY_KEY_SIZE ),
+            "addition": mean( "paillier.addition", key_size=SUMMARY_KEY_SIZE ),
+        },
+    }
+
+def write_benchmarks( output : str, benchmarks : dict ):
+    """Writes the results in benchmarks.json, and their summary in security.json, in the output folder."""
+    with open( os.path.join( output, "benchmarks.json" ), 'w' ) as file:
+        file.write( json.dumps( benchmarks ) )
+    with open( os.path.join( output, "security.json" ), 'w' ) as file:
+        file.write( json.dumps( security_summary( benchmarks ) ) )
+
+def createParser():
+    parser = ArgumentParser( description="Benchmarks the cryptographic primitives of SAMBA, writing benchmarks.json and security.json" )
+    parser.add_argument( "--output", default="data", help="Folder of the results" )
+    parser.add_argument( "--key-sizes", type=int, nargs="+", default=DEFAULT_KEY_SIZES, help="Paillier key sizes, in bits" )
+    parser.add_argument( "--payload-sizes", type=int, nargs="+", default=DEFAULT_PAYLOAD_SIZES, help="AES payload sizes, in bytes" )
+    parser.add_argument( "--k", type=int, nargs="+", default=DEFAULT_K, help="Numbers of arms" )
+    parser.add_argument( "--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES, help="Numbers of messages encrypted at once" )
+    parser.add_argument( "--warmup", type=int, default=10, help="Samples discarded before measuring a primitive" )
+    parser.add_argument( "--repetitions", type=int, default=200, help="Samples measured by primitive" )
+    parser.add_argument( "--max-time", type=float, default=2., help="Seconds spent measuring a primitive, at least 5 samples being measured" )
+    parser.add_argument( "--seed", type=int, default=1 )
+    return parser
+
+if __name__ == "__main__":
+    parser = createParser()
+    args = parser.parse_args()
+    # the summary is written once every primitive is measured, so its parameters are checked beforehand
+    for option, swept, value in [ ( "--key-sizes", args.key_sizes, SUMMARY_KEY_SIZE ), ( "--payload-sizes", args.payload_sizes, SUMMARY_PAYLOAD_SIZE ), ( "--k", args.k, SUMMARY_K ) ]:
+        if value not in swept:
+            parser.error(f"{option} must include {value}, summarized in security.json")
+    settings = Settings( warmup=args.warmup, repetitions=args.repetitions, max_time=args.max_time )
+    os.makedirs( args.output, exist_ok=True )
+    write_benchmarks( args.output, run_benchmarks( settings, args.key_sizes, args.payload_sizes, args.k, args.batch_sizes, args.seed ) )
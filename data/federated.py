@@ -0,0 +1,388 @@
+# =================================================
+# description: Local deployment of SAMBA, each role
+#   being a process exchanging encrypted messages
+#   over sockets, to measure its throughput.
+# =================================================
+import asyncio
+import json
+import multiprocessing
+import os
+import struct
+import tempfile
+import time
+from argparse import ArgumentParser
+from random import Random
+
+import numpy as np
+from obfuscators import ObfuscatorPool
+from packing import PackedEncoding, add_packed
+from siblings import import_sibling
+
+# strategies and protocol primitives, see SambaProtocolTimer in pre-computations.py
+samba = import_sibling( "pre-computations" )
+
+UNIX_TRANSPORT = "unix"
+TCP_TRANSPORT = "tcp"
+
+# roles connecting to the controller, which relays every message of the protocol
+DATA_OWNER, COMP, CUSTOMER = 0, 1, 2
+HELLO = struct.Struct('<BI')
+FRAME_HEADER = struct.Struct('<I')
+TURN = struct.Struct('<I')
+CUMULATIVE_REWARD = struct.Struct('<Q')
+# the turn sent to the data owners once the budget is spent
+FINISH = 0
+# AES-GCM message: nonce, encrypted float, tag
+NONCE_SIZE = 12
+AES_MESSAGE_SIZE = NONCE_SIZE + 8 + 16
+# hops of a turn timed by the controller
+HOPS = ( "scores", "comp", "selection" )
+
+
+class Connection:
+    """Length-prefixed frames over a stream, counting the bytes sent and received."""
+    def __init__(self, reader : asyncio.StreamReader, writer : asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.sent = 0
+        self.received = 0
+
+    def send( self, payload : bytes ):
+        self.writer.write( FRAME_HEADER.pack( len(payload) ) + payload )
+        self.sent += FRAME_HEADER.size + len(payload)
+
+    async def receive( self ) -> bytes:
+        length, = FRAME_HEADER.unpack( await self.reader.readexactly( FRAME_HEADER.size ) )
+        self.received += FRAME_HEADER.size + length
+        return await self.reader.readexactly( length )
+
+    async def drain( self ):
+        await self.writer.drain()
+
+    def close( self ):
+        self.writer.close()
+
+async def connect( transport : str, address ) -> (asyncio.StreamReader, asyncio.StreamWriter):
+    if transport == UNIX_TRANSPORT:
+        return await asyncio.open_unix_connection( address )
+    return await asyncio.open_connection( *address )
+
+
+class Deployment:
+    """Parameters shared by every role: the strategy, the seeds and the keys, distributed before the execution."""
+    def __init__(self, algorithm : str, probs : [float], budget : int, seed : int, transport : str, paillier_key_size : int,
+                 tau : float = 0.1, epsilon : float = 0.1, packing : bool = True):
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        from phe import paillier
+        self.algorithm = algorithm
+        self.probs = probs
+        self.budget = budget
+        self.seed = seed
+        self.transport = transport
+        self.tau = tau
+        self.epsilon = epsilon
+        self.packing = packing
+        generator = Random( seed )
+        self.perm_seed, self.mask_seed = generator.randint(1, 10000), generator.randint(1, 10000)
+        # key shared by the data owners and comp, and key pair of the customer
+        self.aes_key = AESGCM.generate_key( bit_length=256 )
+        self.public_key, self.private_key = paillier.generate_paillier_keypair( n_length=paillier_key_size )
+
+    @property
+    def K( self ) -> int:
+        return len(self.probs)
+
+    def strategy( self ) -> samba.StandardBanditsAlgorithm:
+        """Returns the strategy played by every role, built from the same seeds in each of them."""
+        generator = Random( self.seed )
+        return samba.create_instance( self.algorithm, self.probs, self.tau, self.epsilon, lambda: generator.randint(1, 10000) )
+
+    def aes( self ):
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        return AESGCM( self.aes_key )
+
+    def encoding( self ) -> PackedEncoding:
+        """Returns the packing of the sums of rewards of the arms, which hold at most budget each and are added at most
+        once per arm."""
+        return PackedEncoding( self.public_key, bound=self.budget, additions=self.K )
+
+    def nb_ciphertexts( self, nb_arms : int ) -> int:
+        """Returns the number of Paillier ciphertexts a process sends for the sums of rewards of its nb_arms arms."""
+        return self.encoding().nb_ciphertexts( nb_arms ) if self.packing else nb_arms
+
+def encrypt( aes, value : float ) -> bytes:
+    nonce = os.urandom( NONCE_SIZE )
+    return nonce + aes.encrypt( nonce, struct.pack('<d', value), None )
+
+def decrypt( aes, message : bytes ) -> float:
+    return struct.unpack('<d', aes.decrypt( message[:NONCE_SIZE], message[NONCE_SIZE:], None ))[0]
+
+def ciphertext_size( public_key ) -> int:
+    return ( public_key.nsquare.bit_length() + 7 ) // 8
+
+def paillier_to_bytes( ciphertexts : list ) -> bytes:
+    """Returns the Paillier ciphertexts, each on ciphertext_size bytes."""
+    return b"".join( encrypted.ciphertext().to_bytes( ciphertext_size( encrypted.public_key ), 'big' ) for encrypted in ciphertexts )
+
+def paillier_from_bytes( public_key, payload : bytes ) -> list:
+    from phe import paillier
+    size = ciphertext_size( public_key )
+    return [ paillier.EncryptedNumber( public_key, int.from_bytes( payload[offset:offset + size], 'big' ) ) for offset in range( 0, len(payload), size ) ]
+
+def split_messages( payload : bytes ) -> [bytes]:
+    return [ payload[offset:offset + AES_MESSAGE_SIZE] for offset in range( 0, len(payload), AES_MESSAGE_SIZE ) ]
+
+
+# ------------------------------
+# Roles
+# Each role runs its own event loop in its own process. The data owners,
+# comp and the customer connect to the controller, which drives the turns.
+# ------------------------------
+async def data_owner( deployment : Deployment, address, arms : [int] ):
+    """Plays the data owners of the given arms, each of them over its own connection.
+
+    With packing, the sums of rewards of the arms are packed in the fewest Paillier ciphertexts, sent over the
+    connection of the first arm.
+    """
+    # offline phase: the obfuscators of the final encryptions are computed before the turns
+    obfuscators = ObfuscatorPool( deployment.public_key, capacity=deployment.nb_ciphertexts( len(arms) ) )
+    obfuscators.fill()
+
+    async def play( arm : int ) -> (Connection, int):
+        strategy = deployment.strategy()
+        aes = deployment.aes()
+        mask_generator = samba.new_random_generator( deployment.mask_seed )
+        connection = Connection( *await connect( deployment.transport, address ) )
+        connection.send( HELLO.pack( DATA_OWNER, arm ) )
+        # initial exploration, each arm being pulled once in turn
+        strategy.pullArm( arm + 1, arm )
+        while True:
+            turn, = TURN.unpack( await connection.receive() )
+            if turn == FINISH:
+                break
+            mask = 1. + mask_generator.random( turn )
+            connection.send( encrypt( aes, strategy.computeScore( turn, arm ) * mask ) )
+            if decrypt( aes, await connection.receive() ) == 1.:
+                strategy.pullArm( turn, arm )
+            # acknowledges the end of its turn
+            connection.send( b"" )
+        return connection, strategy.nbRewards( arm )
+
+    connections, rewards = zip(*await asyncio.gather(*( play( arm ) for arm in arms )))
+    if deployment.packing:
+        payloads = [ paillier_to_bytes( deployment.encoding().encrypt( list( rewards ), obfuscators.encrypt ) ) ] + [ b"" ] * ( len(arms) - 1 )
+    else:
+        payloads = [ paillier_to_bytes([ obfuscators.encrypt( reward ) ]) for reward in rewards ]
+    for connection, payload in zip( connections, payloads ):
+        connection.send( payload )
+        await connection.drain()
+        connection.close()
+
+async def comp( deployment : Deployment, address ):
+    strategy = deployment.strategy()
+    aes = deployment.aes()
+    connection = Connection( *await connect( deployment.transport, address ) )
+    connection.send( HELLO.pack( COMP, 0 ) )
+    while True:
+        payload = await connection.receive()
+        if not payload:
+            break
+        turn, = TURN.unpack( payload[:TURN.size] )
+        scores = [ decrypt( aes, message ) for message in split_messages( payload[TURN.size:] ) ]
+        strategy.beginTurn( turn )
+        selectedPermutedArm = strategy.selectArm( turn, scores )
+        connection.send( b"".join( encrypt( aes, 1. if index == selectedPermutedArm else 0. ) for index in range(len(scores)) ) )
+    connection.close()
+
+async def customer( deployment : Deployment, address ):
+    connection = Connection( *await connect( deployment.transport, address ) )
+    connection.send( HELLO.pack( CUSTOMER, 0 ) )
+    encrypted_rewards = paillier_from_bytes( deployment.public_key, await connection.receive() )
+    if deployment.packing:
+        encoding = deployment.encoding()
+        cumulative_reward = sum( encoding.decrypt( deployment.private_key, encrypted_rewards, len(encrypted_rewards) * encoding.slots ) )
+    else:
+        cumulative_reward = sum( deployment.private_key.decrypt( encrypted ) for encrypted in encrypted_rewards )
+    connection.send( CUMULATIVE_REWARD.pack( int( cumulative_reward ) ) )
+    await connection.drain()
+    connection.close()
+
+async def controller( deployment : Deployment, transport_address, ready ):
+    """Accepts the connections of the other roles, plays the turns and sends back its measures through ready."""
+    K = deployment.K
+    data_owners, others = {}, {}
+    everyone_connected = asyncio.get_running_loop().create_future()
+
+    async def accept( reader, writer ):
+        connection = Connection( reader, writer )
+        role, index = HELLO.unpack( await connection.receive() )
+        ( data_owners if role == DATA_OWNER else others )[ index if role == DATA_OWNER else role ] = connection
+        if len(data_owners) == K and len(others) == 2 and not everyone_connected.done():
+            everyone_connected.set_result( True )
+
+    if deployment.transport == UNIX_TRANSPORT:
+        server = await asyncio.start_unix_server( accept, transport_address )
+        address = transport_address
+    else:
+        server = await asyncio.start_server( accept, *transport_address )
+        address = server.sockets[0].getsockname()[:2]
+    ready.send( address )
+    await everyone_connected
+    owners = [ data_owners[arm] for arm in range(K) ]
+    comp_connection = others[COMP]
+    permutation = samba.IsolatedPermutation( K, deployment.perm_seed )
+
+    hops = { hop: np.zeros( max(deployment.budget - K, 0), dtype=np.int64 ) for hop in HOPS }
+    start = time.perf_counter_ns()
+    for index, turn in enumerate( range( K + 1, deployment.budget + 1 ) ):
+        hop_start = time.perf_counter_ns()
+        for connection in owners:
+            connection.send( TURN.pack( turn ) )
+        scores = await asyncio.gather(*( connection.receive() for connection in owners ))
+        hop_end = time.perf_counter_ns()
+        hops["scores"][index], hop_start = hop_end - hop_start, hop_end
+
+        permutation.reset( turn )
+        comp_connection.send( TURN.pack( turn ) + b"".join( permutation.permute( scores ) ) )
+        selections = split_messages( await comp_connection.receive() )
+        hop_end = time.perf_counter_ns()
+        hops["comp"][index], hop_start = hop_end - hop_start, hop_end
+
+        for connection, selection in zip( owners, permutation.invert_permutation( selections ) ):
+            connection.send( selection )
+        await asyncio.gather(*( connection.receive() for connection in owners ))
+        hops["selection"][index] = time.perf_counter_ns() - hop_start
+    turns_time = time.perf_counter_ns() - start
+
+    # the encrypted sums of rewards are added and decrypted by the customer
+    for connection in owners:
+        connection.send( TURN.pack( FINISH ) )
+    comp_connection.send( b"" )
+    encrypted_rewards = [
+        paillier_from_bytes( deployment.public_key, payload )
+        for payload in await asyncio.gather(*( connection.receive() for connection in owners ))
+    ]
+    # packed ciphertexts are added slot by slot, the others all together
+    if deployment.packing:
+        encrypted_cumulative_rewards = add_packed( encrypted_rewards )
+    else:
+        encrypted = [ ciphertext for ciphertexts in encrypted_rewards for ciphertext in ciphertexts ]
+        encrypted_cumulative_rewards = [ sum( encrypted[1:], encrypted[0] ) ]
+    others[CUSTOMER].send( paillier_to_bytes( encrypted_cumulative_rewards ) )
+    cumulative_reward, = CUMULATIVE_REWARD.unpack( await others[CUSTOMER].receive() )
+    total_time = time.perf_counter_ns() - start
+
+    connections = { "data_owners": owners, "comp": [ comp_connection ], "customer": [ others[CUSTOMER] ] }
+    ready.send({
+        "turns_time_ns": turns_time,
+        "total_time_ns": total_time,
+        "hops_ns": hops,
+        "bytes": {
+            name: { "sent": sum( connection.sent for connection in role ), "received": sum( connection.received for connection in role ) }
+            for name, role in connections.items()
+        },
+        "paillier_ciphertexts": sum( len(ciphertexts) for ciphertexts in encrypted_rewards ),
+        "cumulative_reward": cumulative_reward,
+    })
+    for connection in owners + list( others.values() ):
+        connection.close()
+    server.close()
+    await server.wait_closed()
+
+def run_role( role, *args ):
+    asyncio.run( role( *args ) )
+
+
+# ------------------------------
+# Launcher
+# ------------------------------
+def percentiles( values : np.ndarray ) -> dict:
+    if len(values) == 0:
+        return {}
+    return {
+        "mean": float( values.mean() ) / 1e6,
+        "p50": float( np.percentile( values, 50 ) ) / 1e6,
+        "p90": float( np.percentile( values, 90 ) ) / 1e6,
+        "p99": float( np.percentile( values, 99 ) ) / 1e6,
+        "max": float( values.max() ) / 1e6,
+    }
+
+def run_deployment( deployment : Deployment, owner_processes : int = None ) -> dict:
+    """Runs every role of the deployment in its own process, and returns the measures of the controller.
+
+    Args:
+        owner_processes: Number of processes among which the data owners are spread, one per arm by default. Each data
+            owner keeps its own connection to the controller.
+    """
+    K = deployment.K
+    owner_processes = min( owner_processes or K, K )
+    with tempfile.TemporaryDirectory() as folder:
+        transport_address = os.path.join( folder, "controller.sock" ) if deployment.transport == UNIX_TRANSPORT else ( "127.0.0.1", 0 )
+        measures, ready = multiprocessing.Pipe( duplex=False )
+        processes = [ multiprocessing.Process( target=run_role, args=( controller, deployment, transport_address, ready ) ) ]
+        processes[0].start()
+        address = measures.recv()
+        processes += [ multiprocessing.Process( target=run_role, args=( comp, deployment, address ) ),
+                       multiprocessing.Process( target=run_role, args=( customer, deployment, address ) ) ]
+        processes += [
+            multiprocessing.Process( target=run_role, args=( data_owner, deployment, address, list( range( first, K, owner_processes ) ) ) )
+            for first in range( owner_processes )
+        ]
+        for process in processes[1:]:
+            process.start()
+        result = measures.recv()
+        for process in processes:
+            process.join()
+        for process in processes:
+            if process.exitcode != 0:
+                raise Exception(f"A role of the deployment failed with exit code {process.exitcode}")
+
+    nb_turns = max( deployment.budget - K, 0 )
+    bytes_on_wire = sum( counters["sent"] + counters["received"] for counters in result["bytes"].values() )
+    return {
+        "algorithm": deployment.algorithm,
+        "k": K,
+        "budget": deployment.budget,
+        "transport": deployment.transport,
+        "processes": len(processes),
+        "turns_per_second": nb_turns / ( result["turns_time_ns"] / 1e9 ) if nb_turns else 0.,
+        "turn_latency_ms": percentiles( sum( result["hops_ns"].values() ) ),
+        "hop_latency_ms": { hop: percentiles( values ) for hop, values in result["hops_ns"].items() },
+        "total_time_s": result["total_time_ns"] / 1e9,
+        "bytes": result["bytes"],
+        "bytes_per_turn": bytes_on_wire / nb_turns if nb_turns else 0.,
+        "packing": deployment.packing,
+        "paillier_ciphertexts": result["paillier_ciphertexts"],
+        "cumulative_reward": result["cumulative_reward"],
+    }
+
+def createParser():
+    parser = ArgumentParser( description="Runs SAMBA with each role in its own process, talking over local sockets, and reports its throughput" )
+    parser.add_argument( "--algorithm", choices=samba.ALGORITHMS, default=samba.ExecutionHistoryManager.UCB )
+    parser.add_argument( "--k", type=int, default=5, help="Number of arms, hence of data owners" )
+    parser.add_argument( "--budget", type=int, default=1000 )
+    parser.add_argument( "--transport", choices=[UNIX_TRANSPORT, TCP_TRANSPORT], default=UNIX_TRANSPORT )
+    parser.add_argument( "--histograms", default=None, help="Rating histograms the probs of the arms are derived from, see histograms.py, random probs by default" )
+    parser.add_argument( "--threshold", type=float, default=3, help="Minimal rating of a success, with --histograms" )
+    parser.add_argument( "--seed", type=int, default=1 )
+    parser.add_argument( "--owner-processes", type=int, default=None, help="Number of processes running the data owners, one per arm by default" )
+    parser.add_argument( "--paillier-key-size", type=int, default=2048 )
+    parser.add_argument( "--no-packing", action="store_true", help="Encrypts the sum of rewards of each arm in its own Paillier ciphertext" )
+    parser.add_argument( "--output", default=None, help="JSON file of the measures, printed by default" )
+    return parser
+
+if __name__ == "__main__":
+    args = createParser().parse_args()
+    if args.histograms is not None:
+        from histograms import load_histograms
+        probs = load_histograms( args.histograms ).probs( args.k, args.threshold )
+    else:
+        probs = np.random.default_rng( args.seed ).random( args.k ).tolist()
+
+    deployment = Deployment( args.algorithm, probs, args.budget, args.seed, args.transport, args.paillier_key_size, packing=not args.no_packing )
+    measures = json.dumps( run_deployment( deployment, args.owner_processes ), indent=4 )
+    if args.output is None:
+        print( measures )
+    else:
+        with open( args.output, 'w' ) as file:
+            file.write( measures )
@@ -43,37 +43,23 @@ if [ ! -e $STEAM_DATASET_FOLDER ]; then
     mkdir -p $STEAM_DATASET_FOLDER
 fi
 
+# datasets are read compressed by probs-generator.py
 GOOGLE_DATASET_GZ="$GOOGLE_DATASET_FOLDER/googlelocal-reviews.gz"
-GOOGLE_DATASET_FILE="$GOOGLE_DATASET_FOLDER/googlelocal-reviews"
 STEAM_DATASET_GZ="$STEAM_DATASET_FOLDER/steam-reviews.gz"
-STEAM_DATASET_FILE="$STEAM_DATASET_FOLDER/steam-reviews"
 if [ $downloadDataset -eq 1 ]; then
     echo "[*] Getting dataset"
     # Download datasets
-    ROOT=$(pwd)
 
 
     if [ ! -e $GOOGLE_DATASET_GZ ]; then
         echo "[*] Downloading Google Local Reviews Dataset..."
         wget deepyeti.ucsd.edu/jmcauley/datasets/googlelocal/reviews.clean.json.gz -O $GOOGLE_DATASET_GZ
     fi
-    if [ ! -e $GOOGLE_DATASET_FILE ]; then
-        echo "[+] Unzipping dataset"
-        cd $GOOGLE_DATASET_FOLDER
-        gzip -d --keep $(pwd)/googlelocal-reviews.gz
-        cd "$ROOT"
-    fi
     echo "[+] Google Local Reviews Dataset ready-to-use"
 
     if [ ! -e "$STEAM_DATASET_GZ" ]; then
         echo "[*] Downloading Steam Reviews Dataset..."
         wget cseweb.ucsd.edu/~wckang/steam_reviews.json.gz -O $STEAM_DATASET_GZ
-    fi
-    if [ ! -e $STEAM_DATASET_FILE ]; then
-        echo "[+] Unzipping dataset"
-        cd $STEAM_DATASET_FOLDER
-        gzip -d --keep $(pwd)/steam-reviews.gz
-        cd "$ROOT"
     else
         echo "[+] Steam dataset already exists"
     fi
@@ -88,6 +74,9 @@ fi
 PROBS_FOLDER="probs"
 STEAM_PROBS="$PROBS_FOLDER/steam.probs"
 GOOGLE_PROBS="$PROBS_FOLDER/googlelocal.probs"
+# rating histograms, from which probs of other k and thresholds are derived with histograms.py
+STEAM_HISTOGRAMS="$PROBS_FOLDER/steam.histograms"
+GOOGLE_HISTOGRAMS="$PROBS_FOLDER/googlelocal.histograms"
 if [ $computeProbs -eq 1 ]; then
 
     # creates the probs folder if missing
@@ -95,13 +84,17 @@ if [ $computeProbs -eq 1 ]; then
         mkdir -p $PROBS_FOLDER
     fi
 
-    echo $GOOGLE_DATASET_FILE
+    echo $GOOGLE_DATASET_GZ
 
     python3 probs-generator.py\
-        --google-dataset "$GOOGLE_DATASET_FILE" \
+        --google-dataset "$GOOGLE_DATASET_GZ" \
         --google-output "$GOOGLE_PROBS" \
-        --steam-dataset "$STEAM_DATASET_FILE" \
-        --steam-output "$STEAM_PROBS"
+        --google-histograms "$GOOGLE_HISTOGRAMS" \
+        --steam-dataset "$STEAM_DATASET_GZ" \
+        --steam-output "$STEAM_PROBS" \
+        --steam-histograms "$STEAM_HISTOGRAMS" \
+        --sentiment-cache "$STEAM_DATASET_FOLDER/sentiment.sqlite" \
+        --workers $(nproc)
 
 fi
 
@@ -0,0 +1,107 @@
+# =================================================
+# description: Rating histograms of the items of a
+#   dataset, from which the probs of any k and any
+#   threshold are derived without the raw dataset.
+# =================================================
+import bisect
+import json
+from argparse import ArgumentParser
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+# version of the histograms file, to increase each time its layout changes
+HISTOGRAMS_VERSION = 1
+
+
+class RatingHistograms:
+    """Number of ratings of each value given to each item, items being ranked by decreasing number of ratings.
+
+    Ties are ranked by decreasing item id, as the probs were historically built.
+    For each item are kept the counts of the ratings greater or equal to each rating value, so the probability
+    of an item to be rated at least threshold is read in constant time.
+    """
+    def __init__(self, values : List[float], items : List[Tuple[str, List[int]]]):
+        self.values = values
+        self.items = items
+        self.at_least = []
+        for _, counts in items:
+            cumulative = [0] * ( len(values) + 1 )
+            for index in range( len(values) - 1, -1, -1 ):
+                cumulative[index] = cumulative[index + 1] + counts[index]
+            self.at_least.append( cumulative )
+
+    @staticmethod
+    def from_ratings( ratings : Iterable[Tuple[str, float]] ) -> 'RatingHistograms':
+        """Counts the (item id, rating) pairs, read once."""
+        counters = defaultdict( Counter )
+        for item, rating in ratings:
+            counters[item][rating] += 1
+        values = sorted( set().union( *counters.values() ) )
+        ranking = sorted( counters.items(), key=lambda item: ( sum( item[1].values() ), item[0] ), reverse=True )
+        return RatingHistograms( values, [ ( item, [ counter[value] for value in values ] ) for item, counter in ranking ] )
+
+    @staticmethod
+    def load( filename : str ) -> 'RatingHistograms':
+        with open( filename ) as file:
+            content = json.load( file )
+        if content["version"] != HISTOGRAMS_VERSION:
+            raise Exception(f"Histograms {filename} have version {content['version']}, expected {HISTOGRAMS_VERSION}")
+        return RatingHistograms( content["values"], [ ( item, counts ) for item, counts in content["items"] ] )
+
+    def write( self, filename : str ):
+        with open( filename, 'w' ) as file:
+            # one item per line, the file stays readable while compact
+            file.write('{"version": ' + json.dumps( HISTOGRAMS_VERSION ) + ', "values": ' + json.dumps( self.values ) + ', "items": [')
+            for index, item in enumerate( self.items ):
+                file.write( ( ",\n" if index else "\n" ) + json.dumps( list( item ) ) )
+            file.write("\n]}")
+
+    def __len__( self ):
+        return len(self.items)
+
+    def probs( self, k : int, threshold : float ) -> List[float]:
+        """Returns, for the k items having the most ratings, the probability to be rated at least threshold.
+
+        Args:
+            k: Number of items, at most the number of items of the histograms.
+            threshold: Minimal rating of a success.
+        """
+        if not 0 < k <= len(self.items):
+            raise Exception(f"k must be between 1 and {len(self.items)}, got {k}")
+        index = bisect.bisect_left( self.values, threshold )
+        return [ at_least[index] / at_least[0] for at_least in self.at_least[:k] ]
+
+    def probs_grid( self, k_set : List[int], thresholds : List[float] ) -> Dict[int, Dict[float, List[float]]]:
+        """Returns the probs of every k and threshold, indexed as in the probs files."""
+        return {
+            k: { threshold: self.probs( k, threshold ) for threshold in thresholds }
+            for k in k_set
+        }
+
+
+def load_histograms( filename : str ) -> RatingHistograms:
+    return RatingHistograms.load( filename )
+
+def write_probs( filename : str, histograms : RatingHistograms, k_set : List[int], thresholds : List[float] ):
+    with open( filename, 'w' ) as file:
+        file.write( json.dumps( histograms.probs_grid( k_set, thresholds ) ) )
+
+def number( text : str ):
+    value = float( text )
+    return int( value ) if value.is_integer() else value
+
+def createParser():
+    parser = ArgumentParser( description="Derives probs from the rating histograms written by probs-generator.py" )
+    parser.add_argument( "--histograms", required=True, help="Rating histograms of a dataset" )
+    parser.add_argument( "--k", type=int, nargs="+", required=True, help="Numbers of items" )
+    parser.add_argument( "--threshold", type=number, nargs="+", required=True, help="Minimal ratings of a success" )
+    parser.add_argument( "--output", default=None, help="Probs file to write, the probs are printed by default" )
+    return parser
+
+if __name__ == "__main__":
+    args = createParser().parse_args()
+    histograms = load_histograms( args.histograms )
+    if args.output is None:
+        print( json.dumps( histograms.probs_grid( args.k, args.threshold ) ) )
+    else:
+        write_probs( args.output, histograms, args.k, args.threshold )
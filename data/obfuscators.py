@@ -0,0 +1,220 @@
+# =================================================
+# description: Paillier encryption split into an
+#   offline phase, precomputing the obfuscators of a
+#   public key, and an online phase consuming them.
+# =================================================
+import json
+import secrets
+import threading
+import time
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+
+# ------------------------------
+# Offline and online phases
+# A Paillier ciphertext of m is (1 + n)^m * r^n mod n^2, where
+# (1 + n)^m = 1 + n * m mod n^2. The obfuscator r^n mod n^2, which does
+# not depend on m, is the only exponentiation: once precomputed, an
+# encryption costs a single modular multiplication.
+# ------------------------------
+def compute_obfuscators( n : int, count : int ) -> ([int], int):
+    """Returns count obfuscators of the public key of modulus n, and the time spent computing them in nanoseconds."""
+    from phe.util import powmod
+    start = time.perf_counter_ns()
+    nsquare = n * n
+    obfuscators = [ powmod( secrets.randbelow( n - 1 ) + 1, n, nsquare ) for _ in range( count ) ]
+    return obfuscators, time.perf_counter_ns() - start
+
+def encrypt( public_key, value, obfuscator : int, precision : float = None ):
+    """Encrypts the value with the given obfuscator, as public_key.encrypt( value, precision ) would.
+
+    An obfuscator must only be used once.
+    """
+    from phe import paillier
+    encoding = paillier.EncodedNumber.encode( public_key, value, precision )
+    # the encoding of a negative value being n minus its opposite, the same formula holds
+    ciphertext = ( public_key.n * encoding.encoding + 1 ) * obfuscator % public_key.nsquare
+    encrypted = paillier.EncryptedNumber( public_key, ciphertext, encoding.exponent )
+    # already obfuscated, otherwise phe obfuscates it again, with another exponentiation, once serialized
+    encrypted._EncryptedNumber__is_obfuscated = True
+    return encrypted
+
+def check_obfuscated( encrypted ):
+    """Raises an Exception if serializing the encrypted number computes an exponentiation, that is if it was not
+    marked as obfuscated."""
+    from phe import paillier
+    powmod = paillier.powmod
+    def exponentiation( *args ):
+        raise Exception("Serializing an encrypted number computed an exponentiation, it was not marked as obfuscated")
+    paillier.powmod = exponentiation
+    try:
+        encrypted.ciphertext()
+    finally:
+        paillier.powmod = powmod
+
+
+class ObfuscatorPool:
+    """Obfuscators of a Paillier public key, precomputed ahead of the encryptions.
+
+    Once started, a background thread refills the pool up to its capacity each time it falls to its low watermark,
+    computing the obfuscators in worker processes if any, so the encryptions between two refills only cost a modular
+    multiplication. An encryption finding the pool empty computes its obfuscator itself, and counts as a miss.
+
+    The ciphertexts are marked as obfuscated through a private field of phe, which is checked once the pool is
+    created: a version of phe without it raises an Exception, rather than obfuscating them again once serialized.
+
+    Args:
+        public_key: Paillier public key the values are encrypted with.
+        capacity: Number of obfuscators the pool is filled up to.
+        low_watermark: Number of obfuscators left when the pool is refilled, half the capacity by default.
+        workers: Number of worker processes computing the obfuscators, the background thread computes them by default.
+        batch_size: Number of obfuscators computed at once by a worker.
+    """
+    def __init__(self, public_key, capacity : int = 1024, low_watermark : int = None, workers : int = None, batch_size : int = 32):
+        self.public_key = public_key
+        self.capacity = capacity
+        self.low_watermark = capacity // 2 if low_watermark is None else low_watermark
+        self.workers = workers
+        self.batch_size = batch_size
+        self.available = deque()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.executor = None
+        self.closed = False
+        # offline phase: obfuscators computed and the time spent computing them, summed over the workers
+        self.offline_count = 0
+        self.offline_time_ns = 0
+        # online phase: encryptions using a precomputed obfuscator and the time they took
+        self.online_count = 0
+        self.online_time_ns = 0
+        # encryptions which found the pool empty and the time they took
+        self.misses = 0
+        self.miss_time_ns = 0
+        # 1 is an obfuscator computed without exponentiation, the checked ciphertext is discarded
+        check_obfuscated( encrypt( public_key, 0, 1 ) )
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_val, exc_tb ):
+        self.close()
+
+    def __len__( self ):
+        return len(self.available)
+
+    def add( self, obfuscators : [int], elapsed_ns : int ):
+        with self.condition:
+            self.available.extend( obfuscators )
+            self.offline_count += len(obfuscators)
+            self.offline_time_ns += elapsed_ns
+            self.condition.notify_all()
+
+    def batches( self, count : int ) -> [int]:
+        return [ min( self.batch_size, count - start ) for start in range( 0, count, self.batch_size ) ]
+
+    def compute( self, count : int ):
+        """Computes count obfuscators in the current thread, or in the worker processes if any, and adds them."""
+        if self.executor is not None:
+            results = self.executor.map( compute_obfuscators, repeat( self.public_key.n ), self.batches( count ) )
+        else:
+            results = ( compute_obfuscators( self.public_key.n, batch ) for batch in self.batches( count ) )
+        for obfuscators, elapsed_ns in results:
+            self.add( obfuscators, elapsed_ns )
+
+    def fill( self ):
+        """Fills the pool up to its capacity, in the current thread."""
+        self.compute( self.capacity - len(self.available) )
+
+    def start( self ) -> 'ObfuscatorPool':
+        """Starts refilling the pool in the background."""
+        if self.workers is not None and self.executor is None:
+            self.executor = ProcessPoolExecutor( self.workers )
+        if self.thread is None:
+            self.thread = threading.Thread( target=self.refill, daemon=True )
+            self.thread.start()
+        return self
+
+    def refill( self ):
+        while True:
+            with self.condition:
+                self.condition.wait_for( lambda: self.closed or len(self.available) <= self.low_watermark )
+                if self.closed:
+                    return
+                missing = self.capacity - len(self.available)
+            self.compute( missing )
+
+    def take( self ) -> int:
+        """Returns a precomputed obfuscator, or None if the pool is empty."""
+        with self.condition:
+            if not self.available:
+                return None
+            obfuscator = self.available.popleft()
+            if len(self.available) <= self.low_watermark:
+                self.condition.notify_all()
+            return obfuscator
+
+    def encrypt( self, value, precision : float = None ):
+        """Encrypts the value with the public key of the pool, see encrypt."""
+        start = time.perf_counter_ns()
+        obfuscator = self.take()
+        if obfuscator is None:
+            encrypted = encrypt( self.public_key, value, compute_obfuscators( self.public_key.n, 1 )[0][0], precision )
+            self.misses += 1
+            self.miss_time_ns += time.perf_counter_ns() - start
+            return encrypted
+        encrypted = encrypt( self.public_key, value, obfuscator, precision )
+        self.online_count += 1
+        self.online_time_ns += time.perf_counter_ns() - start
+        return encrypted
+
+    def close( self ):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def stats( self ) -> dict:
+        """Returns the throughput of the offline and online phases, and of the encryptions missing the pool, in
+        operations per second. The offline time is summed over the workers."""
+        throughput = lambda count, time_ns: count / ( time_ns / 1e9 ) if time_ns else 0.
+        return {
+            "offline": { "obfuscators": self.offline_count, "time_s": self.offline_time_ns / 1e9, "per_second": throughput( self.offline_count, self.offline_time_ns ) },
+            "online": { "encryptions": self.online_count, "time_s": self.online_time_ns / 1e9, "per_second": throughput( self.online_count, self.online_time_ns ) },
+            "misses": { "encryptions": self.misses, "time_s": self.miss_time_ns / 1e9, "per_second": throughput( self.misses, self.miss_time_ns ) },
+            "available": len(self.available),
+        }
+
+
+def createParser():
+    parser = ArgumentParser( description="Measures the throughput of the offline and online phases of Paillier encryption" )
+    parser.add_argument( "--key-size", type=int, default=2048, help="Paillier key size, in bits" )
+    parser.add_argument( "--encryptions", type=int, default=1000, help="Number of values encrypted" )
+    parser.add_argument( "--capacity", type=int, default=256, help="Number of obfuscators the pool is filled up to" )
+    parser.add_argument( "--workers", type=int, default=None, help="Number of worker processes refilling the pool, a background thread by default" )
+    parser.add_argument( "--batch-size", type=int, default=32, help="Number of obfuscators computed at once by a worker" )
+    return parser
+
+if __name__ == "__main__":
+    from phe import paillier
+    args = createParser().parse_args()
+    public_key, private_key = paillier.generate_paillier_keypair( n_length=args.key_size )
+    with ObfuscatorPool( public_key, args.capacity, workers=args.workers, batch_size=args.batch_size ) as pool:
+        pool.fill()
+        pool.start()
+        start = time.perf_counter()
+        values = [ secrets.randbelow( 100000 ) for _ in range( args.encryptions ) ]
+        encrypted = [ pool.encrypt( value ) for value in values ]
+        elapsed = time.perf_counter() - start
+        if [ private_key.decrypt( value ) for value in encrypted[:10] ] != values[:10]:
+            raise Exception("Decrypted values do not match the encrypted ones")
+        for value in encrypted:
+            check_obfuscated( value )
+        print( json.dumps( dict( pool.stats(), wall_time_s=elapsed ), indent=4 ) )
@@ -0,0 +1,90 @@
+# =================================================
+# description: Packing of several fixed-point values
+#   in the slots of a single Paillier plaintext, so
+#   fewer ciphertexts are encrypted, sent and added.
+# =================================================
+from math import ceil
+
+
+class PackedEncoding:
+    """Layout of fixed-point values packed in the slots of Paillier plaintexts.
+
+    A value is scaled by 1 / precision, rounded, and shifted by bound / precision when negative values are packed,
+    then written in a slot of slot_bits bits. Adding packed ciphertexts adds their slots one by one: each slot keeps
+    enough headroom for the given number of additions without overflowing into the next one. The slots fill the
+    plaintext up to n / 4, below the largest positive integer encoded by phe.
+
+    Args:
+        public_key: Paillier public key the values are encrypted with.
+        bound: Largest absolute value of a packed value.
+        precision: Difference between two consecutive packed values, 1 for integers.
+        additions: Number of packed ciphertexts which may be added together.
+        signed: Whether negative values are packed.
+    """
+    def __init__(self, public_key, bound : float, precision : float = 1, additions : int = 1, signed : bool = False):
+        self.public_key = public_key
+        self.bound = bound
+        self.scale = 1 / precision
+        self.additions = additions
+        self.offset = ceil( bound * self.scale ) if signed else 0
+        largest_slot = ( ceil( bound * self.scale ) + self.offset ) * additions
+        self.slot_bits = max( largest_slot.bit_length(), 1 )
+        self.slots = ( public_key.n.bit_length() - 3 ) // self.slot_bits
+        if self.slots == 0:
+            raise Exception(f"A slot of {self.slot_bits} bits does not fit in a key of {public_key.n.bit_length()} bits")
+
+    def nb_ciphertexts( self, count : int ) -> int:
+        """Returns the number of ciphertexts count values are packed in."""
+        return ceil( count / self.slots )
+
+    def pack( self, values : [float] ) -> [int]:
+        """Returns the plaintexts in which the values are packed, in order."""
+        plaintexts = []
+        for start in range( 0, len(values), self.slots ):
+            plaintext = 0
+            for slot, value in enumerate( values[start:start + self.slots] ):
+                if abs( value ) > self.bound or ( value < 0 and not self.offset ):
+                    raise Exception(f"Cannot pack {value}, expected a value between {-self.bound if self.offset else 0} and {self.bound}")
+                plaintext |= ( round( value * self.scale ) + self.offset ) << ( slot * self.slot_bits )
+            plaintexts.append( plaintext )
+        return plaintexts
+
+    def unpack( self, plaintexts : [int], count : int, additions : int = 1 ) -> [float]:
+        """Returns the count values packed in the plaintexts, each being the sum of additions packed values."""
+        if additions > self.additions:
+            raise Exception(f"Slots only have headroom for {self.additions} additions, got {additions}")
+        mask = ( 1 << self.slot_bits ) - 1
+        values = [
+            ( ( plaintext >> ( slot * self.slot_bits ) & mask ) - self.offset * additions ) / self.scale
+            for plaintext in plaintexts
+            for slot in range( self.slots )
+        ]
+        return values[:count]
+
+    def encrypt( self, values : [float], encrypt = None ) -> list:
+        """Packs and encrypts the values.
+
+        Args:
+            encrypt: Function encrypting a plaintext, such as ObfuscatorPool.encrypt, the public key by default.
+        """
+        encrypt = encrypt or self.public_key.encrypt
+        return [ encrypt( plaintext ) for plaintext in self.pack( values ) ]
+
+    def decrypt( self, private_key, ciphertexts : list, count : int, additions : int = 1 ) -> [float]:
+        """Decrypts and unpacks count values, each being the sum of additions packed values."""
+        return self.unpack( [ private_key.decrypt( ciphertext ) for ciphertext in ciphertexts ], count, additions )
+
+
+def add_packed( packed_ciphertexts : [list] ) -> list:
+    """Adds, slot by slot, lists of ciphertexts packed with the same encoding, the shorter ones holding zeros.
+
+    With signed values, a missing slot lacks the offset of its value: the lists must then pack as many values.
+    """
+    total = []
+    for ciphertexts in packed_ciphertexts:
+        for index, ciphertext in enumerate( ciphertexts ):
+            if index < len(total):
+                total[index] = total[index] + ciphertext
+            else:
+                total.append( ciphertext )
+    return total
@@ -6,16 +6,27 @@
 #   rewards cumulated by each algorithm.
 # =================================================
 from abc import abstractmethod
-from random import random, seed, randint, choices, getstate, shuffle, setstate, betavariate
+from random import random, seed, randint, choices, getstate, shuffle, setstate, betavariate, Random
 from typing import AbstractSet, NoReturn
-from math import sqrt, log, e, exp
+from math import sqrt, log, e, exp, cos, pi
+from bisect import bisect_right
+from functools import lru_cache
 import json
 from os.path import join
 import time
 import os
-from phe import paillier
-from Crypto.Random import get_random_bytes
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+import hashlib
+import io
+import struct
+import zlib
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from siblings import import_sibling
+
+# version of the simulator, to increase each time the recorded executions change for the same inputs
+SIMULATOR_VERSION = 2
 
 # =================================================
 # This section contains the utils components used
@@ -49,12 +60,199 @@ class IsolatedRandomGenerator:
         value = choices( items, weights=weights, k=1 )[0]
         return value
 
+    def choice_draw(self, t) -> float:
+        """Returns the random float between 0 and 1 drawn by choice at a given time step, to be scaled by the total weight."""
+        seed(self.seed + t)
+        return random()
+
+
+# -------------------------------------------------
+# Counter-based random generator
+# -------------------------------------------------
+# Philox4x32-10 (Salmon et al., "Parallel random numbers: as easy as 1, 2, 3"): a draw is a pure
+# function of a 64 bits key and a 128 bits counter, so nothing has to be reseeded between two draws.
+# The key holds the seed, the counter holds (turn, stream, index).
+PHILOX_M0, PHILOX_M1 = 0xD2511F53, 0xCD9E8D57
+PHILOX_W0, PHILOX_W1 = 0x9E3779B9, 0xBB67AE85
+PHILOX_ROUNDS = 10
+MASK_32 = 0xFFFFFFFF
+
+def philox_uniform( seed : int, turn : int, stream : int, index : int = 0 ) -> float:
+    """Returns the uniform float in [0, 1) drawn for the given seed, turn, stream and index."""
+    k0, k1 = seed & MASK_32, (seed >> 32) & MASK_32
+    c0, c1, c2, c3 = turn & MASK_32, (turn >> 32) & MASK_32, stream & MASK_32, index & MASK_32
+    for round in range(PHILOX_ROUNDS):
+        if round:
+            k0, k1 = (k0 + PHILOX_W0) & MASK_32, (k1 + PHILOX_W1) & MASK_32
+        p0, p1 = PHILOX_M0 * c0, PHILOX_M1 * c2
+        c0, c1, c2, c3 = (p1 >> 32) ^ c1 ^ k0, p1 & MASK_32, (p0 >> 32) ^ c3 ^ k1, p0 & MASK_32
+    # 53 random bits, as done by random.random()
+    return ((c0 >> 5) * 67108864 + (c1 >> 6)) / 9007199254740992
+
+def philox_uniforms( seeds, turns, stream, index = 0 ) -> np.ndarray:
+    """Vectorized philox_uniform: arguments are broadcast together and a uniform is drawn for each cell.
+
+    Returns exactly the same values as philox_uniform, e.g. philox_uniforms(seed, np.arange(1, T + 1), stream)
+    draws the values of a whole execution at once.
+    """
+    seeds, turns, stream, index = np.broadcast_arrays(
+        np.asarray(seeds, dtype=np.uint64), np.asarray(turns, dtype=np.uint64),
+        np.asarray(stream, dtype=np.uint64), np.asarray(index, dtype=np.uint64),
+    )
+    mask = np.uint64(MASK_32)
+    shift = np.uint64(32)
+    k0, k1 = seeds & mask, (seeds >> shift) & mask
+    c0, c1, c2, c3 = turns & mask, (turns >> shift) & mask, stream & mask, index & mask
+    for round in range(PHILOX_ROUNDS):
+        if round:
+            k0, k1 = (k0 + np.uint64(PHILOX_W0)) & mask, (k1 + np.uint64(PHILOX_W1)) & mask
+        p0, p1 = np.uint64(PHILOX_M0) * c0, np.uint64(PHILOX_M1) * c2
+        c0, c1, c2, c3 = (p1 >> shift) ^ c1 ^ k0, p1 & mask, (p0 >> shift) ^ c3 ^ k1, p0 & mask
+    return ((c0 >> np.uint64(5)) * np.uint64(67108864) + (c1 >> np.uint64(6))) / 9007199254740992
+
+
+class CounterRandomGenerator(IsolatedRandomGenerator):
+    """
+    Random number generator keyed on (seed, turn, stream), built upon Philox4x32-10.
+
+    It provides the same guarantee than IsolatedRandomGenerator (same seed and turn give the same value) without
+    reseeding the global Mersenne Twister at each draw, and is able to produce blocks of draws for many turns at once.
+    Single draws are served from a block of BLOCK_SIZE consecutive turns computed at once with numpy.
+    """
+    RANDOM_STREAM = 0
+    RANDINT_STREAM = 1
+    CHOICE_STREAM = 2
+    BETA_ALPHA_STREAM = 3
+    BETA_BETA_STREAM = 4
+    PERMUTATION_STREAM = 5
+    BLOCK_SIZE = 1024
+
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.blocks = {}
+
+    def draw(self, t, stream, index = 0) -> float:
+        """Returns philox_uniform(seed, t, stream, index), keeping the last computed block of each stream and index."""
+        block_number, offset = divmod(t, CounterRandomGenerator.BLOCK_SIZE)
+        cached_block_number, block = self.blocks.get((stream, index), (None, None))
+        if cached_block_number != block_number:
+            first_turn = block_number * CounterRandomGenerator.BLOCK_SIZE
+            turns = np.arange(first_turn, first_turn + CounterRandomGenerator.BLOCK_SIZE)
+            block = philox_uniforms(self.seed, turns, stream, index).tolist()
+            self.blocks[(stream, index)] = (block_number, block)
+        return block[offset]
+
+    def random(self, t, stream = RANDOM_STREAM) -> float:
+        """Returns a random float between 0 and 1 given a time step."""
+        return self.draw(t, stream)
+
+    def randint(self, t, min, max) -> int:
+        """
+        Returns a random int between min and max includes given a time step.
+        """
+        return min + int(self.draw(t, CounterRandomGenerator.RANDINT_STREAM) * (max - min + 1))
+
+    def choice(self, items, weights, t):
+        """Returns randomly a item contained in a given list of items, with a given probability weights."""
+        # same rule as random.choices
+        items = list(items)
+        cumulative_weights = []
+        total = 0
+        for weight in weights:
+            total += weight
+            cumulative_weights.append(total)
+        value = self.draw(t, CounterRandomGenerator.CHOICE_STREAM) * total
+        index = bisect_right(cumulative_weights, value, 0, len(items) - 1)
+        return items[index]
+
+    def choice_draw(self, t) -> float:
+        """Returns the random float between 0 and 1 drawn by choice at a given time step, to be scaled by the total weight."""
+        return self.draw(t, CounterRandomGenerator.CHOICE_STREAM)
+
+    def gammavariate(self, t, alpha, stream) -> float:
+        """Returns a Gamma(alpha, 1) variate for alpha >= 1 given a time step (Marsaglia and Tsang method).
+
+        Each attempt consumes three draws of the stream: two for the normal variate, one for the acceptance test.
+        """
+        d = alpha - 1. / 3.
+        c = 1. / sqrt(9. * d)
+        attempt = 0
+        while True:
+            u1, u2, u = (self.draw(t, stream, 3 * attempt + i) for i in range(3))
+            attempt += 1
+            x = sqrt(-2. * log(1. - u1)) * cos(2. * pi * u2)
+            v = (1. + c * x) ** 3
+            if v > 0 and log(1. - u) < 0.5 * x * x + d - d * v + d * log(v):
+                return d * v
+
+    def betavariate(self, t, alpha, beta) -> float:
+        """Returns a Beta(alpha, beta) variate for alpha, beta >= 1 given a time step."""
+        x = self.gammavariate(t, alpha, CounterRandomGenerator.BETA_ALPHA_STREAM)
+        y = self.gammavariate(t, beta, CounterRandomGenerator.BETA_BETA_STREAM)
+        return x / (x + y)
+
+    def permutation(self, nb_items, t) -> [int]:
+        """Returns a random permutation of range(nb_items) given a time step (Fisher-Yates shuffle)."""
+        permuted_index = [i for i in range(nb_items)]
+        for i in range(nb_items - 1, 0, -1):
+            j = int(self.draw(t, CounterRandomGenerator.PERMUTATION_STREAM, i) * (i + 1))
+            permuted_index[i], permuted_index[j] = permuted_index[j], permuted_index[i]
+        return permuted_index
+
+    def random_block(self, turns, stream = RANDOM_STREAM) -> np.ndarray:
+        """Returns the values of random(t) for every turn t of the given array of turns."""
+        return philox_uniforms(self.seed, turns, stream)
+
+
+def gammavariates( seeds, t, alphas, stream ) -> np.ndarray:
+    """Vectorized CounterRandomGenerator.gammavariate: one variate per (seed, alpha) cell at the time step t."""
+    seeds, alphas = np.broadcast_arrays(np.asarray(seeds, dtype=np.uint64), np.asarray(alphas, dtype=np.float64))
+    d = alphas - 1. / 3.
+    c = 1. / np.sqrt(9. * d)
+    values = np.zeros(alphas.shape)
+    pending = np.ones(alphas.shape, dtype=bool)
+    attempt = 0
+    while pending.any():
+        u1, u2, u = (philox_uniforms(seeds[pending], t, stream, 3 * attempt + i) for i in range(3))
+        attempt += 1
+        x = np.sqrt(-2. * np.log(1. - u1)) * np.cos(2. * pi * u2)
+        v = (1. + c[pending] * x) ** 3
+        with np.errstate(invalid='ignore', divide='ignore'):
+            accepted = (v > 0) & (np.log(1. - u) < 0.5 * x * x + d[pending] - d[pending] * v + d[pending] * np.log(v))
+        indexes = np.flatnonzero(pending)[accepted]
+        values.flat[indexes] = (d[pending] * v)[accepted]
+        pending.flat[indexes] = False
+    return values
+
+def betavariates( seeds, t, alphas, betas ) -> np.ndarray:
+    """Vectorized CounterRandomGenerator.betavariate: one variate per (seed, alpha, beta) cell at the time step t."""
+    x = gammavariates(seeds, t, alphas, CounterRandomGenerator.BETA_ALPHA_STREAM)
+    y = gammavariates(seeds, t, betas, CounterRandomGenerator.BETA_BETA_STREAM)
+    return x / (x + y)
+
+
+MERSENNE_RNG = "mersenne"
+COUNTER_RNG = "counter"
+# random generator used by the strategies, either the reseeded Mersenne Twister or the counter-based generator
+rng_mode = MERSENNE_RNG
+
+@lru_cache(maxsize=1024)
+def counter_random_generator( seed ) -> CounterRandomGenerator:
+    """Returns the counter-based generator of a seed, shared to reuse its blocks of draws."""
+    return CounterRandomGenerator(seed)
+
+def new_random_generator( seed ) -> IsolatedRandomGenerator:
+    """Returns the random generator of the current rng mode, controlled by the given seed."""
+    if rng_mode == COUNTER_RNG:
+        return CounterRandomGenerator(seed)
+    return IsolatedRandomGenerator(seed)
+
 
 class IsolatedBernoulliArm:
     """Simulates a bandit arm which returns a reward with a given probability, with respect to a reward seed."""
     def __init__(self, p, seed):
         self.p = p
-        self.random_generator = IsolatedRandomGenerator(seed=seed)
+        self.random_generator = new_random_generator(seed=seed)
 
     def pull(self, t) -> int:
         """Returns a reward 0 or 1 randomly with respect to a time step t."""
@@ -65,7 +263,30 @@ class IsolatedBernoulliArm:
         return str(self.p)
 
 
+COLUMNAR_MAGIC = b"SAMBACOL"
+COLUMNAR_VERSION = 1
+COLUMNAR_DTYPES = { 'i': '<i4', 'd': '<f8' }
+# in delta-encoded executions, the counters of the arms are only written every KEYFRAME_INTERVAL turns
+KEYFRAME_INTERVAL = 100
+# number of turns between two flushes of the compressed JSON files, see ExecutionHistory.write_gzip_json
+GZIP_BLOCK_TURNS = 100
+GZIP_INDEX_MAGIC = b"SAMBAGZI"
+GZIP_INDEX_VERSION = 1
+
+# gzip header without file name nor timestamp, so that the compressed files only depend on their content
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
 class ExecutionHistory:
+    """Execution of a strategy, stored column by column.
+
+    Each per-turn field is a contiguous typed array whose rows are the turns, per-arm fields holding nb_arms values
+    per row. Turns are only converted to the dict/JSON shape by export_as_dict and write_json.
+    """
+    __slots__ = (
+        "nb_arms", "probs", "budget", "execution_time", "initial_exploration", "parameters",
+        "turn", "scores", "integral_scores", "selected_arm", "reward", "cumulative_reward", "nb_rewards", "nb_pulls",
+    )
+
     def __init__(self, probs: [float], budget: int) -> None:
         self.nb_arms = len(probs)
         self.probs = probs
@@ -75,8 +296,17 @@ class ExecutionHistory:
             "rewards": [],
             "pulls": [],
         }
-        self.turns = []
         self.parameters = []
+        # counters are stored on 32 bits, budgets are expected to stay below 2^31 turns
+        self.turn = array('i')
+        self.scores = array('d')
+        # 1 when the scores of the turn are integers, as those of a random pull of epsilon-greedy, exported as such
+        self.integral_scores = array('b')
+        self.selected_arm = array('i')
+        self.reward = array('i')
+        self.cumulative_reward = array('i')
+        self.nb_rewards = array('i')
+        self.nb_pulls = array('i')
     
     def addParameter(self, name :str, value : float ):
         self.parameters.append({ "name": name, "value": value })
@@ -90,36 +320,254 @@ class ExecutionHistory:
             "pulls": pulls
         }
 
+    def nb_turns( self ) -> int:
+        return len(self.turn)
+
     def add_data_by_turn( self, turn : int, scores : [float], selectedArm : int, reward : int, nbPulls : [int], nbRewards: [int] ):
         # compute the cumulative reward based on the previous turn
-        if self.turns:
-            cumulative_reward = self.turns[-1]["cumulative_reward"] + reward
+        if self.cumulative_reward:
+            cumulative_reward = self.cumulative_reward[-1] + reward
         else:
             cumulative_reward = sum(self.initial_exploration["rewards"]) + reward
 
-        self.turns.append({
-            'turn': turn,
-            'scores': scores,
-            'selected_arm': selectedArm,
-            'reward': reward,
-            'cumulative_reward': cumulative_reward,
-            'nb_rewards': nbRewards,
-            'nb_pulls': nbPulls,
-        })
-
-    def export_as_dict( self ):
-        return {
+        self.turn.append(turn)
+        self.scores.extend(scores)
+        self.integral_scores.append(all( isinstance(score, int) for score in scores ))
+        self.selected_arm.append(selectedArm)
+        self.reward.append(reward)
+        self.cumulative_reward.append(cumulative_reward)
+        self.nb_rewards.extend(nbRewards)
+        self.nb_pulls.extend(nbPulls)
+
+    def add_turns( self, turns : np.ndarray, scores : np.ndarray, selectedArms : np.ndarray, rewards : np.ndarray, nbPulls : np.ndarray, nbRewards : np.ndarray, integralScores : np.ndarray = None ):
+        """Appends several turns at once, given as arrays whose rows are the turns."""
+        previous = self.cumulative_reward[-1] if self.cumulative_reward else sum(self.initial_exploration["rewards"])
+        if integralScores is None:
+            integralScores = np.zeros(len(turns), dtype=bool)
+        self.turn.frombytes( np.ascontiguousarray(turns, dtype=np.int32).tobytes() )
+        self.scores.frombytes( np.ascontiguousarray(scores, dtype=np.float64).tobytes() )
+        self.integral_scores.frombytes( np.ascontiguousarray(integralScores, dtype=np.int8).tobytes() )
+        self.selected_arm.frombytes( np.ascontiguousarray(selectedArms, dtype=np.int32).tobytes() )
+        self.reward.frombytes( np.ascontiguousarray(rewards, dtype=np.int32).tobytes() )
+        self.cumulative_reward.frombytes( (previous + np.cumsum(rewards, dtype=np.int64)).astype(np.int32).tobytes() )
+        self.nb_rewards.frombytes( np.ascontiguousarray(nbRewards, dtype=np.int32).tobytes() )
+        self.nb_pulls.frombytes( np.ascontiguousarray(nbPulls, dtype=np.int32).tobytes() )
+
+    def is_keyframe( self, index : int, keyframe_interval : int = None ) -> bool:
+        """Returns whether the index-th recorded turn holds the counters of the arms when delta-encoded.
+
+        Without keyframe_interval, every turn is a keyframe. Otherwise, the first turn, every keyframe_interval-th
+        turn and the turns not following the previous recorded turn are, so the counters of the other turns are
+        obtained by adding the reward to the counters of the selected arm at the previous turn.
+        """
+        return keyframe_interval is None or index % keyframe_interval == 0 or self.turn[index] != self.turn[index - 1] + 1
+
+    def turn_as_dict( self, index : int, keyframe : bool = True ) -> dict:
+        """Returns the index-th recorded turn in the dict shape of the exported executions, without the counters of the arms unless keyframe."""
+        arms = slice(index * self.nb_arms, (index + 1) * self.nb_arms)
+        scores = self.scores[arms].tolist()
+        turn = {
+            'turn': self.turn[index],
+            'scores': [ int(score) for score in scores ] if self.integral_scores[index] else scores,
+            'selected_arm': self.selected_arm[index],
+            'reward': self.reward[index],
+            'cumulative_reward': self.cumulative_reward[index],
+        }
+        if keyframe:
+            turn['nb_rewards'] = self.nb_rewards[arms].tolist()
+            turn['nb_pulls'] = self.nb_pulls[arms].tolist()
+        return turn
+
+    def export_as_dict( self, keyframe_interval : int = None ):
+        """Returns the execution as a dict, delta-encoded when a keyframe_interval is given, see is_keyframe."""
+        execution = {
             'params': self.parameters,
             "nb_arms": self.nb_arms,
             "probs": self.probs,
             "budget": self.budget,
             "initial_exploration": self.initial_exploration,
-            "turns": self.turns,
+            "turns": [ self.turn_as_dict( index, self.is_keyframe( index, keyframe_interval ) ) for index in range(self.nb_turns()) ],
             "execution_time": {
                 "time": self.execution_time,
                 "budget": self.budget,
             },
         }
+        if keyframe_interval is not None:
+            execution["keyframe_interval"] = keyframe_interval
+        return execution
+
+    def write_json( self, file, index_file = None, keyframe_interval = None ):
+        """Writes json.dumps(self.export_as_dict( keyframe_interval )) in the given file, one turn at a time.
+
+        When an index file is given, the turn index of the JSON file is written in it as little-endian uint64:
+        the first turn, the number of turns, the offset of the first turn, the offset of the "]" closing the
+        turns, then the offset following each turn. The first turns of the execution can then be read without
+        parsing the rest of the file: file[:end of the last kept turn] + file[offset of "]":] is valid JSON.
+        """
+        # json.dumps escapes non-ASCII characters, so the length of the text is its size in bytes
+        position = 0
+        def write( text ):
+            nonlocal position
+            file.write( text )
+            position += len(text)
+
+        write('{"params": ' + json.dumps(self.parameters))
+        write(', "nb_arms": ' + json.dumps(self.nb_arms))
+        write(', "probs": ' + json.dumps(self.probs))
+        write(', "budget": ' + json.dumps(self.budget))
+        write(', "initial_exploration": ' + json.dumps(self.initial_exploration))
+        if keyframe_interval is not None:
+            write(', "keyframe_interval": ' + json.dumps(keyframe_interval))
+        write(', "turns": [')
+        turns_offset = position
+        turn_ends = array('Q')
+        for index in range(self.nb_turns()):
+            if index:
+                write(', ')
+            write(json.dumps(self.turn_as_dict( index, self.is_keyframe( index, keyframe_interval ) )))
+            turn_ends.append( position )
+        tail_offset = position
+        write('], "execution_time": ' + json.dumps({ "time": self.execution_time, "budget": self.budget }) + '}')
+
+        if index_file is not None:
+            first_turn = self.turn[0] if self.nb_turns() else 0
+            index_file.write( struct.pack( '<QQQQ', first_turn, self.nb_turns(), turns_offset, tail_offset ) )
+            if sys.byteorder != 'little':
+                turn_ends.byteswap()
+            index_file.write( turn_ends.tobytes() )
+
+    def write_gzip_json( self, file, index_file ):
+        """Writes the JSON file of write_json compressed with gzip, in the given binary file.
+
+        The compressed data is flushed to a byte boundary after the JSON up to the first turn, with a full flush so
+        the turns never refer to it, then after every GZIP_BLOCK_TURNS turns. The compressed first turns can then be
+        served by compressing the JSON up to the first turn on the fly, its fields possibly replaced, followed by a
+        copy of the data up to such a boundary, then by the remaining turns and the end of the JSON compressed on the
+        fly. The index file holds the GZIP_INDEX_MAGIC bytes, the format version and the number of turns per block as
+        little-endian uint32, and the number of blocks as little-endian uint64, then for each boundary the offset of
+        the compressed data following it and the CRC-32 of the JSON preceding it as little-endian uint64.
+        """
+        text, index = io.StringIO(), io.BytesIO()
+        self.write_json( text, index )
+        text = text.getvalue().encode('utf-8')
+        turns_offset, tail_offset = struct.unpack_from( '<QQ', index.getvalue(), 16 )
+        turn_ends = np.frombuffer( index.getvalue(), dtype='<u8', offset=32 )
+        nb_blocks = -(-self.nb_turns() // GZIP_BLOCK_TURNS)
+        bounds = [ 0, turns_offset ] + [ int(turn_ends[min( (block + 1) * GZIP_BLOCK_TURNS, self.nb_turns() ) - 1]) for block in range(nb_blocks) ]
+
+        compressor = zlib.compressobj( 9, zlib.DEFLATED, -zlib.MAX_WBITS )
+        file.write( GZIP_HEADER )
+        boundaries = array('Q')
+        crc = 0
+        for start, stop in zip( bounds, bounds[1:] ):
+            file.write( compressor.compress( text[start:stop] ) + compressor.flush( zlib.Z_FULL_FLUSH if start == 0 else zlib.Z_SYNC_FLUSH ) )
+            crc = zlib.crc32( text[start:stop], crc )
+            boundaries.extend([ file.tell(), crc ])
+        file.write( compressor.compress( text[bounds[-1]:] ) + compressor.flush() )
+        file.write( struct.pack( '<II', zlib.crc32( text[bounds[-1]:], crc ), len(text) & 0xffffffff ) )
+
+        index_file.write( GZIP_INDEX_MAGIC + struct.pack( '<IIQ', GZIP_INDEX_VERSION, GZIP_BLOCK_TURNS, nb_blocks ) )
+        if sys.byteorder != 'little':
+            boundaries.byteswap()
+        index_file.write( boundaries.tobytes() )
+
+    def select_turns( self, rows ) -> 'ExecutionHistory':
+        """Returns a copy of the execution keeping only the turns of the given rows."""
+        selection = ExecutionHistory( self.probs, self.budget )
+        selection.execution_time = self.execution_time
+        selection.initial_exploration = self.initial_exploration
+        selection.parameters = self.parameters
+        rows = np.asarray( rows, dtype=np.int64 )
+        arms_rows = ( rows[:, None] * self.nb_arms + np.arange( self.nb_arms ) ).ravel()
+        for name, arms in [ ("turn", False), ("scores", True), ("integral_scores", False), ("selected_arm", False), ("reward", False),
+                            ("cumulative_reward", False), ("nb_rewards", True), ("nb_pulls", True) ]:
+            values = getattr( self, name )
+            selected = np.frombuffer( values, dtype=values.typecode )[ arms_rows if arms else rows ]
+            getattr( selection, name ).frombytes( selected.tobytes() )
+        return selection
+
+    def write_columnar( self, file, levels = () ):
+        """Writes the execution in the columnar binary format read by the API, in the given binary file.
+
+        Layout: the COLUMNAR_MAGIC bytes, the format version and the header length as little-endian uint32,
+        a JSON header padded with spaces to a multiple of 8 bytes, then the columns as flat little-endian
+        arrays whose rows are the turns. The header holds the non per-turn fields, "nb_turns", "first_turn"
+        when the turns are consecutive, the decimation "levels" written aside, and for each column its dtype,
+        its width (values per turn) and its offset from the start of the columns.
+        """
+        columns = [
+            ("turn", self.turn, 1),
+            ("scores", self.scores, self.nb_arms),
+            ("selected_arm", self.selected_arm, 1),
+            ("reward", self.reward, 1),
+            ("cumulative_reward", self.cumulative_reward, 1),
+            ("nb_rewards", self.nb_rewards, self.nb_arms),
+            ("nb_pulls", self.nb_pulls, self.nb_arms),
+        ]
+        descriptions = {}
+        offset = 0
+        for name, values, width in columns:
+            descriptions[name] = { "dtype": COLUMNAR_DTYPES[values.typecode], "width": width, "offset": offset }
+            # each column starts on a multiple of 8 bytes
+            offset += -(-len(values) * values.itemsize // 8) * 8
+        header = {
+            "params": self.parameters,
+            "nb_arms": self.nb_arms,
+            "probs": self.probs,
+            "budget": self.budget,
+            "initial_exploration": self.initial_exploration,
+            "execution_time": { "time": self.execution_time, "budget": self.budget },
+            "nb_turns": self.nb_turns(),
+            "levels": list(levels),
+            "columns": descriptions,
+        }
+        if self.nb_turns() == 0 or self.turn[-1] - self.turn[0] == self.nb_turns() - 1:
+            # turns are consecutive, so the rows of the first turns up to a budget are known without searching
+            header["first_turn"] = self.turn[0] if self.nb_turns() else 0
+        header = json.dumps( header ).encode('utf-8')
+        header += b' ' * (-len(header) % 8)
+
+        file.write( COLUMNAR_MAGIC + struct.pack('<II', COLUMNAR_VERSION, len(header)) + header )
+        for name, values, width in columns:
+            if sys.byteorder != 'little':
+                values = array(values.typecode, values)
+                values.byteswap()
+            data = values.tobytes()
+            file.write( data + b'\0' * (-len(data) % 8) )
+
+# values of the arrays recording the turns played by the large-K and batch engines, appended to the execution
+# histories each time they are full, so the memory they use does not grow with the budget
+PLAY_CHUNK_VALUES = 1 << 20
+
+# maximal number of turns of the decimated copies of an execution, written along with its columnar file
+DECIMATION_LEVELS = ( 100, 1000, 10000, 100000 )
+
+def decimation_levels( nb_turns : int ) -> [int]:
+    """Returns the decimation levels worth writing for an execution of nb_turns turns."""
+    return [ level for level in DECIMATION_LEVELS if level < nb_turns ]
+
+def largest_triangle_three_buckets( x : np.ndarray, y : np.ndarray, nb_points : int ) -> np.ndarray:
+    """Returns the indexes of nb_points points of the series (x, y) preserving its shape.
+
+    Largest-Triangle-Three-Buckets (Steinarsson, "Downsampling time series for visual representation"): the first
+    and last points are kept, and in each of the nb_points - 2 buckets between them, the point forming the largest
+    triangle with the point kept in the previous bucket and the average of the next bucket.
+    """
+    nb_values = len(x)
+    if nb_points >= nb_values or nb_points < 3:
+        return np.arange( nb_values ) if nb_points >= nb_values else np.array( [0, nb_values - 1][:max(nb_points, 1)] )
+    x, y = np.asarray( x, dtype=np.float64 ), np.asarray( y, dtype=np.float64 )
+    bounds = np.linspace( 1, nb_values - 1, nb_points - 1 ).astype( np.int64 )
+    indexes = np.zeros( nb_points, dtype=np.int64 )
+    indexes[-1] = nb_values - 1
+    for bucket in range( nb_points - 2 ):
+        start, stop = bounds[bucket], bounds[bucket + 1]
+        next_stop = bounds[bucket + 2] if bucket + 2 < len(bounds) else nb_values
+        next_x, next_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        previous_x, previous_y = x[indexes[bucket]], y[indexes[bucket]]
+        areas = np.abs( (previous_x - next_x) * (y[start:stop] - previous_y) - (previous_x - x[start:stop]) * (next_y - previous_y) )
+        indexes[bucket + 1] = start + int( np.argmax( areas ) )
+    return indexes
 
 def argmax( values : [float] ) -> int:
     maxIndex = 0
@@ -155,12 +603,15 @@ class IsolatedPermutation:
 
     def reset(self, turn: int):
         """Resets the permutation for a given time step."""
-        permuted_index = [i for i in range(self.nb_items)]
+        if rng_mode == COUNTER_RNG:
+            permuted_index = counter_random_generator(self.perm_seed).permutation(self.nb_items, turn)
+        else:
+            permuted_index = [i for i in range(self.nb_items)]
 
-        save_state = getstate()
-        seed(self.perm_seed + turn)
-        shuffle(permuted_index)
-        setstate(save_state)
+            save_state = getstate()
+            seed(self.perm_seed + turn)
+            shuffle(permuted_index)
+            setstate(save_state)
 
         self.__permutation = {index: perm for index, perm in enumerate(permuted_index)}
         self.__inverse = {perm: index for index, perm in enumerate(permuted_index)}
@@ -242,6 +693,10 @@ class StandardBanditsAlgorithm():
     
     def getParameters( self ): return []
 
+    def beginTurn( self, turn : int ):
+        """Draws the random values shared by the scores and the selection of a turn, for the roles only selecting an arm."""
+        pass
+
     @abstractmethod
     def computeScore(self, turn : int, arm : int ) -> float: pass
 
@@ -425,6 +880,125 @@ class SambaTimer:
         }
         
 
+# -------------------------------------------------
+# Protocol timing
+# -------------------------------------------------
+# SambaTimer only times the strategy itself, SambaProtocolTimer also executes the cryptographic steps of the
+# SAMBA protocol that each component performs in a turn.
+SIMULATED_TIMING = "simulated"
+PROTOCOL_TIMING = "protocol"
+
+@lru_cache(maxsize=1)
+def protocol_paillier_keypair():
+    """Returns the Paillier key pair of the customer, generated once per process as its generation is not timed."""
+    from phe import paillier
+    return paillier.generate_paillier_keypair()
+
+class SambaProtocolTimer(SambaTimer):
+    """Times the components of SAMBA while executing the protocol, turn by turn.
+
+    In a turn, each arm masks its score with the mask of the turn, shared by the arms only, and encrypts it with
+    AES-GCM under the key the arms share with comp. The controller permutes the encrypted scores, so comp selects
+    an arm among masked scores without knowing which arm each of them belongs to. Comp encrypts for each arm
+    whether it is selected, the controller inverts the permutation and forwards to each arm its bit. Once the
+    budget is spent, each arm encrypts its sum of rewards with the Paillier public key of the customer, the controller
+    adds the ciphertexts and the customer decrypts the cumulative reward.
+
+    Each arm precomputes its Paillier obfuscator before the turns, see obfuscators.py: this offline phase is timed
+    apart, in arms_offline, and its encryption only costs a modular multiplication.
+    """
+    def __init__(self, strategy : StandardBanditsAlgorithm, perm_seed : int, mask_seed : int):
+        super().__init__(strategy)
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        # key shared by the arms and comp, the setup of the keys is not timed
+        self.aes = AESGCM( AESGCM.generate_key( bit_length=256 ) )
+        self.public_key, self.private_key = protocol_paillier_keypair()
+        self.permutation = IsolatedPermutation( self.K, perm_seed )
+        self.mask_generator = new_random_generator( mask_seed )
+        ObfuscatorPool = import_sibling( "obfuscators" ).ObfuscatorPool
+        self.obfuscators = [ ObfuscatorPool( self.public_key, capacity=1 ) for _ in range(self.K) ]
+        self.offline_execution_time = [ Timer() for _ in range(self.K) ]
+
+    def encrypt( self, value : float ) -> (bytes, bytes):
+        nonce = os.urandom(12)
+        return nonce, self.aes.encrypt( nonce, struct.pack('<d', value), None )
+
+    def decrypt( self, message : (bytes, bytes) ) -> float:
+        nonce, ciphertext = message
+        return struct.unpack('<d', self.aes.decrypt( nonce, ciphertext, None ))[0]
+
+    def time( self, budget ):
+
+        # offline phase of the arms
+        for arm in range(self.K):
+            with self.offline_execution_time[arm]:
+                self.obfuscators[arm].fill()
+
+        # do the initial exploration phase
+        t = 1
+        for arm in range(self.K):
+            reward = self.pullArm(t, arm)
+            t += 1
+
+        # exploration
+        while t <= budget:
+
+            # each arm sends its masked and encrypted score
+            mask = 1. + self.mask_generator.random(t)
+            encrypted_scores = []
+            for arm in range(self.K):
+                with self.nodes_execution_time[arm]:
+                    encrypted_scores.append( self.encrypt( self.strategy.computeScore( t, arm ) * mask ) )
+
+            # the controller permutes the encrypted scores
+            with self.controller_execution_time:
+                self.permutation.reset( t )
+                permuted_scores = self.permutation.permute( encrypted_scores )
+
+            # comp selects an arm among the permuted scores, and tells each of them whether it is selected
+            with self.comp_execution_time:
+                scores = [ self.decrypt( message ) for message in permuted_scores ]
+                selectedPermutedArm = self.strategy.selectArm(t, scores)
+                assert selectedPermutedArm is not None, 'Selected Arm must be an integer: not ' + str(selectedPermutedArm)
+                permuted_selections = [ self.encrypt( 1. if index == selectedPermutedArm else 0. ) for index in range(self.K) ]
+
+            # the controller gives back its selection to each arm
+            with self.controller_execution_time:
+                selections = self.permutation.invert_permutation( permuted_selections )
+
+            # the selected arm pulls its arm
+            selectedArm = None
+            for arm in range(self.K):
+                with self.nodes_execution_time[arm]:
+                    if self.decrypt( selections[arm] ) == 1.:
+                        selectedArm = arm
+            reward = self.pullArm( t, selectedArm )
+            assert reward is not None, 'Reward must be an integer: not ' + str(reward)
+
+            t += 1
+
+        # each arm encrypts its sum of rewards, which are added by the controller and decrypted by the customer
+        encrypted_rewards = []
+        for arm in range(self.K):
+            with self.nodes_execution_time[arm]:
+                encrypted_rewards.append( self.obfuscators[arm].encrypt( self.nbRewards( arm ) ) )
+
+        with self.controller_execution_time:
+            encrypted_cumulative_reward = sum( encrypted_rewards[1:], encrypted_rewards[0] )
+
+        with self.customer_execution_time:
+            cumulative_reward = self.private_key.decrypt( encrypted_cumulative_reward )
+        assert cumulative_reward == sum(self.rewards), 'Decrypted cumulative reward does not match the rewards'
+
+        return {
+            "comp": self.comp_execution_time.execution_time_in_seconds(),
+            "controller": self.controller_execution_time.execution_time_in_seconds(),
+            "customer": self.customer_execution_time.execution_time_in_seconds(),
+            "arms": [ timer.execution_time_in_seconds() for timer in self.nodes_execution_time ],
+            "arms_offline": [ timer.execution_time_in_seconds() for timer in self.offline_execution_time ]
+        }
+
+
 # -------------------------------------------------
 # Epsilon-greedy implementation
 # -------------------------------------------------
@@ -452,8 +1026,8 @@ class EpsilonGreedyBanditsAlgorithm(StandardBanditsAlgorithm):
     ):
         super().__init__(arms_probs, reward_seed=algo_parameters.reward_seed)
         self.epsilon = algo_parameters.epsilon
-        self.epsilon_generator = IsolatedRandomGenerator(seed=randint_if_none(algo_parameters.epsilon_seed))
-        self.random_arm_generator = IsolatedRandomGenerator(seed=randint_if_none(algo_parameters.random_arm_seed))
+        self.epsilon_generator = new_random_generator(seed=randint_if_none(algo_parameters.epsilon_seed))
+        self.random_arm_generator = new_random_generator(seed=randint_if_none(algo_parameters.random_arm_seed))
 
         self.epsilon_by_turn = {}
 
@@ -462,11 +1036,15 @@ class EpsilonGreedyBanditsAlgorithm(StandardBanditsAlgorithm):
             ("epsilon", self.epsilon)
         ]
 
+    def beginTurn( self, turn : int ):
+        if turn not in self.epsilon_by_turn:
+            self.epsilon_by_turn[ turn ] = self.epsilon_generator.random(turn)
+
     def computeScore(self, turn : int, arm : int ) -> float:
         # probability epsilon: pulling a random arm
         # probability 1-epsilon: pullin the best arm
-        x = self.epsilon_by_turn[turn] if turn in self.epsilon_by_turn else self.epsilon_generator.random(turn)
-        self.epsilon_by_turn[ turn ] = x
+        self.beginTurn( turn )
+        x = self.epsilon_by_turn[turn]
         if x < self.epsilon:
             # randint returns a random integer between a and b includes
             # we consider a permutation done by the AS
@@ -498,6 +1076,8 @@ def thompson_sampling_function(s_i, n_i, beta_seed, t) -> float:
     Executes the Thompson Sampling application based on work at
     https://perso.crans.org/besson/phd/notebooks/Introduction_aux_algorithmes_de_bandit__comme_UCB1_et_Thompson_Sampling.html#Approche-bay%C3%A9sienne,-Thompson-Sampling
     """
+    if rng_mode == COUNTER_RNG:
+        return counter_random_generator(beta_seed).betavariate(t, alpha=s_i + 1, beta=n_i - s_i + 1)
     seed(beta_seed + t)
     value = betavariate(alpha=s_i + 1, beta=n_i - s_i + 1)
     return value
@@ -514,7 +1094,7 @@ class ThompsonSamplingBanditsAlgorithm(StandardBanditsAlgorithm):
         super().__init__(probs, reward_seed=algo_parameters.reward_seed)
         # seeds
         self.beta_seed = algo_parameters.beta_seed
-        self.random_arm_selector = IsolatedRandomGenerator(seed=algo_parameters.random_arm_seed)
+        self.random_arm_selector = new_random_generator(seed=algo_parameters.random_arm_seed)
         
 
     def computeScore(self, turn : int, arm : int ) -> float:
@@ -611,7 +1191,7 @@ class SoftmaxBanditsAlgorithm(StandardBanditsAlgorithm):
     def __init__(self, arms_probs: [float], algo_parameters: SoftmaxParameters):
         super().__init__(arms_probs, reward_seed=algo_parameters.reward_seed)
         self.tau = algo_parameters.tau
-        self.random_arm_selector =  IsolatedRandomGenerator(seed=algo_parameters.random_arm_choice)
+        self.random_arm_selector =  new_random_generator(seed=algo_parameters.random_arm_choice)
 
     def getParameters(self):
         return [('tau', self.tau)]
@@ -630,6 +1210,355 @@ class SoftmaxBanditsAlgorithm(StandardBanditsAlgorithm):
         return self.random_arm_selector.choice(range(self.K), scores, t=turn)
 
 
+# =================================================
+# This section contains the large-K mode of the
+# strategies, for catalogues of thousands of arms
+# =================================================
+class LargeKBanditsAlgorithm(StandardBanditsAlgorithm):
+    """Plays a strategy with its statistics stored in numpy arrays of K values.
+
+    Only the statistics of the pulled arm change during a turn, so they are updated incrementally, and the scores
+    of the K arms are computed and compared by a few vectorized operations instead of K calls to computeScore.
+    A turn still records the K scores and counters, so a priority structure would not make it cheaper than a
+    vectorized selection.
+
+    Mixed with a standard strategy, whose parameters and random generators are kept: UCB, epsilon-greedy and
+    softmax play the same executions as their standard counterpart.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pulls = np.zeros(self.K, dtype=np.int64)
+        self.rewards = np.zeros(self.K, dtype=np.int64)
+        # rewards / pulls of each arm, 0 until the arm is pulled
+        self.means = np.zeros(self.K, dtype=np.float64)
+
+    @abstractmethod
+    def computeScores(self, turn : int) -> np.ndarray:
+        """Returns the scores of every arm, as an array of K values."""
+        pass
+
+    def integralScores( self ) -> bool:
+        """Returns whether the last computed scores are integers, see ExecutionHistory.integral_scores."""
+        return False
+
+    def updateArm( self, arm : int ):
+        """Updates the statistics depending on the counters of the pulled arm."""
+        self.means[arm] = int(self.rewards[arm]) / int(self.pulls[arm])
+
+    def pullArm( self, turn : int, arm : int ) -> int:
+        """Pulls an arm and updates local variables
+        """
+        reward = self.arms[arm].pull( turn )
+        self.rewards[arm] += reward
+        self.pulls[arm] += 1
+        self.updateArm( arm )
+        return reward
+
+    def play( self, budget ) -> ExecutionHistory:
+        execution_history = ExecutionHistory( self.probs, budget )
+        for name, value in self.getParameters():
+            execution_history.addParameter( name, value )
+
+        start = time.time()
+
+        # do the initial exploration phase
+        t = 1
+        rewardsObtainedDuringExploration = []
+        for arm in range(self.K):
+            rewardsObtainedDuringExploration.append( self.pullArm(t, arm) )
+            t += 1
+        execution_history.addInitialExploration(
+            rewards=rewardsObtainedDuringExploration,
+            pulls=self.pulls.tolist()
+        )
+
+        # exploration, recorded turn by turn as arrays appended to the execution history by chunks
+        nb_turns = max(budget - self.K, 0)
+        chunk_turns = max(min(PLAY_CHUNK_VALUES // self.K, nb_turns), 1)
+        scores_by_turn = np.zeros((chunk_turns, self.K), dtype=np.float64)
+        integral_scores_by_turn = np.zeros(chunk_turns, dtype=bool)
+        selected_arm_by_turn = np.zeros(chunk_turns, dtype=np.int32)
+        reward_by_turn = np.zeros(chunk_turns, dtype=np.int32)
+        pulls_by_turn = np.zeros((chunk_turns, self.K), dtype=np.int32)
+        rewards_by_turn = np.zeros((chunk_turns, self.K), dtype=np.int32)
+        for first_index in range(0, nb_turns, chunk_turns):
+            chunk = min(chunk_turns, nb_turns - first_index)
+            for index in range(chunk):
+                # the scores may be the statistics updated by the pull, they are recorded before it
+                scores = self.computeScores(t)
+                scores_by_turn[index] = scores
+                integral_scores_by_turn[index] = self.integralScores()
+                selectedArm = self.selectArm(t, scores)
+                reward = self.pullArm(t, selectedArm)
+
+                selected_arm_by_turn[index] = selectedArm
+                reward_by_turn[index] = reward
+                pulls_by_turn[index] = self.pulls
+                rewards_by_turn[index] = self.rewards
+                t += 1
+
+            execution_history.add_turns(
+                turns=np.arange(t - chunk, t),
+                scores=scores_by_turn[:chunk],
+                selectedArms=selected_arm_by_turn[:chunk],
+                rewards=reward_by_turn[:chunk],
+                nbPulls=pulls_by_turn[:chunk],
+                nbRewards=rewards_by_turn[:chunk],
+                integralScores=integral_scores_by_turn[:chunk]
+            )
+        execution_history.addExecutionTime( time.time() - start )
+
+        return execution_history
+
+
+class LargeKEpsilonGreedyBanditsAlgorithm(LargeKBanditsAlgorithm, EpsilonGreedyBanditsAlgorithm):
+    """Large-K counterpart of EpsilonGreedyBanditsAlgorithm."""
+    def computeScores(self, turn : int) -> np.ndarray:
+        # probability epsilon: every arm gets the same score, a random arm is pulled
+        self.explore = self.epsilon_generator.random(turn) < self.epsilon
+        return np.ones(self.K) if self.explore else self.means
+
+    def integralScores( self ) -> bool:
+        return self.explore
+
+    def selectArm(self, turn : int, scores : np.ndarray) -> int:
+        if self.explore:
+            return self.random_arm_generator.randint(turn, 0, self.K - 1)
+        return int(np.argmax(scores))
+
+
+class LargeKThompsonSamplingBanditsAlgorithm(LargeKBanditsAlgorithm, ThompsonSamplingBanditsAlgorithm):
+    """Large-K counterpart of ThompsonSamplingBanditsAlgorithm, drawing the beta variates of all arms at once.
+
+    In the Mersenne rng mode, the variates are drawn from a numpy generator seeded by the beta seed rather than by
+    reseeding the random module for each arm, so the executions differ from the standard ones. In the counter rng
+    mode, the variates are those of the standard strategy, up to the rounding of the vectorized math functions.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.beta_generator = np.random.default_rng(self.beta_seed)
+
+    def computeScores(self, turn : int) -> np.ndarray:
+        if rng_mode == COUNTER_RNG:
+            return betavariates(self.beta_seed, turn, self.rewards + 1, self.pulls - self.rewards + 1)
+        return self.beta_generator.beta(self.rewards + 1, self.pulls - self.rewards + 1)
+
+    def selectArm(self, turn : int, scores : np.ndarray) -> int:
+        return int(np.argmax(scores))
+
+
+class LargeKUCBBanditsAlgorithm(LargeKBanditsAlgorithm, UCBBanditsAlgorithm):
+    """Large-K counterpart of UCBBanditsAlgorithm: the exploration term of every arm shares the log of the turn."""
+    def computeScores(self, turn : int) -> np.ndarray:
+        return self.means + np.sqrt((2 * log(turn, e)) / self.pulls)
+
+    def selectArm(self, turn : int, scores : np.ndarray) -> int:
+        return int(np.argmax(scores))
+
+
+class LargeKSoftmaxBanditsAlgorithm(LargeKBanditsAlgorithm, SoftmaxBanditsAlgorithm):
+    """Large-K counterpart of SoftmaxBanditsAlgorithm: only the weight of the pulled arm is computed again."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.weights = np.zeros(self.K, dtype=np.float64)
+
+    def updateArm( self, arm : int ):
+        super().updateArm( arm )
+        self.weights[arm] = softmax_function(s_i=int(self.rewards[arm]), n_i=int(self.pulls[arm]), tau=self.tau)
+
+    def computeScores(self, turn : int) -> np.ndarray:
+        return self.weights
+
+    def selectArm(self, turn : int, scores : np.ndarray) -> int:
+        # same rule as random.choices, the weights being summed in the same order
+        cumulative_scores = np.cumsum(scores)
+        value = self.random_arm_selector.choice_draw(turn) * cumulative_scores[-1]
+        return min(int(np.searchsorted(cumulative_scores, value, side='right')), self.K - 1)
+
+
+# =================================================
+# This section contains the batch simulation engine,
+# a vectorized counterpart of the strategies above
+# =================================================
+class BatchBanditsAlgorithm():
+    """Simulates several independent executions of a strategy at once.
+
+    Statistics of every iteration and every arm are stored in arrays of shape (nb_iterations, K),
+    so a turn costs a handful of numpy operations for all iterations instead of K calls to
+    computeScore per iteration.
+
+    In the counter rng mode, each iteration draws its values from its own Philox key instead of the
+    shared numpy generator.
+    """
+    EPSILON_STREAM = 6
+
+    def __init__(self, probs: [float], nb_iterations: int, seed: int):
+        self.K = len(probs)
+        self.probs = probs
+        self.nb_iterations = nb_iterations
+        self.generator = np.random.default_rng(seed)
+        self.seeds = self.generator.integers(0, 2 ** 63, size=nb_iterations, dtype=np.uint64) if rng_mode == COUNTER_RNG else None
+        self.arms_probs = np.array(probs, dtype=np.float64)
+        self.iterations = np.arange(nb_iterations)
+        self.pulls = np.zeros((nb_iterations, self.K), dtype=np.int64)
+        self.rewards = np.zeros((nb_iterations, self.K), dtype=np.int64)
+
+    def getParameters( self ): return []
+
+    @abstractmethod
+    def computeScores(self, turn : int) -> np.ndarray:
+        """Returns the scores of every arm for every iteration, as an array of shape (nb_iterations, K)."""
+        pass
+
+    @abstractmethod
+    def selectArms(self, turn : int, scores : np.ndarray) -> np.ndarray:
+        """Returns the arm selected by every iteration, as an array of shape (nb_iterations,)."""
+        pass
+
+    def integralScores( self ) -> np.ndarray:
+        """Returns whether the last computed scores of every iteration are integers, see ExecutionHistory.integral_scores."""
+        return np.zeros(self.nb_iterations, dtype=bool)
+
+    def uniforms( self, turn : int, stream : int ) -> np.ndarray:
+        """Returns one random float between 0 and 1 per iteration for the given turn and stream."""
+        if self.seeds is None:
+            return self.generator.random(self.nb_iterations)
+        return philox_uniforms(self.seeds, turn, stream)
+
+    def pullArms( self, turn : int, arms : np.ndarray ) -> np.ndarray:
+        """Pulls one arm per iteration and updates local variables
+        """
+        rewards = (self.uniforms(turn, CounterRandomGenerator.RANDOM_STREAM) <= self.arms_probs[arms]).astype(np.int64)
+        self.rewards[self.iterations, arms] += rewards
+        self.pulls[self.iterations, arms] += 1
+        return rewards
+
+    def play( self, budget ) -> [ExecutionHistory]:
+        start = time.time()
+
+        # do the initial exploration phase, every iteration pulls the same arm
+        t = 1
+        for arm in range(self.K):
+            self.pullArms(t, np.full(self.nb_iterations, arm))
+            t += 1
+        histories = []
+        for iteration in range(self.nb_iterations):
+            execution_history = ExecutionHistory( self.probs, budget )
+            for name, value in self.getParameters():
+                execution_history.addParameter( name, value )
+            execution_history.addInitialExploration(
+                rewards=self.rewards[iteration].tolist(),
+                pulls=self.pulls[iteration].tolist()
+            )
+            histories.append( execution_history )
+
+        # exploration, recorded turn by turn as arrays split into the execution histories by chunks
+        nb_turns = max(budget - self.K, 0)
+        chunk_turns = max(min(PLAY_CHUNK_VALUES // (self.nb_iterations * self.K), nb_turns), 1)
+        scores_by_turn = np.zeros((chunk_turns, self.nb_iterations, self.K), dtype=np.float64)
+        integral_scores_by_turn = np.zeros((chunk_turns, self.nb_iterations), dtype=bool)
+        selected_arm_by_turn = np.zeros((chunk_turns, self.nb_iterations), dtype=np.int32)
+        reward_by_turn = np.zeros((chunk_turns, self.nb_iterations), dtype=np.int32)
+        pulls_by_turn = np.zeros((chunk_turns, self.nb_iterations, self.K), dtype=np.int32)
+        rewards_by_turn = np.zeros((chunk_turns, self.nb_iterations, self.K), dtype=np.int32)
+        for first_index in range(0, nb_turns, chunk_turns):
+            chunk = min(chunk_turns, nb_turns - first_index)
+            for index in range(chunk):
+                scores = self.computeScores(t)
+                selected_arms = self.selectArms(t, scores)
+                rewards = self.pullArms(t, selected_arms)
+
+                scores_by_turn[index] = scores
+                integral_scores_by_turn[index] = self.integralScores()
+                selected_arm_by_turn[index] = selected_arms
+                reward_by_turn[index] = rewards
+                pulls_by_turn[index] = self.pulls
+                rewards_by_turn[index] = self.rewards
+                t += 1
+
+            for iteration, execution_history in enumerate(histories):
+                execution_history.add_turns(
+                    turns=np.arange(t - chunk, t),
+                    scores=scores_by_turn[:chunk, iteration],
+                    selectedArms=selected_arm_by_turn[:chunk, iteration],
+                    rewards=reward_by_turn[:chunk, iteration],
+                    nbPulls=pulls_by_turn[:chunk, iteration],
+                    nbRewards=rewards_by_turn[:chunk, iteration],
+                    integralScores=integral_scores_by_turn[:chunk, iteration]
+                )
+
+        execution_time = (time.time() - start) / self.nb_iterations
+        for execution_history in histories:
+            execution_history.addExecutionTime( execution_time )
+
+        return histories
+
+
+class BatchEpsilonGreedyBanditsAlgorithm(BatchBanditsAlgorithm):
+    """Vectorized counterpart of EpsilonGreedyBanditsAlgorithm."""
+    def __init__(self, arms_probs: [float], nb_iterations: int, seed: int, epsilon: float):
+        super().__init__(arms_probs, nb_iterations, seed)
+        self.epsilon = epsilon
+        self.explore = np.zeros(nb_iterations, dtype=bool)
+
+    def getParameters(self):
+        return [
+            ("epsilon", self.epsilon)
+        ]
+
+    def computeScores(self, turn : int) -> np.ndarray:
+        # probability epsilon: every arm gets the same score, a random arm is pulled
+        self.explore = self.uniforms(turn, BatchBanditsAlgorithm.EPSILON_STREAM) < self.epsilon
+        return np.where(self.explore[:, None], 1., self.rewards / self.pulls)
+
+    def integralScores( self ) -> np.ndarray:
+        return self.explore
+
+    def selectArms(self, turn : int, scores : np.ndarray) -> np.ndarray:
+        random_arms = (self.uniforms(turn, CounterRandomGenerator.RANDINT_STREAM) * self.K).astype(np.int64)
+        return np.where(self.explore, random_arms, np.argmax(scores, axis=1))
+
+
+class BatchThompsonSamplingBanditsAlgorithm(BatchBanditsAlgorithm):
+    """Vectorized counterpart of ThompsonSamplingBanditsAlgorithm."""
+    def computeScores(self, turn : int) -> np.ndarray:
+        if self.seeds is None:
+            return self.generator.beta(self.rewards + 1, self.pulls - self.rewards + 1)
+        return betavariates(self.seeds[:, None], turn, self.rewards + 1, self.pulls - self.rewards + 1)
+
+    def selectArms(self, turn : int, scores : np.ndarray) -> np.ndarray:
+        return np.argmax(scores, axis=1)
+
+
+class BatchUCBBanditsAlgorithm(BatchBanditsAlgorithm):
+    """Vectorized counterpart of UCBBanditsAlgorithm."""
+    def computeScores(self, turn : int) -> np.ndarray:
+        return self.rewards / self.pulls + np.sqrt((2 * log(turn, e)) / self.pulls)
+
+    def selectArms(self, turn : int, scores : np.ndarray) -> np.ndarray:
+        return np.argmax(scores, axis=1)
+
+
+class BatchSoftmaxBanditsAlgorithm(BatchBanditsAlgorithm):
+    """Vectorized counterpart of SoftmaxBanditsAlgorithm."""
+    def __init__(self, arms_probs: [float], nb_iterations: int, seed: int, tau: float):
+        super().__init__(arms_probs, nb_iterations, seed)
+        self.tau = tau
+
+    def getParameters(self):
+        return [('tau', self.tau)]
+
+    def computeScores(self, turn : int) -> np.ndarray:
+        return np.exp((self.rewards / self.pulls) / self.tau)
+
+    def selectArms(self, turn : int, scores : np.ndarray) -> np.ndarray:
+        # same rule as random.choices: the first arm whose cumulative weight exceeds the drawn value
+        cumulative_scores = np.cumsum(scores, axis=1)
+        values = self.uniforms(turn, CounterRandomGenerator.CHOICE_STREAM) * cumulative_scores[:, -1]
+        selected_arms = (cumulative_scores <= values[:, None]).sum(axis=1)
+        return np.minimum(selected_arms, self.K - 1)
+
+
 # ===============================================
 # Execution
 # ===============================================
@@ -651,15 +1580,42 @@ class ExecutionHistoryManager:
         }
 
     def add_execution( self, algorithm : str, iteration : int, execution : ExecutionHistory ):
-        self.history[ algorithm ][ iteration ] = execution.export_as_dict()
+        self.history[ algorithm ][ iteration ] = execution
+
+    JSON_FORMAT = "json"
+    COLUMNAR_FORMAT = "columnar"
+    DELTA_FORMAT = "delta"
+    GZIP_FORMAT = "gzip"
+    EXTENSIONS = {
+        JSON_FORMAT: [ "json", "json.index" ],
+        COLUMNAR_FORMAT: [ "samba" ],
+        DELTA_FORMAT: [ "delta.json", "delta.json.index" ],
+        GZIP_FORMAT: [ "json.gz", "json.gz.index" ],
+    }
 
-    def export( self, output : str ) :
+    @staticmethod
+    def filenames( algorithm : str, iteration : int, formats, nb_turns : int ) -> [str]:
+        """Returns the name of the files exported for an execution of nb_turns turns in the given formats."""
+        filenames = [
+            f"execution_{algorithm}_{iteration}.{extension}"
+            for format in formats
+            for extension in ExecutionHistoryManager.EXTENSIONS[format]
+        ]
+        if ExecutionHistoryManager.COLUMNAR_FORMAT in formats:
+            filenames += [ f"execution_{algorithm}_{iteration}.lod{level}.samba" for level in decimation_levels( nb_turns ) ]
+        return filenames
+
+    def export( self, output : str, formats = ( JSON_FORMAT, COLUMNAR_FORMAT, GZIP_FORMAT ) ) :
         """Exports all executions in the given output location.
 
-        Once the function will be executed, many files with be created inside the given location.
+        Once the function will be executed, many files with be created inside the given location, one file
+        for a single algorithm and iteration in each format: JSON along with its turn index, the columnar binary
+        format memory-mapped by the API, the JSON compressed with gzip along with its block index, served as is
+        by the API, and the delta-encoded JSON along with its turn index (opt-in).
         """
         # to reduce the energy consumption on the client web browser, we
-        # compute an aggregation of data.
+        # compute an aggregation of data: the columnar format comes with decimated
+        # copies of the execution (.lod{level}.samba files) keeping at most level turns.
         algorithm_list = [
             ExecutionHistoryManager.UCB,
             ExecutionHistoryManager.SOFTMAX,
@@ -669,210 +1625,418 @@ class ExecutionHistoryManager:
 
         # export each execution in a file, one file for a single algorithm and iteration
         for algo, data_by_iteration in self.history.items():
-            for iteration, data in data_by_iteration.items():
-                with open( join( output, f"execution_{algo}_{iteration}.json" ), 'w' ) as file:
-                    file.write(json.dumps(data))
+            for iteration, execution in data_by_iteration.items():
+                if ExecutionHistoryManager.JSON_FORMAT in formats:
+                    with open( join( output, f"execution_{algo}_{iteration}.json" ), 'w' ) as file, \
+                            open( join( output, f"execution_{algo}_{iteration}.json.index" ), 'wb' ) as index_file:
+                        execution.write_json( file, index_file )
+                if ExecutionHistoryManager.GZIP_FORMAT in formats:
+                    with open( join( output, f"execution_{algo}_{iteration}.json.gz" ), 'wb' ) as file, \
+                            open( join( output, f"execution_{algo}_{iteration}.json.gz.index" ), 'wb' ) as index_file:
+                        execution.write_gzip_json( file, index_file )
+                if ExecutionHistoryManager.DELTA_FORMAT in formats:
+                    with open( join( output, f"execution_{algo}_{iteration}.delta.json" ), 'w' ) as file, \
+                            open( join( output, f"execution_{algo}_{iteration}.delta.json.index" ), 'wb' ) as index_file:
+                        execution.write_json( file, index_file, KEYFRAME_INTERVAL )
+                if ExecutionHistoryManager.COLUMNAR_FORMAT in formats:
+                    levels = decimation_levels( execution.nb_turns() )
+                    for level in levels:
+                        rows = largest_triangle_three_buckets( execution.turn, execution.cumulative_reward, level )
+                        with open( join( output, f"execution_{algo}_{iteration}.lod{level}.samba" ), 'wb' ) as file:
+                            execution.select_turns( rows ).write_columnar( file )
+                    with open( join( output, f"execution_{algo}_{iteration}.samba" ), 'wb' ) as file:
+                        execution.write_columnar( file, levels )
+
+
+
+
+
+STANDARD_ENGINE = "standard"
+BATCH_ENGINE = "batch"
+LARGE_K_ENGINE = "large-k"
+
+ALGORITHMS = [
+    ExecutionHistoryManager.UCB,
+    ExecutionHistoryManager.SOFTMAX,
+    ExecutionHistoryManager.THOMPSON_SAMPLING,
+    ExecutionHistoryManager.EPSILON_GREEDY,
+]
+
+def create_instance( algorithm : str, probs : [float], tau : float, epsilon : float, randseed, large_k = False ) -> StandardBanditsAlgorithm:
+    """Creates an instance of the algorithm whose seeds are drawn with the given randseed function.
+
+    Args:
+        large_k: Creates the large-K counterpart of the algorithm, see LargeKBanditsAlgorithm.
+    """
+    if algorithm == ExecutionHistoryManager.UCB:
+        return ( LargeKUCBBanditsAlgorithm if large_k else UCBBanditsAlgorithm )(
+            arms_probs=probs,
+            algo_parameters=UCBParameters(
+                reward_seed=randseed()
+            )
+        )
+    elif algorithm == ExecutionHistoryManager.SOFTMAX:
+        return ( LargeKSoftmaxBanditsAlgorithm if large_k else SoftmaxBanditsAlgorithm )(
+            probs,
+            algo_parameters=SoftmaxParameters(
+                tau=tau,
+                reward_seed=randseed(),
+                random_arm_seed=randseed()
+            )
+        )
+    elif algorithm == ExecutionHistoryManager.EPSILON_GREEDY:
+        return ( LargeKEpsilonGreedyBanditsAlgorithm if large_k else EpsilonGreedyBanditsAlgorithm )(
+            arms_probs=probs,
+            algo_parameters=EpsilonGreedyParameters(
+                epsilon=epsilon,
+                epsilon_seed=randseed(),
+                reward_seed=randseed(),
+                random_arm_seed=randseed()
+            )
+        )
+    elif algorithm == ExecutionHistoryManager.THOMPSON_SAMPLING:
+        return ( LargeKThompsonSamplingBanditsAlgorithm if large_k else ThompsonSamplingBanditsAlgorithm )(
+            probs=probs,
+            algo_parameters=ThompsonsSamplingParameters(
+                reward_seed=randseed(),
+                beta_seed=randseed(),
+                random_arm_seed=randseed()
+            )
+        )
+    else:
+        raise Exception("Cannot create an instance of the specified algorithm: Algorithm not found: ", algorithm)
 
+def create_batch_instance( algorithm : str, probs : [float], nb_iterations : int, tau : float, epsilon : float, randseed ) -> BatchBanditsAlgorithm:
+    """Creates a batch instance of the algorithm simulating nb_iterations executions at once."""
+    if algorithm == ExecutionHistoryManager.UCB:
+        return BatchUCBBanditsAlgorithm( probs, nb_iterations, seed=randseed() )
+    elif algorithm == ExecutionHistoryManager.SOFTMAX:
+        return BatchSoftmaxBanditsAlgorithm( probs, nb_iterations, seed=randseed(), tau=tau )
+    elif algorithm == ExecutionHistoryManager.EPSILON_GREEDY:
+        return BatchEpsilonGreedyBanditsAlgorithm( probs, nb_iterations, seed=randseed(), epsilon=epsilon )
+    elif algorithm == ExecutionHistoryManager.THOMPSON_SAMPLING:
+        return BatchThompsonSamplingBanditsAlgorithm( probs, nb_iterations, seed=randseed() )
+    else:
+        raise Exception("Cannot create an instance of the specified algorithm: Algorithm not found: ", algorithm)
 
 
+def cell_seed( *identifiers ) -> int:
+    """Returns a seed derived from the given identifiers only, hence independent of the execution order."""
+    digest = hashlib.sha256( json.dumps(identifiers).encode('utf-8') ).digest()
+    return int.from_bytes( digest[:8], 'big' )
 
 
-def launch_execution( executions, nb_iterations, tau, epsilon, output ):
-    currentExecution = 1
-    for datasetName, data in executions.items():
-        for probs, budget, threshold in data:
-            execution_history = ExecutionHistoryManager( budget=budget, nb_iterations=nb_iterations, probs=probs )
-
-            # compute each execution
-            algorithm_list = [
-                ExecutionHistoryManager.UCB,
-                ExecutionHistoryManager.SOFTMAX,
-                ExecutionHistoryManager.THOMPSON_SAMPLING,
-                ExecutionHistoryManager.EPSILON_GREEDY,
-            ]
+class ExecutionCell:
+    """Independent unit of work of launch_execution: one algorithm played on one configuration.
 
-            # create a algorithm wrapper able to create an instance of algorithm generated with random seeds
-            def randseed() -> int: return randint(1, 10000)
-            def create_instance( algorithm : str ) -> StandardBanditsAlgorithm:
-                if algorithm == ExecutionHistoryManager.UCB:
-                    return UCBBanditsAlgorithm(
-                        arms_probs=probs,
-                        algo_parameters=UCBParameters(
-                            reward_seed=randseed()
-                        )
-                    )
-                elif algorithm == ExecutionHistoryManager.SOFTMAX:
-                    return SoftmaxBanditsAlgorithm(
-                        probs,
-                        algo_parameters=SoftmaxParameters(
-                            tau=tau,
-                            reward_seed=randseed(),
-                            random_arm_seed=randseed()
-                        )
-                    )
-                elif algorithm == ExecutionHistoryManager.EPSILON_GREEDY:
-                    return EpsilonGreedyBanditsAlgorithm(
-                        arms_probs=probs,
-                        algo_parameters=EpsilonGreedyParameters(
-                            epsilon=epsilon,
-                            epsilon_seed=randseed(),
-                            reward_seed=randseed(),
-                            random_arm_seed=randseed()
-                        )
-                    )
-                elif algorithm == ExecutionHistoryManager.THOMPSON_SAMPLING:
-                    return ThompsonSamplingBanditsAlgorithm(
-                        probs=probs,
-                        algo_parameters=ThompsonsSamplingParameters(
-                            reward_seed=randseed(),
-                            beta_seed=randseed(),
-                            random_arm_seed=randseed()
-                        )
-                    )
-                else:
-                    raise Exception("Cannot create an instance of the specified algorithm: Algorithm not found: ", algorithm)
+    A cell of the standard engine holds a single iteration, a cell of the batch engine holds all of them.
+    """
+    def __init__(self, configuration : int, dataset : str, probs : [float], budget : int, threshold, algorithm : str,
+                 iterations : [int], timed_iterations : [int], engine : str, tau : float, epsilon : float, seed : int,
+                 timing : str = SIMULATED_TIMING):
+        self.configuration = configuration
+        self.dataset = dataset
+        self.probs = probs
+        self.budget = budget
+        self.threshold = threshold
+        self.algorithm = algorithm
+        self.iterations = iterations
+        self.timed_iterations = timed_iterations
+        self.engine = engine
+        self.tau = tau
+        self.epsilon = epsilon
+        self.seed = seed
+        self.timing = timing
 
-            
-        
-            mean_time_by_components = None
-            for algorithm in algorithm_list:
-                for iteration in range(nb_iterations):
-                    # display some details about the execution
-                    nbExecutions = len(executions.items()) * len(data) * len(algorithm_list) * nb_iterations
-                    print(f"\r[Progression {round(currentExecution / nbExecutions * 100)}%] Dataset {datasetName} -- Executing Algorithm {algorithm} -- probs {probs}, threshold {threshold}, budget {budget}({iteration + 1}/{nb_iterations})", end=" " * 10)
-
-
-                    # execution standard bandits
-                    
-                    algorithm_instance = create_instance( algorithm )
-                    execution = algorithm_instance.play( budget )
-                    execution_history.add_execution( algorithm, iteration, execution )
-
-                    # execute bandits to get components execution time
-                    timer = SambaTimer( create_instance( algorithm ) )
-                    one_time_by_components = timer.time( budget )
-                    if not mean_time_by_components:
-                        mean_time_by_components = one_time_by_components
-                    else:
-                        for node in ["comp", "controller", "customer"]:
-                            mean_time_by_components[node] += one_time_by_components[node]
-                        for arm, arm_execution_time in enumerate( one_time_by_components["arms"] ):
-                            mean_time_by_components["arms"][arm] += arm_execution_time
-
-                    currentExecution += 1
-            for node in ["comp", 'controller', 'customer']:
-                mean_time_by_components[node] /= nb_iterations
-            for arm in range(len(probs)):
-                mean_time_by_components["arms"][arm] /= nb_iterations
-
-
-            # ensures that the output folder exists
-            folder = os.path.join(output, f"{datasetName}_{len(probs)}_{threshold}")
-            if not os.path.exists(folder):
-                os.mkdir( folder )
-
-            # export the execution
-            execution_history.export( folder )
-            with open(os.path.join(folder, "execution_time_by_components.json"), "w") as file:
-                file.write(json.dumps(mean_time_by_components))
-    print("\n[+] Execution done")
 
+def execute_cell( cell : ExecutionCell ):
+    """Plays and times a cell.
 
-from timeit import timeit
-def benchmark_security_options( output ):
-    randseed = lambda: randint(1, 10000)
-    nb_iteration = 10000
-
-    # compute execution time for permutation
-    mean_permutation_execution_time = 0.
-    list_size = 100
-    permutation = IsolatedPermutation.new( list_size, perm_seed=randseed(), turn=1 )
-    l = [i for i in range(list_size)]
-    for _ in range( nb_iteration ):
-        t = time.time()
-        permutation.permute(l)
-        mean_permutation_execution_time += time.time() - t
-    mean_permutation_execution_time /= nb_iteration
-    
+    Returns:
+        The cell, the list of (iteration, ExecutionHistory) and the list of execution times by components.
+    """
+    # every seed used by the cell is drawn from a generator private to the cell
+    generator = Random( cell.seed )
+    def randseed() -> int: return generator.randint(1, 10000)
+
+    if cell.engine == BATCH_ENGINE:
+        # all the iterations are simulated at once
+        instance = create_batch_instance( cell.algorithm, cell.probs, len(cell.iterations), cell.tau, cell.epsilon, randseed )
+        executions = list(zip( cell.iterations, instance.play( cell.budget ) ))
+    else:
+        executions = [
+            (iteration, create_instance( cell.algorithm, cell.probs, cell.tau, cell.epsilon, randseed, large_k=cell.engine == LARGE_K_ENGINE ).play( cell.budget ))
+            for iteration in cell.iterations
+        ]
 
-    
+    # execute bandits to get components execution time
+    def timer() -> SambaTimer:
+        strategy = create_instance( cell.algorithm, cell.probs, cell.tau, cell.epsilon, randseed )
+        if cell.timing == PROTOCOL_TIMING:
+            return SambaProtocolTimer( strategy, perm_seed=randseed(), mask_seed=randseed() )
+        return SambaTimer( strategy )
+    times_by_components = [ timer().time( cell.budget ) for _ in cell.timed_iterations ]
+    return cell, executions, times_by_components
 
-    # compute execution time for appying mask
-    mask = 0.5
-    mean_mask_execution_time = timeit(
-        lambda: mask * 4.123456789,
-        number=nb_iteration
-    )
+def set_rng_mode( mode : str ):
+    """Sets the rng mode of a worker process."""
+    global rng_mode
+    rng_mode = mode
 
-    # both Paillier and AES primitives
-    time_Paillier_enc = 0.
-    time_Paillier_dec = 0.
-    time_Paillier_add = 0.
-    time_AES_enc = 0.
-    time_AES_dec = 0.
-    nb_runs = 100
-    N = 100000
-    K = 10
-
-    # Paillier
-    pk, sk = paillier.generate_paillier_keypair()
-
-    for i in range(nb_runs):
-        # draw a random message
-        m = randint(0, N)
-        
-        
-        
-        t = time.time()
-        c = pk.encrypt(m)
-        time_Paillier_enc += time.time() - t
-        
-        t = time.time()
-        m2 = sk.decrypt (c)
-        time_Paillier_dec += time.time() - t
-        assert (m == m2)
-
-        t = time.time()
-        c + c
-        time_Paillier_add += time.time() - t
-        
-        # AES
-        key = get_random_bytes(32)
-        aesgcm = AESGCM(key)
-        nonce = os.urandom(12)
-        
-        t = time.time()
-        c = aesgcm.encrypt(nonce, str(m).encode('utf-8'), None)
-        time_AES_enc += time.time() - t
-        
-        t = time.time()
-        m2 = int(aesgcm.decrypt(nonce, c, None))
-        time_AES_dec += time.time() - t
-        assert (m == m2)
-    
-    time_Paillier_enc /= nb_runs
-    time_Paillier_dec /= nb_runs
-    time_Paillier_add /= nb_runs
-    time_AES_enc /= nb_runs
-    time_AES_dec /= nb_runs
-    diff_enc = time_Paillier_enc - time_AES_enc
-    diff_dec = time_Paillier_dec - time_AES_dec
-
-    # exporting result
-    data = {
-        "permutation": mean_permutation_execution_time,
-        "mask": mean_mask_execution_time,
-        "aes": { "encryption":time_AES_enc, "decryption": time_AES_dec },
-        "paillier": { "encryption": time_Paillier_enc, "decryption": time_Paillier_dec, "addition": time_Paillier_add }
-    }
-    with open( os.path.join( output, "security.json" ), 'w') as file:
-        file.write( json.dumps( data ) )
 
-from argparse import ArgumentParser
+class ExecutionManifest:
+    """Records, for each cell already written in the output location, a hash of the inputs the cell was computed from.
+
+    Stored as manifest.json in the output location, it allows a re-run to skip the cells whose inputs did not change
+    and to resume after an interruption. The execution times by components measured for each cell are kept as well,
+    so the mean of a configuration can be computed again without timing its skipped cells.
+    """
+    FILENAME = "manifest.json"
+
+    def __init__(self, output : str):
+        self.location = os.path.join( output, ExecutionManifest.FILENAME )
+        self.seed = None
+        self.cells = {}
+        if os.path.exists( self.location ):
+            with open( self.location ) as file:
+                manifest = json.loads( file.read() )
+            self.seed = manifest["seed"]
+            self.cells = manifest["cells"]
+
+    @staticmethod
+    def key( cell : ExecutionCell ) -> str:
+        return f"{cell.dataset}_{len(cell.probs)}_{cell.threshold}/{cell.budget}/{cell.algorithm}/{'-'.join(map(str, cell.iterations))}"
+
+    @staticmethod
+    def inputs_hash( cell : ExecutionCell ) -> str:
+        """Returns the hash of everything the output of the cell depends on."""
+        inputs = {
+            "version": SIMULATOR_VERSION,
+            "rng": rng_mode,
+            "engine": cell.engine,
+            "probs": cell.probs,
+            "budget": cell.budget,
+            "algorithm": cell.algorithm,
+            "tau": cell.tau,
+            "epsilon": cell.epsilon,
+            "seed": cell.seed,
+            "timed_iterations": cell.timed_iterations,
+        }
+        # the hash of the cells timed as before the protocol timing does not change
+        if cell.timing != SIMULATED_TIMING:
+            inputs["timing"] = cell.timing
+        return hashlib.sha256( json.dumps( inputs, sort_keys=True ).encode('utf-8') ).hexdigest()
+
+    def is_up_to_date( self, cell : ExecutionCell, folder : str ) -> bool:
+        """Returns True if the cell has been written from the same inputs and its files still exist."""
+        entry = self.cells.get( ExecutionManifest.key( cell ) )
+        return entry is not None \
+            and entry["inputs"] == ExecutionManifest.inputs_hash( cell ) \
+            and all( os.path.exists( os.path.join( folder, filename ) ) for filename in entry["files"] )
+
+    def times_by_components( self, cell : ExecutionCell ) -> [dict]:
+        return self.cells[ ExecutionManifest.key( cell ) ]["times"]
+
+    def record( self, cell : ExecutionCell, files : [str], times_by_components : [dict] ):
+        self.cells[ ExecutionManifest.key( cell ) ] = {
+            "inputs": ExecutionManifest.inputs_hash( cell ),
+            "files": files,
+            "times": times_by_components,
+        }
+
+    def save( self ):
+        # written aside then renamed, so an interruption never leaves a truncated manifest
+        with open( self.location + ".tmp", 'w' ) as file:
+            file.write( json.dumps({ "seed": self.seed, "cells": self.cells }) )
+        os.replace( self.location + ".tmp", self.location )
+
+
+def launch_execution( executions, nb_iterations, tau, epsilon, output, engine = STANDARD_ENGINE, timing_iterations = None, workers = None, seed = None, force = False, formats = ( ExecutionHistoryManager.JSON_FORMAT, ExecutionHistoryManager.COLUMNAR_FORMAT, ExecutionHistoryManager.GZIP_FORMAT ), timing = SIMULATED_TIMING ):
+    """Records every (dataset, probs, budget, threshold) execution for every algorithm.
+
+    Cells already written by a previous run from the same inputs, according to the manifest of the output location,
+    are skipped.
+
+    Args:
+        engine: STANDARD_ENGINE plays each iteration turn by turn, BATCH_ENGINE simulates all the
+            iterations of an algorithm at once with numpy, LARGE_K_ENGINE plays each iteration turn by
+            turn with the scores of all the arms computed at once, for large numbers of arms.
+        timing_iterations: Number of iterations timed by SambaTimer to compute the execution time by
+            components, all of them when None.
+        workers: Number of processes among which the cells are spread, the cells are executed in the
+            current process when None.
+        seed: Seed from which the seed of each cell is derived, so the output does not depend on the
+            number of workers. Taken from the manifest, or drawn randomly, when None.
+        force: Recomputes every cell, even the up to date ones.
+        formats: Formats in which each execution is exported, see ExecutionHistoryManager.export.
+        timing: SIMULATED_TIMING only times the strategy, PROTOCOL_TIMING also executes the cryptographic
+            steps of the protocol in each component, see SambaProtocolTimer.
+    """
+    if timing_iterations is not None and timing_iterations < 1:
+        raise Exception(f"At least one iteration must be timed, got {timing_iterations}")
+    manifest = ExecutionManifest( output )
+    if timing_iterations is None or timing_iterations > nb_iterations:
+        timing_iterations = nb_iterations
+    if seed is None:
+        seed = manifest.seed if manifest.seed is not None else randint(1, 10000)
+    if seed != manifest.seed:
+        # every cell seed changes along with the base seed
+        manifest.cells = {}
+    manifest.seed = seed
+
+    # split the executions into independent cells
+    configurations = []
+    cells = []
+    for datasetName, data in executions.items():
+        for probs, budget, threshold in data:
+            configuration = len(configurations)
+            configurations.append( (datasetName, probs, budget, threshold) )
+            for algorithm in ALGORITHMS:
+                if engine == BATCH_ENGINE:
+                    groups = [ list(range(nb_iterations)) ]
+                else:
+                    groups = [ [iteration] for iteration in range(nb_iterations) ]
+                for iterations in groups:
+                    cells.append(ExecutionCell(
+                        configuration, datasetName, probs, budget, threshold, algorithm,
+                        iterations=iterations,
+                        timed_iterations=[ iteration for iteration in iterations if iteration < timing_iterations ],
+                        engine=engine,
+                        tau=tau,
+                        epsilon=epsilon,
+                        seed=cell_seed( seed, datasetName, probs, budget, threshold, algorithm, iterations ),
+                        timing=timing,
+                    ))
+
+    def folder_of( configuration : int ) -> str:
+        datasetName, probs, budget, threshold = configurations[configuration]
+        return os.path.join(output, f"{datasetName}_{len(probs)}_{threshold}")
+
+    # the folder of a configuration does not depend on its budget, the API serving smaller budgets from its executions
+    budget_by_folder = {}
+    for configuration, (_, _, budget, _) in enumerate( configurations ):
+        folder = folder_of( configuration )
+        if budget_by_folder.setdefault( folder, budget ) != budget:
+            raise Exception(f"Executions of {folder} requested for budgets {budget_by_folder[folder]} and {budget}, only the largest one is needed")
+
+    # ensures that the output folders exist
+    for configuration in range(len(configurations)):
+        if not os.path.exists( folder_of( configuration ) ):
+            os.mkdir( folder_of( configuration ) )
+
+    remaining_cells = [ 0 ] * len(configurations)
+    for cell in cells:
+        remaining_cells[cell.configuration] += 1
+    pending_cells, up_to_date_cells = [], []
+    for cell in cells:
+        if force or not manifest.is_up_to_date( cell, folder_of( cell.configuration ) ):
+            pending_cells.append( cell )
+        else:
+            up_to_date_cells.append( cell )
+    print(f"[*] {len(cells) - len(pending_cells)}/{len(cells)} cells up to date, {len(pending_cells)} to compute")
+
+    def export_time_by_components( configuration : int ):
+        times = [
+            one_time
+            for cell in cells if cell.configuration == configuration
+            for one_time in manifest.times_by_components( cell )
+        ]
+        mean_time_by_components = {
+            node: sum( one_time[node] for one_time in times ) / len(times)
+            for node in ["comp", "controller", "customer"]
+        }
+        mean_time_by_components["arms"] = [
+            sum( one_time["arms"][arm] for one_time in times ) / len(times)
+            for arm in range(len(configurations[configuration][1]))
+        ]
+        # offline phase of the arms, with protocol timing only
+        if all( "arms_offline" in one_time for one_time in times ):
+            mean_time_by_components["arms_offline"] = [
+                sum( one_time["arms_offline"][arm] for one_time in times ) / len(times)
+                for arm in range(len(configurations[configuration][1]))
+            ]
+        with open(os.path.join(folder_of( configuration ), "execution_time_by_components.json"), "w") as file:
+            file.write(json.dumps(mean_time_by_components))
+
+    def complete( cell : ExecutionCell ):
+        # a configuration is exported as soon as all its cells are done
+        remaining_cells[cell.configuration] -= 1
+        if remaining_cells[cell.configuration] == 0:
+            export_time_by_components( cell.configuration )
+
+    for cell in up_to_date_cells:
+        complete( cell )
+
+    pool = ProcessPoolExecutor( max_workers=workers, initializer=set_rng_mode, initargs=(rng_mode,) ) if workers else None
+    # submitted one by one rather than mapped, so the cells not started yet can be cancelled
+    futures = [ pool.submit( execute_cell, cell ) for cell in pending_cells ] if pool else []
+    results = ( future.result() for future in futures ) if pool else map( execute_cell, pending_cells )
+    start = time.time()
+    last_save = start
+    try:
+        for index, (cell, cell_executions, times_by_components) in enumerate(results):
+            # export the executions of the cell
+            execution_history = ExecutionHistoryManager( budget=cell.budget, nb_iterations=nb_iterations, probs=cell.probs )
+            for iteration, execution in cell_executions:
+                execution_history.add_execution( cell.algorithm, iteration, execution )
+            execution_history.export( folder_of( cell.configuration ), formats )
+            manifest.record(
+                cell,
+                files=[
+                    filename
+                    for iteration in cell.iterations
+                    for filename in ExecutionHistoryManager.filenames( cell.algorithm, iteration, formats, max(cell.budget - len(cell.probs), 0) )
+                ],
+                times_by_components=times_by_components
+            )
+            if time.time() - last_save > 1:
+                manifest.save()
+                last_save = time.time()
+            complete( cell )
+
+            print(f"\r[Progression {round((index + 1) / len(pending_cells) * 100)}%] {index + 1}/{len(pending_cells)} cells done in {round(time.time() - start)}s ({workers or 1} worker(s))", end=" " * 10)
+    finally:
+        manifest.save()
+        if pool:
+            # shutdown( cancel_futures=True ) requires Python 3.9
+            for future in futures:
+                future.cancel()
+            pool.shutdown()
+    print("\n[+] Execution done")
+
+
+def benchmark_security_options( output ):
+    """Benchmarks the cryptographic primitives with their default sweeps, writing benchmarks.json and security.json
+    in output, see benchmarks.py."""
+    # imported here, benchmarks.py loading this file for the permutation
+    benchmarks = import_sibling( "benchmarks" )
+    benchmarks.write_benchmarks( output, benchmarks.run_benchmarks( benchmarks.Settings() ) )
+
+from argparse import ArgumentParser, ArgumentTypeError
+def positive_int( text : str ) -> int:
+    value = int( text )
+    if value < 1:
+        raise ArgumentTypeError(f"expected a positive integer, got {value}")
+    return value
+
 def createParser():
     parser = ArgumentParser()
     parser.add_argument( "--steam-probs", required=True )
     parser.add_argument( "--google-probs", required=True )
+    parser.add_argument( "--engine", choices=[STANDARD_ENGINE, BATCH_ENGINE, LARGE_K_ENGINE], default=STANDARD_ENGINE )
+    parser.add_argument( "--rng", choices=[MERSENNE_RNG, COUNTER_RNG], default=MERSENNE_RNG )
+    parser.add_argument( "--iterations", type=int, default=20 )
+    parser.add_argument( "--budget", type=int, default=1000, help="Budget of the executions, from which the API also serves smaller budgets" )
+    parser.add_argument( "--timing", choices=[SIMULATED_TIMING, PROTOCOL_TIMING], default=SIMULATED_TIMING, help="Executes the cryptographic steps of the protocol while timing the components with protocol" )
+    parser.add_argument( "--timing-iterations", type=positive_int, default=None, help="Iterations timed by component, all by default" )
+    parser.add_argument( "--workers", type=int, default=None, help="Number of worker processes, everything runs in the current process by default" )
+    parser.add_argument( "--seed", type=int, default=None, help="Seed from which every execution seed is derived" )
+    parser.add_argument( "--force", action="store_true", help="Recomputes the executions already up to date" )
+    parser.add_argument(
+        "--formats", nargs="+",
+        choices=[ExecutionHistoryManager.JSON_FORMAT, ExecutionHistoryManager.COLUMNAR_FORMAT, ExecutionHistoryManager.GZIP_FORMAT, ExecutionHistoryManager.DELTA_FORMAT],
+        default=[ExecutionHistoryManager.JSON_FORMAT, ExecutionHistoryManager.COLUMNAR_FORMAT, ExecutionHistoryManager.GZIP_FORMAT]
+    )
     return parser
 
 # ===============================================
@@ -883,6 +2047,7 @@ if __name__ == "__main__":
     # parser arguments
     parser = createParser()
     args = parser.parse_args()
+    rng_mode = args.rng
 
     # read probs
     with open( args.steam_probs, 'r' ) as file:
@@ -891,9 +2056,7 @@ if __name__ == "__main__":
     with open( args.google_probs, "r" ) as file:
         google = json.loads( "".join(file.readlines()) )
 
-    budget_set = [
-        1000,
-    ]
+    budget_set = [ args.budget ]
 
     data = {
         'googlelocal': [],
@@ -910,10 +2073,17 @@ if __name__ == "__main__":
     print("Recording samba execution...")
     launch_execution(
         executions=data,
-        nb_iterations=20,
+        nb_iterations=args.iterations,
         tau=0.1,
         epsilon=0.1,
-        output=OUTPUT
+        output=OUTPUT,
+        engine=args.engine,
+        timing_iterations=args.timing_iterations,
+        workers=args.workers,
+        seed=args.seed,
+        force=args.force,
+        formats=args.formats,
+        timing=args.timing
     )
 
     print("[*] Benchmarking security options...")
@@ -1,137 +1,16 @@
-import json
-from json.decoder import JSONDecodeError
-from os import replace
-from typing import Dict, List
-import re
+import os
+from typing import List
 from argparse import ArgumentParser
+from histograms import RatingHistograms, write_probs
+from reviews import extractRecords
+from sentiment import SentimentCache, scoreSentiments
 
 
-def extractGoogleData( filename : str, nBytesToRead : int, keys : List[str] ):
-    file = open(filename, "r")
-    file.seek(0)
-    content = file.read(nBytesToRead)
-
-    # we retreive each full entry (i.e., not the last one)
-    tokens = content.split("}")
-    tokens = tokens[:-1:1]
-
-    textReviewPattern = re.compile( """\"reviewText\":[\n ]*'[A-Za-z .?"0-9(),:!$^*ù]*'""" )
-    
-    # parse, clean and recreate each entry
-    l = [
-        ("u'", "'"),
-        ("\\", ""),
-        ("'", 'XXXXXXXXXXXXXXXX'),
-        ('"', "'"),
-        ('XXXXXXXXXXXXXXXX', '"'),
-        ("u\'", "'"),
-        ("None", '""')
-    ]  
-    nLoadEntry = 0
-    entries = []
-    for index, token in enumerate(tokens):
-        for r in l:
-            token = token.replace( *r )
-        token = token + "}"
-        # remove the text review
-        match = re.search( textReviewPattern, token )
-        if match:
-            textReview = match.group()
-            token = token.replace( textReview, '"reviewtext": ""' )
-
-        try:
-            jsonDict = json.loads(token)
-            entry = {}
-            for k in keys:
-                if k in jsonDict:
-                    entry[k] = jsonDict[k]
-            entries.append(entry)
-            nLoadEntry += 1
-        except JSONDecodeError as e:
-            if False:
-                print(f"Failure on {token}: {e}")
-                exit(1)
-
-        print(f"\r[Parsing {filename}  {round(index  * 100 /  len(tokens))}%] Parsed: {nLoadEntry}, Failed: {index - nLoadEntry + 1}", end=" " * 20)
-
-    print("")
-
-
-    return entries
-
-from textblob import TextBlob
-
-def extractSteamData( filename : str, nBytesToRead : int, keys : List[str] ): 
-    file = open(filename, "r")
-    file.seek(0)
-    content = file.read(nBytesToRead)
-
-    # we retreive each full entry (i.e., not the last one)
-    tokens = content.split("}")
-    tokens = tokens[:-1:1]
-
-    textReviewPattern = re.compile( """\"text\":[\n ]*'[A-Za-z .?"0-9(),:!$^*ù]*'""" )
-    
-    # parse, clean and recreate each entry
-    l = [
-        ("u'", "'"),
-        ("\\", ""),
-        ("'", 'XXXXXXXXXXXXXXXX'),
-        ('"', "'"),
-        ('XXXXXXXXXXXXXXXX', '"'),
-        ("u\'", "'"),
-        ("None", '""'),
-        ("True", '""'),
-        ("False", '""')
-    ]  
-    nLoadEntry = 0
-    entries = []
-    for index, token in enumerate(tokens):
-        for r in l:
-            token = token.replace( *r )
-        token = token + "}"
-
-        try:
-            jsonDict = json.loads(token)
-            entry = {}
-            for k in keys:
-                if k in jsonDict:
-                    entry[k] = jsonDict[k]
-            entries.append(entry)
-            nLoadEntry += 1
-        except JSONDecodeError as e:
-            if False:
-                print(f"Failure on {token}: {e}")
-                print(token[e.colno-5:e.colno - 1], "->", token[e.colno] , "<-", token[e.colno:e.colno + 5])
-                exit(1)
-
-        print(f"\r[Parsing {filename}  {round(index  * 100 /  len(tokens))}%] Parsed: {nLoadEntry}, Failed: {index - nLoadEntry + 1}", end=" " * 20)
-
-    print("")
-    
-    return entries
-
-def mapReduce( items, hash, itemProcessor = lambda item: item ) -> Dict:
-    res = {}
-    for v in items:
-        key = hash(v)
-        if key not in res: res[key] = []
-        res[key].append(itemProcessor(v))
-    return res
-
-def filterDictByScore( dict, scoreFunction, k ):
-    res = []
-    for key, value in dict.items():
-        res.append((scoreFunction(value), key, value))
-    res.sort(reverse=True)
-    
-    return {
-        key: value
-        for _, key, value in res[:k]
-    }
-
-def mean( list ): return sum(list) / len(list)
+def extractGoogleData( filename : str, keys : List[str], limit : int = None ):
+    return extractRecords( filename, keys, limit )
 
+def extractSteamData( filename : str, keys : List[str], limit : int = None ):
+    return extractRecords( filename, keys, limit )
 
 thresholds = [2, 3, 4, 5]
 k_set = [ 3, 4, 5 ]
@@ -142,67 +21,52 @@ def createParser():
     parser.add_argument( "--steam-dataset", required=True )
     parser.add_argument( "--google-output", required=True )
     parser.add_argument( "--steam-output", required=True )
+    parser.add_argument( "--google-histograms", default=None, help="Rating histograms of the Google places, next to the Google output by default" )
+    parser.add_argument( "--steam-histograms", default=None, help="Rating histograms of the Steam products, next to the Steam output by default" )
+    parser.add_argument( "--k", type=int, nargs="+", default=k_set, help="Numbers of items of the probs, large ones being played with the large-k engine of pre-computations.py" )
+    parser.add_argument( "--limit", type=int, default=None, help="Maximal number of reviews read in each dataset, all by default" )
+    parser.add_argument( "--sentiment-cache", default=None, help="SQLite database caching the sentiment of the reviews, see sentiment.py" )
+    parser.add_argument( "--workers", type=int, default=None, help="Number of worker processes scoring the sentiment, everything runs in the current process by default" )
     return parser
 
 
+def histogramsFilename( filename : str, output : str ) -> str:
+    return filename if filename is not None else os.path.splitext( output )[0] + ".histograms"
+
+
 if __name__ == "__main__":
     # parse argument
     parser = createParser()
     args = parser.parse_args()
 
+    # the datasets are parsed once into rating histograms, from which probs of any k and threshold are derived,
+    # see histograms.py
     if True:
-        google = extractGoogleData( args.google_dataset, 1000000000, ["rating", "gPlusPlaceId"] )
-        google = mapReduce( google, hash=lambda entry: entry["gPlusPlaceId"], itemProcessor=lambda entry: entry["rating"] )
-
+        google = extractGoogleData( args.google_dataset, ["rating", "gPlusPlaceId"], args.limit )
+        google = RatingHistograms.from_ratings(
+            ( entry["gPlusPlaceId"], entry["rating"] ) for entry in google if "rating" in entry and "gPlusPlaceId" in entry
+        )
+        google.write( histogramsFilename( args.google_histograms, args.google_output ) )
 
         # creating the probs
-        googleProbs = {}
-        for k in k_set:
-            googleProbs[k] = {}
-            data = filterDictByScore( google, scoreFunction=lambda ratings: len(ratings), k=k )
-            for threshold in thresholds:
-                probs = [
-                    mean([ 1 if rating >= threshold else 0 for rating in ratings ])
-                    for companyId, ratings in data.items()
-                ]
-                googleProbs[k][ threshold ] = probs
-
-        with open(  args.google_output, 'w' ) as file:
-            file.write(json.dumps(googleProbs))            
+        write_probs( args.google_output, google, args.k, thresholds )
 
     if True:
         # extracting data
-        data = extractSteamData(  args.steam_dataset, 50000000, ["product_id", "text"] )
-
-        # transforming text into ratings
-        steam = []
-        for index, entry in enumerate(data):
-            print(f"\r[Ratings Extraction ({int(index / len(data) * 100)}% )] Extracting sentiment from entry {index}", end=" " * 20)
-            steam.append({
-                "product_id": entry["product_id"],
-                "rating": int((TextBlob(entry["text"]).sentiment.polarity + 1) * 5 / 2)
-            })
-
-        
-        # compute probs
-        steamProbs = {}
-        steam = mapReduce( steam, hash = lambda entry: entry["product_id"], itemProcessor=lambda entry: entry["rating"] )
-        for k in k_set:
-            steamProbs[k] = {}
-            data = filterDictByScore( steam, scoreFunction=lambda ratings: len(ratings), k=k )
-            for threshold in thresholds:
-                probs = [
-                    mean([ 1 if rating >= threshold else 0 for rating in ratings ])
-                    for productId, ratings in data.items()
-                ]
-                steamProbs[k][ threshold ] = probs
+        data = extractSteamData( args.steam_dataset, ["product_id", "text"], args.limit )
+
+        # transforming text into ratings, while the reviews are read
+        cache = SentimentCache( args.sentiment_cache ) if args.sentiment_cache else None
+        steam = RatingHistograms.from_ratings(
+            ( entry["product_id"], int((polarity + 1) * 5 / 2) )
+            for entry, polarity in scoreSentiments(
+                ( entry for entry in data if "product_id" in entry and "text" in entry ),
+                getText=lambda entry: entry["text"], cache=cache, workers=args.workers
+            )
+        )
+        if cache is not None:
+            cache.close()
+        steam.write( histogramsFilename( args.steam_histograms, args.steam_output ) )
 
         # exporting probs
-        with open(  args.steam_output, 'w' ) as file:
-            file.write( json.dumps(steamProbs) )
-        
-
-        
-
-
-    
\ No newline at end of file
+        write_probs( args.steam_output, steam, args.k, thresholds )
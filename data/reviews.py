@@ -0,0 +1,54 @@
+# =================================================
+# description: Reading of the review datasets, shared
+#   by the data generation stages.
+# =================================================
+import ast
+import gzip
+import time
+from typing import List
+
+
+def openDataset( filename : str ):
+    """Opens the dataset as text, decompressing it on the fly when its name ends with .gz."""
+    if filename.endswith( ".gz" ):
+        return gzip.open( filename, "rt", encoding="utf-8" )
+    return open( filename, "r", encoding="utf-8" )
+
+def extractRecords( filename : str, keys : List[str], limit : int = None ):
+    """Yields the given keys of each record of the dataset, as a dict.
+
+    Datasets hold one record per line, written as a Python dict literal. The file is read line by line, so
+    the memory used does not depend on its size. Every 10000 records, the number of records parsed per second
+    is reported.
+
+    Args:
+        filename: Dataset, optionally gzip-compressed.
+        keys: Keys of the records to keep, missing keys are skipped.
+        limit: Maximal number of records to yield, all by default.
+    """
+    nLoadEntry, nFailed = 0, 0
+    start = time.perf_counter()
+    def report( end = "" ):
+        elapsed = time.perf_counter() - start
+        print(f"\r[Parsing {filename}] Parsed: {nLoadEntry}, Failed: {nFailed}, {round(nLoadEntry / elapsed) if elapsed else 0} records/s" + " " * 20, end=end)
+
+    with openDataset( filename ) as file:
+        for line in file:
+            if limit is not None and nLoadEntry >= limit:
+                break
+            if not line.strip():
+                continue
+            try:
+                record = ast.literal_eval( line )
+            except (ValueError, SyntaxError, MemoryError, RecursionError):
+                nFailed += 1
+                continue
+            if not isinstance( record, dict ):
+                nFailed += 1
+                continue
+
+            yield { k: record[k] for k in keys if k in record }
+            nLoadEntry += 1
+            if nLoadEntry % 10000 == 0:
+                report()
+    report( end="\n" )
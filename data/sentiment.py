@@ -0,0 +1,154 @@
+# =================================================
+# description: Sentiment scoring of the reviews, in
+#   parallel and cached on disk by review hash.
+# =================================================
+import hashlib
+import sqlite3
+import time
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# version of the scoring, to increase each time the polarity of a same text changes
+SENTIMENT_VERSION = 1
+
+
+def polarities( texts ) -> [float]:
+    """Returns the TextBlob polarity, between -1 and 1, of each text."""
+    from textblob import TextBlob
+    return [ TextBlob(text).sentiment.polarity for text in texts ]
+
+def reviewKey( text : str ) -> bytes:
+    """Returns the key of a review in the cache, which only depends on its text and on the scoring version."""
+    return hashlib.blake2b( text.encode('utf-8'), digest_size=16, salt=SENTIMENT_VERSION.to_bytes( 16, 'little' ) ).digest()
+
+class SentimentCache:
+    """On-disk cache of the polarity of the reviews, keyed by reviewKey, stored in a SQLite database."""
+    # maximal number of variables of a SQLite query
+    QUERY_SIZE = 900
+
+    def __init__(self, location : str):
+        self.connection = sqlite3.connect( location )
+        self.connection.execute( "CREATE TABLE IF NOT EXISTS sentiment (key BLOB PRIMARY KEY, polarity REAL NOT NULL) WITHOUT ROWID" )
+        self.connection.commit()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_val, exc_tb ):
+        self.close()
+
+    def close( self ):
+        self.connection.close()
+
+    def get( self, keys ) -> dict:
+        """Returns the polarity of the given keys which are in the cache."""
+        keys = list(keys)
+        found = {}
+        for start in range( 0, len(keys), SentimentCache.QUERY_SIZE ):
+            batch = keys[start:start + SentimentCache.QUERY_SIZE]
+            found.update( self.connection.execute(
+                f"SELECT key, polarity FROM sentiment WHERE key IN ({', '.join( '?' * len(batch) )})", batch
+            ))
+        return found
+
+    def put( self, polarity_by_key : dict ):
+        self.connection.executemany( "INSERT OR REPLACE INTO sentiment (key, polarity) VALUES (?, ?)", polarity_by_key.items() )
+        self.connection.commit()
+
+    def __len__( self ):
+        return self.connection.execute( "SELECT COUNT(*) FROM sentiment" ).fetchone()[0]
+
+class _InProcessExecutor:
+    """Executor running the submitted functions in the current process."""
+    class _Result:
+        def __init__(self, value):
+            self.value = value
+
+        def result( self ):
+            return self.value
+
+    def submit( self, function, *args ):
+        return _InProcessExecutor._Result( function( *args ) )
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_val, exc_tb ):
+        pass
+
+def scoreSentiments( records, getText = lambda record: record, cache : SentimentCache = None, workers : int = None, chunkSize : int = 1000 ):
+    """Yields each record along with the polarity of its text, in the order of the records.
+
+    Records are read by chunks of chunkSize. The texts of a chunk which are not in the cache are scored by a worker
+    process, then added to the cache; at most two chunks per worker are scored or waiting at once, so the memory
+    used does not depend on the number of records.
+
+    Args:
+        records: Records whose text is scored.
+        getText: Function returning the text of a record, called in the current process.
+        cache: Cache of the polarities, none by default.
+        workers: Number of worker processes, everything runs in the current process by default.
+        chunkSize: Number of records read at once.
+    """
+    records = iter(records)
+    pending = deque()
+    # texts being scored, by key: future of the polarities of their chunk and position in it
+    scoring = {}
+    def finish( chunk, keys, polarity_by_key, missing, future ):
+        if missing:
+            scored = dict( zip( missing, future.result() ) )
+            if cache is not None:
+                cache.put( scored )
+            for key in missing:
+                del scoring[key]
+        for record, key in zip( chunk, keys ):
+            polarity = polarity_by_key[key]
+            if isinstance( polarity, tuple ):
+                polarity = polarity[0].result()[polarity[1]]
+            yield record, polarity
+
+    with ( ProcessPoolExecutor( workers ) if workers is not None else _InProcessExecutor() ) as executor:
+        while True:
+            chunk = list( islice( records, chunkSize ) )
+            if not chunk:
+                break
+            texts = [ getText( record ) for record in chunk ]
+            keys = [ reviewKey( text ) for text in texts ]
+            polarity_by_key = cache.get( keys ) if cache is not None else {}
+            # a text is only scored once, even when repeated in the chunks being scored
+            missing = {}
+            for key, text in zip( keys, texts ):
+                if key in scoring:
+                    polarity_by_key[key] = scoring[key]
+                elif key not in polarity_by_key:
+                    missing[key] = text
+            future = executor.submit( polarities, list( missing.values() ) ) if missing else None
+            for position, key in enumerate( missing ):
+                polarity_by_key[key] = scoring[key] = ( future, position )
+            pending.append( ( chunk, keys, polarity_by_key, list( missing ), future ) )
+            while len(pending) > 2 * (workers or 0):
+                yield from finish( *pending.popleft() )
+        while pending:
+            yield from finish( *pending.popleft() )
+
+def createParser():
+    parser = ArgumentParser( description="Scores the sentiment of the reviews of a dataset, to fill the sentiment cache" )
+    parser.add_argument( "--dataset", required=True, help="Dataset whose reviews are scored, optionally gzip-compressed" )
+    parser.add_argument( "--cache", required=True, help="SQLite database of the sentiment cache, created if missing" )
+    parser.add_argument( "--text-key", default="text", help="Key of the text of the reviews" )
+    parser.add_argument( "--workers", type=int, default=None, help="Number of worker processes, everything runs in the current process by default" )
+    parser.add_argument( "--limit", type=int, default=None, help="Maximal number of reviews read, all by default" )
+    return parser
+
+if __name__ == "__main__":
+    from reviews import extractRecords
+
+    args = createParser().parse_args()
+    with SentimentCache( args.cache ) as cache:
+        texts = ( record[args.text_key] for record in extractRecords( args.dataset, [args.text_key], args.limit ) if args.text_key in record )
+        start = time.perf_counter()
+        nbReviews = sum( 1 for _ in scoreSentiments( texts, cache=cache, workers=args.workers ) )
+        elapsed = time.perf_counter() - start
+        print(f"[+] {nbReviews} reviews scored in {round(elapsed, 1)}s ({round(nbReviews / elapsed) if elapsed else 0} reviews/s), {len(cache)} reviews in the cache")
@@ -0,0 +1,19 @@
+# =================================================
+# description: Import of the scripts of this folder,
+#   whose hyphenated names such as pre-computations
+#   are not valid module names.
+# =================================================
+import importlib.util
+import os
+import sys
+
+def import_sibling( name : str ):
+    """Imports the script name.py of the folder of this file once per process, registered as a module whose name has
+    underscores instead of hyphens."""
+    module_name = name.replace( "-", "_" )
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location( module_name, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), f"{name}.py" ) )
+        module = importlib.util.module_from_spec( spec )
+        sys.modules[module_name] = module
+        spec.loader.exec_module( module )
+    return sys.modules[module_name]
@@ -2,12 +2,19 @@ from json import load
 from typing import Optional
 
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from pydantic.utils import smart_deepcopy
 from .model import *
+from .simulation import load_simulation, SimulationError, SimulationTimeout
 from random import randint
+from itertools import chain
 
+import asyncio
+import hashlib
+import json
 import os
+from email.utils import formatdate, parsedate_to_datetime
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -27,9 +34,17 @@ app.add_middleware(
 
 
 
+@app.on_event("startup")
+def startup():
+    if CACHE_WARM_UP:
+        warm_up_cache()
+
 @app.get("/")
 def home(): return "No Failure"
 
+@app.get("/samba/cache")
+def cache_stats(): return cache.stats()
+
 
 # ------------------------------
 # /samba/create
@@ -40,30 +55,218 @@ class SambaPartyCreation:
     algorithm : str
     budget: int
 
-def create_samba_party( algorithm, k, budget, dataset, threshold ): 
+def pick_iteration() -> int:
     # pick a random iteration
     it_min, it_max = getIterationRange()
     iteration = randint( it_min, it_max )
     print("Loaded Iteration number", iteration)
+    return iteration
 
-    # load the corresponding file
-    execution = load_file( dataset, k, threshold, algorithm, iteration )
-    execution["algorithm"] = algorithm
-    nb_arms = len(execution["probs"])
-    execution["turns"] = list(
-        filter( lambda turn: turn["turn"] <= budget, execution["turns"] )
-        )
-    execution["budget"] = budget
-    execution["nb_arms"] = nb_arms
+def samba_party_details( algorithm, k, budget, dataset, threshold ):
+    return {
+        "algorithm": algorithm,
+        "budget": budget,
+        # load precomputed time
+        "time": {
+            "security": load_security(),
+            "components": load_execution_time_by_components(dataset, k, threshold)
+        },
+    }
 
-    # load precomputed time
-    execution["time"] = {
-        "security": load_security(),
-        "components": load_execution_time_by_components(dataset, k, threshold)
+async def samba_party_details_async( algorithm, k, budget, dataset, threshold ):
+    security, components = await asyncio.gather( load_security_async(), load_execution_time_by_components_async(dataset, k, threshold) )
+    return {
+        "algorithm": algorithm,
+        "budget": budget,
+        "time": {
+            "security": security,
+            "components": components
+        },
     }
 
+def add_samba_party_details( execution, algorithm, k, budget, dataset, threshold ):
+    execution.update( samba_party_details( algorithm, k, budget, dataset, threshold ) )
+    execution["nb_arms"] = len(execution["probs"])
     return execution
 
+async def create_samba_party( algorithm, k, budget, dataset, threshold, iteration, max_points = None, encoding = None ): 
+    # load the corresponding file, decimated to at most max_points turns if any, along with the precomputed time
+    execution, details = await asyncio.gather(
+        load_decimated_execution_async( dataset, k, threshold, algorithm, iteration, budget, max_points ),
+        samba_party_details_async( algorithm, k, budget, dataset, threshold )
+    )
+    if encoding == DELTA_ENCODING:
+        execution = encode_delta( execution )
+    execution.update( details )
+    execution["nb_arms"] = len(execution["probs"])
+    return execution
+
+# ------------------------------
+# Streaming mode
+# Ouput: NDJSON, one object per line:
+#   {"type": "header", "index": i, "execution": execution without its turns}
+#   {"type": "turns", "index": i, "turns": [next turns of the execution i]}
+# ------------------------------
+NDJSON = "application/x-ndjson"
+
+def ndjson_line( value ) -> bytes:
+    return (json.dumps( value ) + "\n").encode('utf-8')
+
+def stream_samba_party( algorithm, k, budget, dataset, threshold, iteration, index = 0, max_points = None, encoding = None ):
+    chunks = iter_execution( dataset, k, threshold, algorithm, iteration, budget, max_points=max_points )
+    header = add_samba_party_details( next(chunks), algorithm, k, budget, dataset, threshold )
+    if encoding == DELTA_ENCODING:
+        header["keyframe_interval"] = KEYFRAME_INTERVAL
+    yield ndjson_line({ "type": "header", "index": index, "execution": header })
+    for turns in chunks:
+        # each chunk starts with a keyframe
+        if encoding == DELTA_ENCODING:
+            turns = encode_delta_turns( turns )
+        yield ndjson_line({ "type": "turns", "index": index, "turns": turns })
+
+async def streaming_response( lines ) -> StreamingResponse:
+    # the first line is computed before responding, so a missing file is still reported as an error
+    first_line = await run_blocking( next, lines )
+    return StreamingResponse( chain( [ first_line ], lines ), media_type=NDJSON )
+
+# ------------------------------
+# Raw mode
+# The JSON files are sent as they are stored, truncated to the budget
+# with their turn index, and the details of the samba party are
+# spliced in, replacing the stored budget: only the fields preceding
+# the turns are parsed and serialized again.
+# ------------------------------
+def raw_samba_party( algorithm, k, budget, dataset, threshold, iteration ) -> Optional[bytes]:
+    """Returns the JSON samba party, None when there is no indexed JSON file."""
+    if not has_json_index( dataset, k, threshold, algorithm, iteration ):
+        return None
+    # nb_arms is already in the file
+    return read_json_prefix( dataset, k, threshold, algorithm, iteration, budget, fields=samba_party_details( algorithm, k, budget, dataset, threshold ) )
+
+def raw_history( parties, k, budget, dataset, threshold ) -> Optional[bytes]:
+    """Returns the JSON array of the samba parties of the (algorithm, iteration) parties, None when an indexed JSON file is missing."""
+    executions = []
+    for algorithm, iteration in parties:
+        execution = raw_samba_party( algorithm, k, budget, dataset, threshold, iteration )
+        if execution is None:
+            return None
+        executions.append( execution )
+    return b"[" + b", ".join( executions ) + b"]"
+
+def raw_response( content : bytes ) -> Response:
+    return Response( content, media_type="application/json" )
+
+# ------------------------------
+# Compressed mode
+# When the client accepts gzip, the compressed JSON files are sent
+# as they are stored, see write_gzip_prefix in model.py.
+# ------------------------------
+def accepts_gzip( request : Request ) -> bool:
+    return "gzip" in request.headers.get( "accept-encoding", "" )
+
+def negotiates_encoding( stream, max_points, encoding ) -> bool:
+    """Returns whether the body is sent compressed or not depending on the Accept-Encoding of the request."""
+    return not stream and max_points is None and encoding is None
+
+def encoding_headers( stream, max_points, encoding ) -> dict:
+    """Returns the headers of a response whose body may depend on the Accept-Encoding of the request, 304 included."""
+    return { "Vary": "Accept-Encoding" } if negotiates_encoding( stream, max_points, encoding ) else {}
+
+def gzip_samba_party( stream, algorithm, k, budget, dataset, threshold, iteration ) -> bool:
+    """Writes the samba party in the gzip stream, returns False without writing when there is no compressed file."""
+    if not has_gzip_file( dataset, k, threshold, algorithm, iteration ):
+        return False
+    write_gzip_prefix( stream, dataset, k, threshold, algorithm, iteration, budget, samba_party_details( algorithm, k, budget, dataset, threshold ) )
+    return True
+
+def gzip_history( parties, k, budget, dataset, threshold ) -> Optional[GzipStream]:
+    """Returns the gzip stream of the JSON array of the samba parties of the (algorithm, iteration) parties, None when a compressed file is missing."""
+    compressed = GzipStream()
+    compressed.write( b"[" )
+    for index, ( algorithm, iteration ) in enumerate( parties ):
+        if index:
+            compressed.write( b", " )
+        if not gzip_samba_party( compressed, algorithm, k, budget, dataset, threshold, iteration ):
+            return None
+    compressed.write( b"]" )
+    return compressed
+
+def gzip_response( stream ) -> Response:
+    return Response( stream.close(), media_type="application/json", headers={ "Content-Encoding": "gzip", "Vary": "Accept-Encoding" } )
+
+
+
+
+# ------------------------------
+# Decimation
+# max_points: maximal number of turns returned, for the charts drawn
+# by the client, which cannot display more points than its pixels.
+# ------------------------------
+def check_max_points( max_points ):
+    if max_points is not None and max_points < 2:
+        raise HTTPException(status_code=400, detail="Expected max_points to be at least 2")
+
+# ------------------------------
+# Encoding
+# encoding: "delta" to only send the counters of the arms in the keyframe
+# turns, see encode_delta_turns in model.py for the decoding.
+# ------------------------------
+DELTA_ENCODING = "delta"
+
+def check_encoding( encoding ):
+    if encoding is not None and encoding != DELTA_ENCODING:
+        raise HTTPException(status_code=400, detail=f"Expected encoding to be {DELTA_ENCODING}")
+
+# ------------------------------
+# Selection
+# iteration: the iteration of the execution, or seed: any value from
+# which the iterations are derived, make the response deterministic.
+# Such responses carry an ETag and a Last-Modified derived from the
+# files they are made of, and conditional GET requests are answered
+# with 304 before any file is read.
+# ------------------------------
+def select_iteration( iteration = None, seed = None, index = 0 ) -> int:
+    """Returns the given iteration, or the one derived from the seed for the index-th execution of the response, or a random one."""
+    it_min, it_max = getIterationRange()
+    if iteration is not None:
+        if not it_min <= iteration <= it_max:
+            raise HTTPException(status_code=400, detail=f"Expected iteration between {it_min} and {it_max}")
+        return iteration
+    if seed is not None:
+        digest = hashlib.sha256( f"{seed}:{index}".encode('utf-8') ).digest()
+        return it_min + int.from_bytes( digest[:8], 'little' ) % (it_max - it_min + 1)
+    return pick_iteration()
+
+def cache_headers( parties, k, dataset, threshold, parameters ) -> dict:
+    """Returns the headers of a response made of the (algorithm, iteration) parties, given the other parameters its body depends on."""
+    versions = [ artifact_version( dataset, k, threshold, algorithm, iteration ) for algorithm, iteration in parties ]
+    tag = hashlib.sha256( json.dumps([ parties, parameters, [ version for version, _ in versions ] ]).encode('utf-8') ).hexdigest()[:32]
+    return {
+        # weak, as the same body can be sent compressed or not
+        "ETag": f'W/"{tag}"',
+        "Last-Modified": formatdate( max( modified for _, modified in versions ), usegmt=True ),
+        "Cache-Control": "no-cache",
+    }
+
+def is_not_modified( request : Request, headers : dict ) -> bool:
+    """Returns whether the conditional request is satisfied by the response with the given headers."""
+    if_none_match = request.headers.get( "if-none-match" )
+    if if_none_match is not None:
+        tags = [ tag.strip() for tag in if_none_match.split( "," ) ]
+        return "*" in tags or headers["ETag"][2:] in [ tag[2:] if tag.startswith( "W/" ) else tag for tag in tags ]
+    if_modified_since = request.headers.get( "if-modified-since" )
+    if if_modified_since is not None:
+        try:
+            return parsedate_to_datetime( headers["Last-Modified"] ) <= parsedate_to_datetime( if_modified_since )
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def with_headers( result, headers : dict, response : Response ):
+    """Adds the headers to the response endpoint result, which is either a response or the body of the given response."""
+    ( result if isinstance( result, Response ) else response ).headers.update( headers )
+    return result
+
 
 
 
@@ -78,27 +281,140 @@ possibleAlgorithms = [
 
 
 @app.get("/samba/history")
-def history():
+async def history( request : Request, response : Response, stream : bool = False, max_points : Optional[int] = None, encoding : Optional[str] = None, seed : Optional[str] = None ):
     k, budget, dataset, threshold = 4, 500, 'googlelocal', 0.2
-    executions = []
-    for algorithm in possibleAlgorithms:
-        for _ in range(5):
-            executions.append( create_samba_party( algorithm, k, budget, dataset, threshold ) )
-    return executions
+    check_max_points( max_points )
+    check_encoding( encoding )
+    algorithms = [ algorithm for algorithm in possibleAlgorithms for _ in range(5) ]
+    parties = [ ( algorithm, select_iteration( seed=seed, index=index ) ) for index, algorithm in enumerate( algorithms ) ]
+    headers = encoding_headers( stream, max_points, encoding )
+    if seed is not None:
+        headers.update( await run_blocking( cache_headers, parties, k, dataset, threshold, [ budget, stream, max_points, encoding ] ) )
+        if is_not_modified( request, headers ):
+            return Response( status_code=304, headers=headers )
+    return with_headers( await history_result( request, parties, k, budget, dataset, threshold, stream, max_points, encoding ), headers, response )
+
+async def history_result( request, parties, k, budget, dataset, threshold, stream, max_points, encoding ):
+    if negotiates_encoding( stream, max_points, encoding ):
+        if accepts_gzip( request ):
+            compressed = await run_blocking( gzip_history, parties, k, budget, dataset, threshold )
+            if compressed is not None:
+                return gzip_response( compressed )
+        content = await run_blocking( raw_history, parties, k, budget, dataset, threshold )
+        if content is not None:
+            return raw_response( content )
+
+    if stream:
+        return await streaming_response( chain.from_iterable(
+            stream_samba_party( algorithm, k, budget, dataset, threshold, iteration, index=index, max_points=max_points, encoding=encoding )
+            for index, ( algorithm, iteration ) in enumerate( parties )
+        ))
+
+    # the executions are loaded concurrently
+    return await asyncio.gather(*(
+        create_samba_party( algorithm, k, budget, dataset, threshold, iteration, max_points, encoding )
+        for algorithm, iteration in parties
+    ))
 
 import sys
 
 @app.post("/samba/create")
-async def samba( request : Request ):
+async def samba( request : Request, response : Response, stream : bool = False ):
     data = await request.json()
     try:
         algorithm, k, budget, dataset, threshold = data["algorithm"], int(data["k"]), int(data["budget"]), data['dataset'], int(data['threshold'])
-        return create_samba_party( algorithm, k, budget, dataset, threshold )
+        max_points = int(data["max_points"]) if data.get("max_points") is not None else None
+        iteration = int(data["iteration"]) if data.get("iteration") is not None else None
+        seed = str(data["seed"]) if data.get("seed") is not None else None
+        # conditional requests are only answered for GET, as POST responses are not cached
+        return await samba_party_response( request, response, False, stream, algorithm, k, budget, dataset, threshold, max_points, data.get("encoding"), iteration, seed )
 
     except KeyError as e:
-        raise HTTPException(status_code=400, detail="Expected algoritm and budget items") 
-    
+        raise HTTPException(status_code=400, detail="Expected algoritm and budget items")
+
+@app.get("/samba/create")
+async def samba_get( request : Request, response : Response, algorithm : str, k : int, budget : int, dataset : str, threshold : int, stream : bool = False,
+                     max_points : Optional[int] = None, encoding : Optional[str] = None, iteration : Optional[int] = None, seed : Optional[str] = None ):
+    return await samba_party_response( request, response, True, stream, algorithm, k, budget, dataset, threshold, max_points, encoding, iteration, seed )
+
+async def samba_party_response( request, response, conditional, stream, algorithm, k, budget, dataset, threshold, max_points, encoding, iteration, seed ):
+    check_max_points( max_points )
+    check_encoding( encoding )
+    deterministic = iteration is not None or seed is not None
+    iteration = select_iteration( iteration, seed )
+    headers = encoding_headers( stream, max_points, encoding )
+    if deterministic:
+        headers.update( await run_blocking( cache_headers, [ ( algorithm, iteration ) ], k, dataset, threshold, [ budget, stream, max_points, encoding ] ) )
+        if conditional and is_not_modified( request, headers ):
+            return Response( status_code=304, headers=headers )
+    return with_headers( await samba_party_result( request, algorithm, k, budget, dataset, threshold, iteration, stream, max_points, encoding ), headers, response )
+
+async def samba_party_result( request, algorithm, k, budget, dataset, threshold, iteration, stream, max_points, encoding ):
+    if stream:
+        return await streaming_response( stream_samba_party( algorithm, k, budget, dataset, threshold, iteration, max_points=max_points, encoding=encoding ) )
+    if negotiates_encoding( stream, max_points, encoding ):
+        if accepts_gzip( request ):
+            compressed = GzipStream()
+            if await run_blocking( gzip_samba_party, compressed, algorithm, k, budget, dataset, threshold, iteration ):
+                return gzip_response( compressed )
+        content = await run_blocking( raw_samba_party, algorithm, k, budget, dataset, threshold, iteration )
+        if content is not None:
+            return raw_response( content )
+    return await create_samba_party( algorithm, k, budget, dataset, threshold, iteration, max_points, encoding )
+
 
-    
+# ------------------------------
+# /samba/benchmarks
+# Measures of the cryptographic primitives written by
+# data/benchmarks.py, optionally restricted to one primitive.
+# ------------------------------
+@app.get("/samba/benchmarks")
+async def samba_benchmarks( primitive : Optional[str] = None ):
+    try:
+        benchmarks = await load_benchmarks_async()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="No benchmarks were computed")
+    except BenchmarksVersionError as e:
+        raise HTTPException(status_code=500, detail=f"{e}, the benchmarks must be computed again")
+    if primitive is None:
+        return benchmarks
+    return dict( benchmarks, results=[ result for result in benchmarks["results"] if result["primitive"] == primitive ] )
 
+# ------------------------------
+# /samba/simulate
+# Plays the algorithm live, for any k and threshold of the rating
+# histograms of the dataset and any budget, see simulation.py.
+# The seed of the simulation is returned along with the execution,
+# requesting it again is answered from the cache.
+# ------------------------------
+@app.get("/samba/simulate")
+async def samba_simulate( algorithm : str, k : int, budget : int, dataset : str, threshold : float, seed : Optional[int] = None,
+                          tau : float = 0.1, epsilon : float = 0.1, max_points : Optional[int] = None, encoding : Optional[str] = None ):
+    check_max_points( max_points )
+    check_encoding( encoding )
+    if seed is None:
+        seed = randint( 0, 2 ** 31 - 1 )
+    try:
+        simulation, security = await asyncio.gather(
+            load_simulation( dataset, k, threshold, budget, algorithm, seed, tau, epsilon ),
+            load_security_async()
+        )
+    except SimulationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SimulationTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
+    execution = simulation["execution"]
+    if max_points is not None:
+        execution = decimate( execution, max_points )
+    if encoding == DELTA_ENCODING:
+        execution = encode_delta( execution )
+    # serialized at once, the turns being plain JSON values
+    return raw_response( json.dumps( dict(
+        execution,
+        algorithm=algorithm,
+        budget=budget,
+        time={ "security": security, "components": simulation["components"] },
+        nb_arms=len(execution["probs"]),
+        seed=seed,
+    )).encode('utf-8') )
@@ -1,10 +1,46 @@
 # ======================================
 # file: model.py
 # ======================================
+import asyncio
+import functools
+import hashlib
 import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
 from json.decoder import JSONDecoder
 from typing import Tuple
+import numpy as np
 DATA_LOCATION = "/data"
+# memory budget of the cache of parsed files, in bytes
+CACHE_BUDGET = int( os.environ.get( "SAMBA_CACHE_BUDGET", 256 * 1024 * 1024 ) )
+# when set, the cache is filled with the executions found in DATA_LOCATION at startup
+CACHE_WARM_UP = os.environ.get( "SAMBA_CACHE_WARM_UP", "" ) not in ( "", "0" )
+
+# columnar binary format written by ExecutionHistory.write_columnar in data/pre-computations.py
+COLUMNAR_MAGIC = b"SAMBACOL"
+COLUMNAR_VERSION = 1
+COLUMNAR_PREAMBLE = struct.Struct('<II')
+TURN_COLUMNS = ( "turn", "scores", "selected_arm", "reward", "cumulative_reward", "nb_rewards", "nb_pulls" )
+# turn index of the JSON files written by ExecutionHistory.write_json: first turn, number of turns, offset
+# of the first turn, offset of the "]" closing the turns, then the offset following each turn
+TURN_INDEX_HEADER = struct.Struct('<QQQQ')
+TURN_INDEX_OFFSET = struct.Struct('<Q')
+# block index of the compressed JSON files written by ExecutionHistory.write_gzip_json: magic, version, number
+# of turns per block, number of blocks, then for each boundary the offset of the compressed data following it and
+# the CRC-32 of the JSON preceding it
+GZIP_INDEX_MAGIC = b"SAMBAGZI"
+GZIP_INDEX_VERSION = 1
+GZIP_INDEX_HEADER = struct.Struct('<8sIIQ')
+GZIP_INDEX_BOUNDARY = struct.Struct('<QQ')
+# member preceding the turns of the JSON files, the other fields of the execution being written before it
+TURNS_MEMBER = b', "turns": ['
+
+# keyframe interval of the delta-encoded payloads, as KEYFRAME_INTERVAL in data/pre-computations.py
+KEYFRAME_INTERVAL = 100
 
 
 class Algorithms:
@@ -12,14 +48,598 @@ class Algorithms:
 
 def getIterationRange() -> Tuple[int, int]: return 0, 19
 
-def load_file( dataset, k, threshold, algorithm, iteration ):
-    with open( f"{DATA_LOCATION}/{dataset}_{k}_{threshold}/execution_{algorithm}_{iteration}.json" ) as file:
-        return json.loads( "".join(file.readlines()) )
+def execution_location( dataset, k, threshold, algorithm, iteration, extension ) -> str:
+    return f"{DATA_LOCATION}/{dataset}_{k}_{threshold}/execution_{algorithm}_{iteration}.{extension}"
 
-def load_security():
+def load_file( dataset, k, threshold, algorithm, iteration, budget = None ):
+    """Loads an execution, keeping only the turns played up to the budget if any.
+
+    The columnar file is used when it exists, the JSON file otherwise, or the delta-encoded JSON file which is decoded.
+    """
+    if os.path.exists( execution_location( dataset, k, threshold, algorithm, iteration, "samba" ) ):
+        return load_columnar_file( dataset, k, threshold, algorithm, iteration, budget )
+    extension = "json"
+    if not os.path.exists( execution_location( dataset, k, threshold, algorithm, iteration, "json" ) ) \
+            and os.path.exists( execution_location( dataset, k, threshold, algorithm, iteration, "delta.json" ) ):
+        extension = "delta.json"
+    if budget is not None and os.path.exists( execution_location( dataset, k, threshold, algorithm, iteration, extension + ".index" ) ):
+        return decode_delta( json.loads( read_json_prefix( dataset, k, threshold, algorithm, iteration, budget, extension ) ) )
+
+    with open( execution_location( dataset, k, threshold, algorithm, iteration, extension ) ) as file:
+        execution = decode_delta( json.loads( "".join(file.readlines()) ) )
+    if budget is not None:
+        execution["turns"] = [ turn for turn in execution["turns"] if turn["turn"] <= budget ]
+    return execution
+
+def count_rows( first_turn, nb_turns, budget ) -> int:
+    """Returns the number of consecutive turns, starting at first_turn, played up to the budget."""
+    return min( max( budget - first_turn + 1, 0 ), nb_turns )
+
+def has_json_index( dataset, k, threshold, algorithm, iteration ) -> bool:
+    """Returns whether the execution can be read with read_json_prefix."""
+    return all(
+        os.path.exists( execution_location( dataset, k, threshold, algorithm, iteration, extension ) )
+        for extension in ( "json", "json.index" )
+    )
+
+def splice_fields( header : bytes, fields : dict ) -> Tuple[bytes, bytes]:
+    """Returns the JSON execution up to its first turn with the given fields it holds replaced, and the other given
+    fields as JSON object members starting with ", ", to insert at the end of the execution.
+
+    Only the fields preceding the turns are parsed, they are serialized again as data/pre-computations.py does.
+    """
+    execution = json.loads( header[:-len(TURNS_MEMBER)] + b"}" )
+    replaced = { name: value for name, value in fields.items() if name in execution }
+    execution.update( replaced )
+    members = b"".join(
+        b", " + json.dumps( name ).encode('utf-8') + b": " + json.dumps( value ).encode('utf-8')
+        for name, value in fields.items() if name not in replaced
+    )
+    return json.dumps( execution ).encode('utf-8')[:-1] + TURNS_MEMBER, members
+
+def read_json_prefix( dataset, k, threshold, algorithm, iteration, budget, extension = "json", fields = None ) -> bytes:
+    """Returns the JSON execution truncated to the turns played up to the budget, read with the turn index.
+
+    Only the bytes of the kept turns are read, the following ones are neither read nor parsed. The given fields
+    replace those of the execution, or are inserted at its end, see splice_fields.
+    """
+    with open( execution_location( dataset, k, threshold, algorithm, iteration, extension + ".index" ), 'rb' ) as index:
+        first_turn, nb_turns, turns_offset, tail_offset = TURN_INDEX_HEADER.unpack( index.read( TURN_INDEX_HEADER.size ) )
+        nb_rows = count_rows( first_turn, nb_turns, budget )
+        end = turns_offset
+        if nb_rows:
+            index.seek( TURN_INDEX_HEADER.size + TURN_INDEX_OFFSET.size * (nb_rows - 1) )
+            end, = TURN_INDEX_OFFSET.unpack( index.read( TURN_INDEX_OFFSET.size ) )
+    with open( execution_location( dataset, k, threshold, algorithm, iteration, extension ), 'rb' ) as file:
+        head = file.read( end )
+        file.seek( tail_offset )
+        tail = file.read()
+    if not fields:
+        return head + tail
+    header, members = splice_fields( head[:turns_offset], fields )
+    # the execution ends with "}"
+    return header + head[turns_offset:] + tail[:-1] + members + b"}"
+
+# ------------------------------
+# Delta encoding
+# Only keyframe turns hold "nb_pulls" and "nb_rewards": the first turn, every
+# keyframe_interval-th turn, and the turns not following the previous one.
+# The counters of the other turns are those of the previous turn, with one
+# more pull and the reward added to the selected arm.
+# ------------------------------
+def encode_delta_turns( turns, keyframe_interval = KEYFRAME_INTERVAL ):
+    """Returns the delta-encoded turns, the first one being a keyframe."""
+    encoded = []
+    previous = None
+    for index, turn in enumerate( turns ):
+        if index % keyframe_interval == 0 or turn["turn"] != previous + 1:
+            encoded.append( turn )
+        else:
+            encoded.append({ key: value for key, value in turn.items() if key not in ( "nb_pulls", "nb_rewards" ) })
+        previous = turn["turn"]
+    return encoded
+
+def decode_delta_turns( turns ):
+    """Returns the turns with the counters of the arms rebuilt, the first one being a keyframe."""
+    decoded = []
+    for turn in turns:
+        if "nb_pulls" in turn:
+            nb_pulls, nb_rewards = turn["nb_pulls"], turn["nb_rewards"]
+        else:
+            nb_pulls, nb_rewards = list( nb_pulls ), list( nb_rewards )
+            nb_pulls[turn["selected_arm"]] += 1
+            nb_rewards[turn["selected_arm"]] += turn["reward"]
+            turn = dict( turn, nb_pulls=nb_pulls, nb_rewards=nb_rewards )
+        decoded.append( turn )
+    return decoded
+
+def encode_delta( execution, keyframe_interval = KEYFRAME_INTERVAL ):
+    """Returns a shallow copy of the execution with delta-encoded turns."""
+    return dict( execution, turns=encode_delta_turns( execution["turns"], keyframe_interval ), keyframe_interval=keyframe_interval )
+
+def decode_delta( execution ):
+    """Decodes the turns of a delta-encoded execution in place, other executions are returned as is."""
+    if execution.pop( "keyframe_interval", None ) is not None:
+        execution["turns"] = decode_delta_turns( execution["turns"] )
+    return execution
+
+# ------------------------------
+# Compressed executions
+# gzip streams are built by copying the compressed first turns of the
+# files written by ExecutionHistory.write_gzip_json, then compressing
+# the rest on the fly. The CRC-32 of the copied data is stored, and
+# combined with the CRC-32 of the data preceding it.
+# ------------------------------
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+CRC32_POLYNOMIAL = 0xedb88320
+
+def multiply_modulo_crc32_polynomial( a, b ) -> int:
+    """Returns a * b modulo the CRC-32 polynomial, with polynomials in the reflected bit order of zlib."""
+    m, product = 1 << 31, 0
+    while True:
+        if a & m:
+            product ^= b
+            if a & (m - 1) == 0:
+                return product
+        m >>= 1
+        b = (b >> 1) ^ CRC32_POLYNOMIAL if b & 1 else b >> 1
+
+# x^(2^n) modulo the CRC-32 polynomial
+CRC32_X2N = [ 1 << 30 ]
+for _ in range(31):
+    CRC32_X2N.append( multiply_modulo_crc32_polynomial( CRC32_X2N[-1], CRC32_X2N[-1] ) )
+
+def crc32_combine( crc1, crc2, length2 ) -> int:
+    """Returns the CRC-32 of the concatenation of two data, given their CRC-32 and the length of the second one, as zlib's crc32_combine."""
+    # crc1 is multiplied by x^(8 * length2)
+    shift, n, k = 1 << 31, length2, 3
+    while n:
+        if n & 1:
+            shift = multiply_modulo_crc32_polynomial( CRC32_X2N[k & 31], shift )
+        n >>= 1
+        k += 1
+    return multiply_modulo_crc32_polynomial( shift, crc1 ) ^ crc2
+
+class GzipStream:
+    """gzip file made of compressed data copied as is, and of data compressed on the fly."""
+
+    def __init__(self):
+        self.parts = [ GZIP_HEADER ]
+        self.crc = 0
+        self.size = 0
+        self.compressor = None
+
+    def copy( self, deflate : bytes, crc : int, size : int ):
+        """Appends raw deflate data ending on a byte boundary, whose decompressed data has the given CRC-32 and size."""
+        if self.compressor is not None:
+            self.parts.append( self.compressor.flush( zlib.Z_SYNC_FLUSH ) )
+            self.compressor = None
+        self.parts.append( deflate )
+        self.crc = crc32_combine( self.crc, crc, size )
+        self.size += size
+
+    def write( self, data : bytes ):
+        if self.compressor is None:
+            self.compressor = zlib.compressobj( 6, zlib.DEFLATED, -zlib.MAX_WBITS )
+        self.parts.append( self.compressor.compress( data ) )
+        self.crc = zlib.crc32( data, self.crc )
+        self.size += len(data)
+
+    def close( self ) -> bytes:
+        compressor = self.compressor or zlib.compressobj( 6, zlib.DEFLATED, -zlib.MAX_WBITS )
+        self.parts.append( compressor.flush() )
+        self.parts.append( struct.pack( '<II', self.crc, self.size & 0xffffffff ) )
+        return b"".join( self.parts )
+
+def has_gzip_file( dataset, k, threshold, algorithm, iteration ) -> bool:
+    """Returns whether the execution can be read with write_gzip_prefix, its gzip index being of version GZIP_INDEX_VERSION."""
+    if not all(
+        os.path.exists( execution_location( dataset, k, threshold, algorithm, iteration, extension ) )
+        for extension in ( "json", "json.index", "json.gz", "json.gz.index" )
+    ):
+        return False
+    with open( execution_location( dataset, k, threshold, algorithm, iteration, "json.gz.index" ), 'rb' ) as gzip_index:
+        header = gzip_index.read( GZIP_INDEX_HEADER.size )
+    # the JSON of the older compressed files is served by read_json_prefix until they are written again
+    return len(header) == GZIP_INDEX_HEADER.size and GZIP_INDEX_HEADER.unpack( header )[:2] == ( GZIP_INDEX_MAGIC, GZIP_INDEX_VERSION )
+
+def write_gzip_prefix( stream : GzipStream, dataset, k, threshold, algorithm, iteration, budget = None, fields = None ):
+    """Writes the JSON execution truncated to the turns played up to the budget in the gzip stream, read with the gzip index.
+
+    The compressed blocks of turns kept as a whole are copied from the disk, only the JSON up to the first turn, the
+    remaining kept turns and the end of the JSON are compressed. The given fields replace those of the execution, or
+    are inserted at its end, see splice_fields.
+    """
+    with open( execution_location( dataset, k, threshold, algorithm, iteration, "json.index" ), 'rb' ) as index:
+        first_turn, nb_turns, turns_offset, tail_offset = TURN_INDEX_HEADER.unpack( index.read( TURN_INDEX_HEADER.size ) )
+        nb_rows = nb_turns if budget is None else count_rows( first_turn, nb_turns, budget )
+        with open( execution_location( dataset, k, threshold, algorithm, iteration, "json.gz.index" ), 'rb' ) as gzip_index:
+            _, _, block_turns, _ = GZIP_INDEX_HEADER.unpack( gzip_index.read( GZIP_INDEX_HEADER.size ) )
+            nb_kept_blocks = nb_rows // block_turns
+            # the first boundary follows the JSON up to the first turn, the turns never refer to it
+            header_end, header_crc = GZIP_INDEX_BOUNDARY.unpack( gzip_index.read( GZIP_INDEX_BOUNDARY.size ) )
+            gzip_index.seek( GZIP_INDEX_HEADER.size + GZIP_INDEX_BOUNDARY.size * nb_kept_blocks )
+            deflate_end, crc = GZIP_INDEX_BOUNDARY.unpack( gzip_index.read( GZIP_INDEX_BOUNDARY.size ) )
+        def turn_end( row ):
+            if row < 0:
+                return turns_offset
+            index.seek( TURN_INDEX_HEADER.size + TURN_INDEX_OFFSET.size * row )
+            return TURN_INDEX_OFFSET.unpack( index.read( TURN_INDEX_OFFSET.size ) )[0]
+        start, end = turn_end( nb_kept_blocks * block_turns - 1 ), turn_end( nb_rows - 1 )
+
+    with open( execution_location( dataset, k, threshold, algorithm, iteration, "json" ), 'rb' ) as file:
+        header = file.read( turns_offset )
+        file.seek( start )
+        turns = file.read( end - start )
+        file.seek( tail_offset )
+        tail = file.read()
+    header, members = splice_fields( header, fields ) if fields else ( header, b"" )
+    stream.write( header )
+    if deflate_end > header_end:
+        with open( execution_location( dataset, k, threshold, algorithm, iteration, "json.gz" ), 'rb' ) as file:
+            file.seek( header_end )
+            # the CRC-32 of the copied turns, removing the JSON up to the first turn from the CRC-32 of the index
+            size = start - turns_offset
+            stream.copy( file.read( deflate_end - header_end ), crc ^ crc32_combine( header_crc, 0, size ), size )
+    stream.write( turns )
+    # the execution ends with "}"
+    stream.write( tail[:-1] + members + b"}" )
+
+class ColumnarExecution:
+    """Memory-mapped columnar execution file, whose turns are materialized by ranges of rows.
+
+    Only the header and the requested rows of the requested columns are read from the disk.
+    """
+    def __init__(self, location : str):
+        self.file = open( location, 'rb' )
+        self.buffer = mmap.mmap( self.file.fileno(), 0, access=mmap.ACCESS_READ )
+        version, header_length = COLUMNAR_PREAMBLE.unpack_from( self.buffer, len(COLUMNAR_MAGIC) )
+        if self.buffer[:len(COLUMNAR_MAGIC)] != COLUMNAR_MAGIC or version != COLUMNAR_VERSION:
+            self.close()
+            raise ValueError( f"{location} is not a columnar execution file of version {COLUMNAR_VERSION}" )
+        header_offset = len(COLUMNAR_MAGIC) + COLUMNAR_PREAMBLE.size
+        # header holds every field of the execution except the turns
+        self.header = json.loads( self.buffer[header_offset:header_offset + header_length] )
+        self.data_offset = header_offset + header_length
+        self.descriptions = self.header.pop( "columns" )
+        self.nb_turns = self.header.pop( "nb_turns" )
+        self.first_turn = self.header.pop( "first_turn", None )
+        # maximal number of turns of the decimated copies written aside
+        self.levels = self.header.pop( "levels", [] )
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_val, exc_tb ):
+        self.close()
+
+    def close( self ):
+        self.buffer.close()
+        self.file.close()
+
+    def read_column( self, name, start, stop ):
+        """Returns the rows [start, stop[ of a column as a list."""
+        # the numpy view must not outlive the mapping, only its conversion to a list is returned
+        description = self.descriptions[name]
+        if stop <= start:
+            return []
+        values = np.frombuffer(
+            self.buffer,
+            dtype=description["dtype"],
+            count=(stop - start) * description["width"],
+            offset=self.data_offset + description["offset"] + start * description["width"] * np.dtype(description["dtype"]).itemsize,
+        )
+        if description["width"] > 1:
+            values = values.reshape( stop - start, description["width"] )
+        return values.tolist()
+
+    def count_rows( self, budget = None ) -> int:
+        """Returns the number of turns played up to the budget, which are the first rows since turns are sorted."""
+        if budget is None:
+            return self.nb_turns
+        if self.first_turn is not None:
+            return count_rows( self.first_turn, self.nb_turns, budget )
+        if self.nb_turns == 0:
+            return 0
+        turns = np.frombuffer( self.buffer, dtype=self.descriptions["turn"]["dtype"], count=self.nb_turns, offset=self.data_offset + self.descriptions["turn"]["offset"] )
+        nb_rows = int( np.searchsorted( turns, budget, side='right' ) )
+        del turns
+        return nb_rows
+
+    def read_turns( self, start, stop, columns = TURN_COLUMNS ):
+        """Returns the turns of the rows [start, stop[ in the dict shape of the JSON files."""
+        values = [ self.read_column( name, start, stop ) for name in columns ]
+        return [ dict(zip( columns, row )) for row in zip( *values ) ]
+
+def load_columnar_file( dataset, k, threshold, algorithm, iteration, budget = None, columns = TURN_COLUMNS, extension = "samba" ):
+    """Loads an execution from its columnar file, materializing only the given columns of the turns played up to the budget."""
+    with ColumnarExecution( execution_location( dataset, k, threshold, algorithm, iteration, extension ) ) as columnar:
+        execution = columnar.header
+        execution["turns"] = columnar.read_turns( 0, columnar.count_rows( budget ), columns )
+    return execution
+
+def iter_execution( dataset, k, threshold, algorithm, iteration, budget = None, chunk_size = 1000, max_points = None ):
+    """Yields the execution without its turns, then its turns played up to the budget by lists of chunk_size turns.
+
+    From the columnar file, only one chunk of turns is materialized at a time. With max_points, the turns are
+    those of load_decimated_execution.
+    """
+    location = execution_location( dataset, k, threshold, algorithm, iteration, "samba" )
+    if max_points is None and os.path.exists( location ):
+        with ColumnarExecution( location ) as columnar:
+            yield columnar.header
+            nb_rows = columnar.count_rows( budget )
+            for start in range( 0, nb_rows, chunk_size ):
+                yield columnar.read_turns( start, min( start + chunk_size, nb_rows ) )
+    else:
+        execution = load_decimated_execution( dataset, k, threshold, algorithm, iteration, budget, max_points )
+        turns = execution.pop( "turns" )
+        yield execution
+        for start in range( 0, len(turns), chunk_size ):
+            yield turns[start:start + chunk_size]
+
+def read_security():
     with open(f"{DATA_LOCATION}/security.json") as file:
         return json.loads( "".join(file.readlines()) )
 
-def load_execution_time_by_components( dataset, k, threshold ):
+# version of the layout of benchmarks.json, see data/benchmarks.py
+BENCHMARKS_VERSION = 1
+
+class BenchmarksVersionError(Exception):
+    """Raised when benchmarks.json was written with another layout than BENCHMARKS_VERSION."""
+
+def read_benchmarks():
+    with open(f"{DATA_LOCATION}/benchmarks.json") as file:
+        benchmarks = json.load( file )
+    if benchmarks.get( "version" ) != BENCHMARKS_VERSION:
+        raise BenchmarksVersionError(f"benchmarks.json has version {benchmarks.get('version')}, expected {BENCHMARKS_VERSION}")
+    return benchmarks
+
+def read_execution_time_by_components( dataset, k, threshold ):
     with open(f"{DATA_LOCATION}/{dataset}_{k}_{threshold}/execution_time_by_components.json") as file:
-        return json.loads("".join(file.readlines()))
\ No newline at end of file
+        return json.loads("".join(file.readlines()))
+
+def artifact_version( dataset, k, threshold, algorithm, iteration ) -> Tuple[str, float]:
+    """Returns a version of the files an execution is served from, and the time of their last modification.
+
+    The version only changes when one of the files of the execution, its execution_time_by_components.json file
+    or the security.json file is modified, created or deleted; it is computed from their names, sizes and
+    modification times, without reading them.
+    """
+    folder = f"{DATA_LOCATION}/{dataset}_{k}_{threshold}"
+    prefix = f"execution_{algorithm}_{iteration}."
+    stats = [ ( "security.json", os.stat( f"{DATA_LOCATION}/security.json" ) ) ]
+    with os.scandir( folder ) as entries:
+        for entry in entries:
+            if entry.name.startswith( prefix ) or entry.name == "execution_time_by_components.json":
+                stats.append( ( entry.name, entry.stat() ) )
+    stats.sort( key=lambda named_stat: named_stat[0] )
+    version = hashlib.sha256( json.dumps([ ( name, stat.st_mtime_ns, stat.st_size ) for name, stat in stats ]).encode('utf-8') ).hexdigest()
+    return version, max( stat.st_mtime for _, stat in stats )
+
+
+# ======================================
+# Cache of parsed files
+# ======================================
+def estimate_size( value ) -> int:
+    """Returns a rough estimate of the memory used by a parsed JSON value, in bytes."""
+    if isinstance( value, dict ):
+        return 64 + 40 * len(value) + sum( estimate_size( item ) for item in value.values() )
+    if isinstance( value, ( list, tuple ) ):
+        return 56 + 8 * len(value) + sum( estimate_size( item ) for item in value )
+    if isinstance( value, str ):
+        return 49 + len(value)
+    return 24 if isinstance( value, float ) else 28
+
+class LRUCache:
+    """Least recently used cache of parsed files, bounded by an estimate of the memory they use.
+
+    Cached values are shared between requests: callers must not modify them.
+    """
+    def __init__(self, budget : int):
+        self.budget = budget
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def find( self, key, covers = None ):
+        """Returns whether the key is cached along with its value, None when it is not.
+
+        When covers is given, a cached value for which it returns False is not found.
+        """
+        with self.lock:
+            if key in self.entries and ( covers is None or covers( self.entries[key][0] ) ):
+                self.entries.move_to_end( key )
+                self.hits += 1
+                return True, self.entries[key][0]
+            self.misses += 1
+            return False, None
+
+    def put( self, key, value, covers = None ):
+        """Inserts the value of the key, unless it is already cached or larger than the budget.
+
+        When covers is given, a cached value for which it returns False is replaced.
+        """
+        size = estimate_size( value )
+        with self.lock:
+            if key in self.entries and covers is not None and not covers( self.entries[key][0] ):
+                _, replaced_size = self.entries.pop( key )
+                self.size -= replaced_size
+            if key not in self.entries and size <= self.budget:
+                self.entries[key] = ( value, size )
+                self.size += size
+                while self.size > self.budget:
+                    _, ( _, evicted_size ) = self.entries.popitem( last=False )
+                    self.size -= evicted_size
+                    self.evictions += 1
+
+    def get( self, key, loader, covers = None ):
+        """Returns the cached value of the key, loaded and inserted with the loader function on a miss.
+
+        When covers is given, a cached value for which it returns False is a miss, and is replaced by the loaded one.
+        """
+        found, value = self.find( key, covers )
+        if found:
+            return value
+        value = loader()
+        self.put( key, value, covers )
+        return value
+
+    def stats( self ) -> dict:
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / requests if requests else 0.,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "size": self.size,
+                "budget": self.budget,
+            }
+
+cache = LRUCache( CACHE_BUDGET )
+
+def count_turns_up_to( turns, budget ) -> int:
+    """Returns the number of turns played up to the budget, by a binary search over the sorted turns."""
+    low, high = 0, len(turns)
+    while low < high:
+        middle = (low + high) // 2
+        if turns[middle]["turn"] <= budget:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def truncate( execution, budget ):
+    """Returns a shallow copy of the execution keeping only the turns played up to the budget."""
+    turns = execution["turns"]
+    if budget is not None:
+        turns = turns[:count_turns_up_to( turns, budget )]
+    return dict( execution, turns=turns )
+
+def load_execution( dataset, k, threshold, algorithm, iteration, budget = None ):
+    """Cached load_file, the returned execution can be modified except for its turns.
+
+    An execution is cached with its turns played up to the largest budget requested so far, None standing for all
+    of them: only the turns up to the budget are read, and the cached execution is replaced when it lacks some.
+    """
+    covers = lambda cached: cached[0] is None or ( budget is not None and budget <= cached[0] )
+    _, execution = cache.get(
+        ( dataset, k, threshold, algorithm, iteration ),
+        lambda: ( budget, load_file( dataset, k, threshold, algorithm, iteration, budget ) ),
+        covers
+    )
+    return truncate( execution, budget )
+
+def load_decimation_level( dataset, k, threshold, algorithm, iteration, level, budget = None ):
+    """Cached load of the decimated copy of an execution keeping at most level turns, see load_execution."""
+    execution = cache.get(
+        ( dataset, k, threshold, algorithm, iteration, level ),
+        lambda: load_columnar_file( dataset, k, threshold, algorithm, iteration, extension=f"lod{level}.samba" )
+    )
+    return truncate( execution, budget )
+
+def decimate( execution, max_points ):
+    """Returns a shallow copy of the execution keeping at most max_points evenly spaced turns, the first and last ones included."""
+    turns = execution["turns"]
+    if len(turns) > max_points:
+        turns = [ turns[row] for row in np.linspace( 0, len(turns) - 1, max_points ).round().astype( int ) ]
+    return dict( execution, turns=turns )
+
+def load_decimated_execution( dataset, k, threshold, algorithm, iteration, budget = None, max_points = None ):
+    """Loads an execution keeping at most max_points of the turns played up to the budget, the last one included.
+
+    The turns are taken from the coarsest decimation level written along with the columnar file holding enough turns
+    up to the budget, or from the execution itself, and evenly picked from it when there are still too many.
+    """
+    location = execution_location( dataset, k, threshold, algorithm, iteration, "samba" )
+    if max_points is None or not os.path.exists( location ):
+        execution = load_execution( dataset, k, threshold, algorithm, iteration, budget )
+        return execution if max_points is None else decimate( execution, max_points )
+
+    with ColumnarExecution( location ) as columnar:
+        levels = columnar.levels
+        nb_rows = columnar.count_rows( budget )
+        last_turns = columnar.read_turns( nb_rows - 1, nb_rows ) if nb_rows else []
+    if nb_rows <= max_points:
+        return load_execution( dataset, k, threshold, algorithm, iteration, budget )
+
+    for level in sorted( levels ):
+        execution = load_decimation_level( dataset, k, threshold, algorithm, iteration, level, budget )
+        if len(execution["turns"]) >= max_points - 1:
+            break
+    else:
+        execution = load_execution( dataset, k, threshold, algorithm, iteration, budget )
+    # a level holds the first and last turns of the execution, not the last one played up to the budget
+    if execution["turns"] and execution["turns"][-1]["turn"] == last_turns[-1]["turn"]:
+        return decimate( execution, max_points )
+    execution = decimate( execution, max_points - 1 )
+    return dict( execution, turns=execution["turns"] + last_turns )
+
+def load_security():
+    return cache.get( "security", read_security )
+
+def load_benchmarks():
+    return cache.get( "benchmarks", read_benchmarks )
+
+def load_execution_time_by_components( dataset, k, threshold ):
+    return cache.get(
+        ( dataset, k, threshold, "execution_time_by_components" ),
+        lambda: read_execution_time_by_components( dataset, k, threshold )
+    )
+
+# ------------------------------
+# Asynchronous loaders
+# The loaders read files, so their async variants run them in the
+# default thread pool of the event loop, which keeps serving the
+# other requests meanwhile.
+# ------------------------------
+async def run_blocking( function, *args, **kwargs ):
+    """Runs the blocking function in the default thread pool of the running event loop."""
+    return await asyncio.get_event_loop().run_in_executor( None, functools.partial( function, *args, **kwargs ) )
+
+async def load_execution_async( dataset, k, threshold, algorithm, iteration, budget = None ):
+    return await run_blocking( load_execution, dataset, k, threshold, algorithm, iteration, budget )
+
+async def load_decimated_execution_async( dataset, k, threshold, algorithm, iteration, budget = None, max_points = None ):
+    return await run_blocking( load_decimated_execution, dataset, k, threshold, algorithm, iteration, budget, max_points )
+
+async def load_security_async():
+    return await run_blocking( load_security )
+
+async def load_benchmarks_async():
+    return await run_blocking( load_benchmarks )
+
+async def load_execution_time_by_components_async( dataset, k, threshold ):
+    return await run_blocking( load_execution_time_by_components, dataset, k, threshold )
+
+def warm_up_cache():
+    """Fills the cache with the executions found in DATA_LOCATION, until its budget is reached."""
+    it_min, it_max = getIterationRange()
+    for folder in sorted( os.listdir( DATA_LOCATION ) ):
+        if not os.path.isdir( os.path.join( DATA_LOCATION, folder ) ):
+            continue
+        # only the folders of the configurations, named {dataset}_{k}_{threshold}, hold executions
+        try:
+            dataset, k, threshold = folder.rsplit( "_", 2 )
+            k, threshold = int(k), int(threshold)
+        except ValueError:
+            continue
+        # an execution can be stored in several formats
+        executions = set()
+        for filename in os.listdir( os.path.join( DATA_LOCATION, folder ) ):
+            if filename.startswith( "execution_" ) and not filename.startswith( "execution_time_by_components" ):
+                algorithm, iteration = filename[len("execution_"):].split( ".", 1 )[0].rsplit( "_", 1 )
+                executions.add( ( algorithm, int(iteration) ) )
+        for algorithm, iteration in sorted( executions ):
+            if not it_min <= iteration <= it_max:
+                continue
+            # the warm-up stops once the cache is full rather than evicting what it just loaded
+            evictions = cache.evictions
+            load_execution( dataset, k, threshold, algorithm, iteration )
+            if cache.evictions != evictions:
+                return
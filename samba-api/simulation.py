@@ -0,0 +1,181 @@
+# ======================================
+# file: simulation.py
+# ======================================
+import asyncio
+import importlib
+import math
+import os
+import resource
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .model import LRUCache, run_blocking
+
+# location of the data generation scripts, data/ in the repository
+SIMULATOR_LOCATION = os.environ.get( "SAMBA_SIMULATOR_LOCATION", "/simulator" )
+# rating histograms of each dataset written by data/probs-generator.py, see data/histograms.py
+HISTOGRAMS_LOCATION = os.environ.get( "SAMBA_HISTOGRAMS_LOCATION", os.path.join( SIMULATOR_LOCATION, "probs" ) )
+# number of processes running the simulations
+SIMULATION_WORKERS = int( os.environ.get( "SAMBA_SIMULATION_WORKERS", 1 ) )
+# CPU time a simulation may use, in seconds, before it fails
+SIMULATION_CPU_LIMIT = int( os.environ.get( "SAMBA_SIMULATION_CPU_LIMIT", 10 ) )
+# time a request waits for its simulation, queueing included, in seconds
+SIMULATION_TIME_LIMIT = float( os.environ.get( "SAMBA_SIMULATION_TIME_LIMIT", 15 ) )
+# turns of one arm a simulation plays and times by second of CPU time, at worst, as measured for Thompson sampling
+SIMULATION_ARM_TURNS_PER_SECOND = int( os.environ.get( "SAMBA_SIMULATION_ARM_TURNS_PER_SECOND", 20000 ) )
+# largest budget times number of arms of a simulation, so it finishes within its CPU limit
+SIMULATION_MAX_ARM_TURNS = SIMULATION_CPU_LIMIT * SIMULATION_ARM_TURNS_PER_SECOND
+# largest budget of a simulation
+SIMULATION_MAX_BUDGET = int( os.environ.get( "SAMBA_SIMULATION_MAX_BUDGET", SIMULATION_MAX_ARM_TURNS ) )
+# memory budget of the cache of simulated executions, in bytes
+SIMULATION_CACHE_BUDGET = int( os.environ.get( "SAMBA_SIMULATION_CACHE_BUDGET", 128 * 1024 * 1024 ) )
+
+
+class SimulationError(Exception):
+    """Raised when a simulation cannot be run for the given parameters."""
+
+class SimulationTimeout(Exception):
+    """Raised when a simulation exceeds its CPU or time limit."""
+
+
+# ------------------------------
+# Simulator
+# The scripts of data/ import each other from their folder, and are
+# loaded once per process by its siblings.py.
+# ------------------------------
+def load_module( name : str ):
+    if SIMULATOR_LOCATION not in sys.path:
+        sys.path.append( SIMULATOR_LOCATION )
+    return importlib.import_module( "siblings" ).import_sibling( name )
+
+def load_simulator():
+    return load_module( "pre-computations" )
+
+histograms = {}
+
+def load_histograms( dataset : str ):
+    """Returns the rating histograms of the dataset, loaded once."""
+    if dataset not in histograms:
+        location = os.path.join( HISTOGRAMS_LOCATION, f"{dataset}.histograms" )
+        if not os.path.exists( location ):
+            raise SimulationError( f"Unknown dataset {dataset}" )
+        histograms[dataset] = load_module( "histograms" ).load_histograms( location )
+    return histograms[dataset]
+
+def simulation_probs( dataset : str, k : int, threshold : float ) -> [float]:
+    """Returns the probs of the k items of the dataset having the most ratings, for the given threshold."""
+    dataset_histograms = load_histograms( dataset )
+    if not 0 < k <= len(dataset_histograms):
+        raise SimulationError( f"Expected k between 1 and {len(dataset_histograms)} for {dataset}" )
+    return dataset_histograms.probs( k, threshold )
+
+def simulate( dataset, k, threshold, probs, budget, algorithm, seed, tau, epsilon ):
+    """Plays and times the algorithm once, as an iteration of data/pre-computations.py would be.
+
+    Runs in a worker process, whose CPU time is limited to SIMULATION_CPU_LIMIT more seconds: past it, the soft limit
+    raises SimulationTimeout in the simulation, rather than killing the worker and every simulation of its pool.
+
+    Returns:
+        The execution as exported in the JSON files, and its execution time by components.
+    """
+    def exceeded( signum, frame ):
+        raise SimulationTimeout( f"Simulation exceeded {SIMULATION_CPU_LIMIT}s of CPU time" )
+    usage = resource.getrusage( resource.RUSAGE_SELF )
+    soft_limit, hard_limit = resource.getrlimit( resource.RLIMIT_CPU )
+    limit = int( usage.ru_utime + usage.ru_stime ) + 1 + SIMULATION_CPU_LIMIT
+    signal.signal( signal.SIGXCPU, exceeded )
+    resource.setrlimit( resource.RLIMIT_CPU, ( limit if hard_limit == resource.RLIM_INFINITY else min( limit, hard_limit ), hard_limit ) )
+    try:
+        return play( dataset, k, threshold, probs, budget, algorithm, seed, tau, epsilon )
+    finally:
+        resource.setrlimit( resource.RLIMIT_CPU, ( soft_limit, hard_limit ) )
+
+def play( dataset, k, threshold, probs, budget, algorithm, seed, tau, epsilon ):
+    simulator = load_simulator()
+    cell = simulator.ExecutionCell(
+        0, dataset, list( probs ), budget, threshold, algorithm,
+        iterations=[ 0 ],
+        timed_iterations=[ 0 ],
+        engine=simulator.STANDARD_ENGINE,
+        tau=tau,
+        epsilon=epsilon,
+        seed=simulator.cell_seed( seed, dataset, probs, budget, threshold, algorithm ),
+    )
+    _, [ ( _, execution ) ], [ times_by_components ] = simulator.execute_cell( cell )
+    return execution.export_as_dict(), times_by_components
+
+
+# ------------------------------
+# Scheduling
+# Simulations run in a process pool, replaced when one of its processes
+# was killed. Simulated executions are cached by their parameters, and
+# a simulation requested again while running is awaited rather than
+# started twice.
+# ------------------------------
+simulations = LRUCache( SIMULATION_CACHE_BUDGET )
+running = {}
+pool = None
+
+def simulation_pool() -> ProcessPoolExecutor:
+    global pool
+    if pool is None:
+        pool = ProcessPoolExecutor( SIMULATION_WORKERS )
+    return pool
+
+def replace_broken_pool( broken : ProcessPoolExecutor ):
+    global pool
+    if pool is broken:
+        pool = None
+        broken.shutdown( wait=False )
+
+async def run_simulation( key, attempts : int = 2 ):
+    start = time.perf_counter()
+    for attempt in range( attempts ):
+        executor = simulation_pool()
+        try:
+            execution, times_by_components = await asyncio.wait_for(
+                asyncio.wrap_future( executor.submit( simulate, *key ) ), SIMULATION_TIME_LIMIT - ( time.perf_counter() - start )
+            )
+            break
+        except asyncio.TimeoutError:
+            raise SimulationTimeout( f"Simulation exceeded {SIMULATION_TIME_LIMIT}s" )
+        except BrokenProcessPool:
+            # every simulation of a pool fails when one of its processes is killed, whichever it was running
+            replace_broken_pool( executor )
+    else:
+        raise SimulationTimeout( f"Simulation failed {attempts} times, its process being killed" )
+    result = { "execution": execution, "components": times_by_components, "simulation_time": time.perf_counter() - start }
+    simulations.put( key, result )
+    return result
+
+async def load_simulation( dataset : str, k : int, threshold : float, budget : int, algorithm : str, seed : int, tau : float, epsilon : float ):
+    """Returns the simulated execution and its execution time by components, cached by parameters.
+
+    The returned value is shared between requests: callers must not modify it.
+    """
+    if not 0 < budget <= SIMULATION_MAX_BUDGET:
+        raise SimulationError( f"Expected budget between 1 and {SIMULATION_MAX_BUDGET}" )
+    if budget * k > SIMULATION_MAX_ARM_TURNS:
+        raise SimulationError( f"Expected budget times k to be at most {SIMULATION_MAX_ARM_TURNS}, to finish within {SIMULATION_CPU_LIMIT}s of CPU time" )
+    simulator = await run_blocking( load_simulator )
+    if algorithm not in simulator.ALGORITHMS:
+        raise SimulationError( f"Unknown algorithm {algorithm}" )
+    probs = tuple( await run_blocking( simulation_probs, dataset, k, threshold ) )
+    # the k softmax weights, at most e^(1 / tau) each, are summed: their sum must stay below the largest float
+    min_tau = 1 / ( math.log( sys.float_info.max ) - math.log( k ) )
+    if not ( math.isfinite( tau ) and tau >= min_tau ):
+        raise SimulationError( f"Expected tau to be a finite number of at least {min_tau:.5f} for k={k}" )
+    # a NaN epsilon fails the comparisons
+    if not 0 <= epsilon <= 1:
+        raise SimulationError( "Expected epsilon between 0 and 1" )
+    key = ( dataset, k, threshold, probs, budget, algorithm, seed, tau, epsilon )
+    found, result = simulations.find( key )
+    if found:
+        return result
+    if key not in running:
+        running[key] = asyncio.ensure_future( run_simulation( key ) )
+        running[key].add_done_callback( lambda _: running.pop( key, None ) )
+    # a request which is cancelled does not cancel the simulation awaited by the others
+    return await asyncio.shield( running[key] )
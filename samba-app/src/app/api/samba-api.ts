@@ -1,9 +1,9 @@
 import {Algorithm} from "../samba/algorithm";
 import {HttpClient, HttpErrorResponse} from "@angular/common/http";
 import {Injectable} from "@angular/core";
-import {ExecutionHistory} from "../samba/executionHistory";
+import {decodeDeltaTurns, ExecutionHistory} from "../samba/executionHistory";
 import {Observable, throwError} from "rxjs";
-import {catchError, retry} from "rxjs/operators";
+import {catchError, map, retry} from "rxjs/operators";
 
 @Injectable({
   providedIn: 'root'
@@ -29,7 +29,7 @@ export class SambaApi {
       );
   }
 
-  getExecutionHistory(algorithm : Algorithm, budget : number, k : number, dataset : string, threshold : number) : Observable<ExecutionHistory> {
+  getExecutionHistory(algorithm : Algorithm, budget : number, k : number, dataset : string, threshold : number, max_points? : number, encoding? : 'delta') : Observable<ExecutionHistory> {
     console.log("[API] Getting a new execution for parameters: ", algorithm, budget)
     let data = {
       algorithm,
@@ -37,14 +37,114 @@ export class SambaApi {
       k,
       dataset,
       threshold,
+      max_points,
+      encoding,
     }
     return this.httpClient.post<ExecutionHistory>(this.endpoint + '/create', JSON.stringify(data))
       .pipe(
         retry(1),
+        map(history => {
+          if (history.keyframe_interval !== undefined) {
+            decodeDeltaTurns(history.turns);
+          }
+          return history;
+        }),
         catchError(this.processError)
       );
   }
 
+  /**
+   * Plays the algorithm live for parameters which may not have been precomputed. The seed of the simulation is
+   * returned along with the execution history, and the same seed gives the same execution.
+   */
+  simulateExecutionHistory(algorithm : Algorithm, budget : number, k : number, dataset : string, threshold : number, seed? : number, max_points? : number, encoding? : 'delta') : Observable<ExecutionHistory> {
+    let params : any = { algorithm, budget, k, dataset, threshold };
+    if (seed !== undefined) params.seed = seed;
+    if (max_points !== undefined) params.max_points = max_points;
+    if (encoding !== undefined) params.encoding = encoding;
+    return this.httpClient.get<ExecutionHistory>(this.endpoint + '/simulate', { params })
+      .pipe(
+        map(history => {
+          if (history.keyframe_interval !== undefined) {
+            decodeDeltaTurns(history.turns);
+          }
+          return history;
+        }),
+        catchError(this.processError)
+      );
+  }
+
+  /**
+   * Gets the measures of the cryptographic primitives, swept over key sizes, payload sizes, K and batch sizes, of
+   * the given primitive only if any.
+   */
+  getBenchmarks(primitive? : string) : Observable<any> {
+    let params : any = {};
+    if (primitive !== undefined) params.primitive = primitive;
+    return this.httpClient.get<any>(this.endpoint + '/benchmarks', { params })
+      .pipe(
+        retry(1),
+        catchError(this.processError)
+      );
+  }
+
+  /**
+   * Streaming counterpart of getExecutionHistory: emits the execution history as soon as its header is received,
+   * then again each time a new chunk of turns has been appended to its turns.
+   */
+  streamExecutionHistory(algorithm : Algorithm, budget : number, k : number, dataset : string, threshold : number, max_points? : number, encoding? : 'delta') : Observable<ExecutionHistory> {
+    let data = {
+      algorithm,
+      budget,
+      k,
+      dataset,
+      threshold,
+      max_points,
+      encoding,
+    }
+    return new Observable<ExecutionHistory>(subscriber => {
+      let controller = new AbortController();
+      let history : ExecutionHistory;
+      fetch(this.endpoint + '/create?stream=true', { method: 'POST', body: JSON.stringify(data), signal: controller.signal })
+        .then(response => this.readLines(response, line => {
+          if (line.type == 'header') {
+            history = line.execution;
+            history.turns = [];
+          } else {
+            // each chunk of delta-encoded turns starts with a keyframe
+            history.turns.push(...(history.keyframe_interval !== undefined ? decodeDeltaTurns(line.turns) : line.turns));
+          }
+          subscriber.next(history);
+        }))
+        .then(() => subscriber.complete())
+        .catch(err => subscriber.error(err));
+      return () => controller.abort();
+    });
+  }
+
+  /**
+   * Calls the callback on each object of a NDJSON response, as soon as its line has been received.
+   */
+  private async readLines(response : Response, callback : (line : any) => void) {
+    if (!response.ok || !response.body) {
+      throw `Error Code: ${response.status}\nMessage: ${response.statusText}`;
+    }
+    let reader = response.body.getReader();
+    let decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      let { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let lines = buffer.split('\n');
+      buffer = lines.pop() as string;
+      lines.filter(line => line.length > 0).forEach(line => callback(JSON.parse(line)));
+    }
+    if (buffer.length > 0) {
+      callback(JSON.parse(buffer));
+    }
+  }
+
   processError(err : HttpErrorResponse) {
     let message = '';
     if(err.error instanceof ErrorEvent) {
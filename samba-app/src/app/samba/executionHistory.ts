@@ -47,6 +47,27 @@ export interface ExecutionHistory {
       permutation: number
     }
   },
-  turns: Turn[]
+  turns: Turn[],
+  // set when the turns are delta-encoded, see decodeDeltaTurns
+  keyframe_interval?: number
 
 }
+
+/**
+ * Rebuilds the counters of the arms of delta-encoded turns, in place.
+ *
+ * Only keyframe turns hold nb_pulls and nb_rewards, starting with the first turn. The counters of the other turns
+ * are those of the previous turn, with one more pull and the reward added to the selected arm.
+ */
+export function decodeDeltaTurns(turns : Turn[], previous? : Turn) : Turn[] {
+  for (let turn of turns) {
+    if (turn.nb_pulls === undefined) {
+      turn.nb_pulls = (previous as Turn).nb_pulls.slice();
+      turn.nb_rewards = (previous as Turn).nb_rewards.slice();
+      turn.nb_pulls[turn.selected_arm] += 1;
+      turn.nb_rewards[turn.selected_arm] += turn.reward;
+    }
+    previous = turn;
+  }
+  return turns;
+}